@@ -0,0 +1,150 @@
+# app/agent_cache.py
+
+"""
+Content-addressed cache of agent outputs.
+
+`run_agent` looks results up by a hash of everything that determines them
+(agent name, model, instructions, tool names, input and output schema), so
+retried tasks, redelivered webhooks and re-run replays do not pay for the
+same LLM call twice. Agents whose tools fetch live data (the research
+agent's web search) run with `use_cache=False`. Entries live in Redis with a TTL (shared by all workers; configure
+`maxmemory-policy allkeys-lru` to bound it) or in a per-process LRU.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from agents import Agent
+from pydantic import BaseModel
+
+from .config import settings
+from .logging_config import logger
+
+KEY_PREFIX = "agent_cache:"
+
+
+def _output_model(agent: Agent) -> type[BaseModel] | None:
+    output_type = agent.output_type
+    if isinstance(output_type, type) and issubclass(output_type, BaseModel):
+        return output_type
+    return None
+
+
+def cache_key(agent: Agent, agent_input: str) -> str:
+    output_model = _output_model(agent)
+    payload = [
+        agent.name,
+        str(agent.model),
+        agent.instructions if isinstance(agent.instructions, str) else None,
+        sorted(getattr(tool, "name", str(tool)) for tool in agent.tools),
+        agent_input,
+        output_model.model_json_schema() if output_model else None,
+    ]
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def serialize_output(output) -> str:
+    if isinstance(output, BaseModel):
+        return output.model_dump_json()
+    return json.dumps(output)
+
+
+def deserialize_output(agent: Agent, raw: str):
+    output_model = _output_model(agent)
+    if output_model:
+        return output_model.model_validate_json(raw)
+    return json.loads(raw)
+
+
+class LocalStore:
+    """In-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisStore:
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def get(self, key: str) -> str | None:
+        value = self.client.get(KEY_PREFIX + key)
+        return value.decode() if value is not None else None
+
+    def set(self, key: str, value: str, ttl: int):
+        self.client.set(KEY_PREFIX + key, value, ex=ttl)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.AGENT_CACHE_BACKEND == "local":
+                    _store = LocalStore(settings.AGENT_CACHE_MAX_ENTRIES)
+                else:
+                    _store = RedisStore(
+                        settings.AGENT_CACHE_REDIS_URL or settings.CELERY_BROKER_URL
+                    )
+    return _store
+
+
+def lookup(agent: Agent, key: str):
+    """Returns the cached output for `key`, or None on a miss or store error."""
+    try:
+        raw = get_store().get(key)
+        return deserialize_output(agent, raw) if raw is not None else None
+    except Exception as e:
+        # The cache is an optimisation: a broken store or a stale entry that
+        # no longer validates just means the agent runs.
+        logger.warning({"message": "Agent cache lookup failed", "error": str(e)})
+        return None
+
+
+def store(key: str, output):
+    try:
+        get_store().set(key, serialize_output(output), settings.AGENT_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.warning({"message": "Agent cache store failed", "error": str(e)})
@@ -0,0 +1,66 @@
+# app/agent_registry.py
+
+"""
+Memoized agent construction.
+
+Agents are rebuilt only when their name, model or prompt version changes, so
+repeated campaigns and replies reuse the same objects while prompt edits on
+disk still take effect (see `prompt_loader.get_prompt`).
+"""
+
+import threading
+
+from agents import Agent
+
+from .prompt_loader import Prompt, get_prompt, prompt_hash
+
+# (name, model) -> (version key, Agent); only the current version is kept.
+_agents: dict[tuple[str, str], tuple[tuple, Agent]] = {}
+_lock = threading.Lock()
+
+
+def get_agent(
+    name: str,
+    model: str,
+    *,
+    prompt_file: str | None = None,
+    prompt_vars: dict | None = None,
+    instructions: str | None = None,
+    version_key: tuple = (),
+    **agent_kwargs,
+) -> Agent:
+    """
+    Returns the agent for (name, model, prompt hash), building it on first use.
+
+    Instructions come from `prompt_file` (formatted with `prompt_vars`) or
+    are given inline. Agents composed from other agents (tools, handoffs)
+    pass their parts' versions as `version_key` so they are rebuilt when a
+    part changes. `agent_kwargs` are only used when the agent is (re)built.
+    """
+    if prompt_file:
+        prompt = get_prompt(prompt_file, **(prompt_vars or {}))
+    else:
+        prompt = Prompt(instructions, prompt_hash(instructions))
+    version = (prompt.hash, version_key)
+
+    cached = _agents.get((name, model))
+    if cached and cached[0] == version:
+        return cached[1]
+    with _lock:
+        cached = _agents.get((name, model))
+        if cached and cached[0] == version:
+            return cached[1]
+        agent = Agent(name=name, instructions=prompt.text, model=model, **agent_kwargs)
+        _agents[(name, model)] = (version, agent)
+    return agent
+
+
+def agent_version(agent: Agent) -> tuple[str, str, str | None]:
+    """(name, model, prompt hash) of an agent, for cache keys and logs."""
+    return (agent.name, str(agent.model), agent_prompt_hash(agent))
+
+
+def agent_prompt_hash(agent: Agent) -> str | None:
+    if isinstance(agent.instructions, str):
+        return prompt_hash(agent.instructions)
+    return None
@@ -0,0 +1,144 @@
+# app/agent_runner.py
+
+import asyncio
+import contextvars
+import time
+
+from agents import Agent, Runner, function_tool
+
+from . import agent_cache
+from .agent_registry import agent_prompt_hash
+from .clients import configure_openai
+from .config import settings
+from .metrics import AGENT_CACHE_LOOKUPS, track_stage
+from .rate_limit import TokenBucket
+from .tracing import span
+from .usage import record_agent_run
+
+configure_openai()
+
+_openai_bucket: TokenBucket | None = None
+
+# Wall time of the last `run_agent` call in this context, as recorded in
+# agent_runs (the rate-limit wait excluded).
+last_wall_ms_var = contextvars.ContextVar("last_agent_wall_ms", default=None)
+
+
+def set_openai_rate_limit(requests_per_minute: float, burst: int | None = None):
+    """
+    Limits the agent runs this process starts per minute (0 disables it).
+    Shared by every event loop in the process, so it also holds across the
+    `asyncio.run` calls of different tasks in a worker.
+    """
+    global _openai_bucket
+    if requests_per_minute > 0:
+        _openai_bucket = TokenBucket(
+            requests_per_minute / 60, burst or settings.OPENAI_BURST
+        )
+    else:
+        _openai_bucket = None
+
+
+set_openai_rate_limit(settings.OPENAI_REQUESTS_PER_MINUTE)
+
+
+async def _wait_for_rate_limit() -> float:
+    """Waits for a slot under the OpenAI rate limit; returns the seconds waited."""
+    bucket = _openai_bucket
+    if bucket is None:
+        return 0.0
+    wait = bucket.reserve()
+    if wait > 0:
+        await asyncio.sleep(wait)
+    return wait
+
+
+async def run_agent(
+    agent: Agent,
+    agent_input: str,
+    stage: str,
+    use_cache: bool = True,
+    tier: str | None = None,
+):
+    """
+    Runs an agent to completion and returns its final output.
+
+    Every agent execution goes through here so that per-stage
+    instrumentation and usage accounting (`usage.record_agent_run`) are
+    applied in one place. Outputs are memoized by `agent_cache`; pass
+    `use_cache=False` to always call the model (and refresh the cached
+    entry). `tier` is the model tier chosen by `model_policy`, recorded
+    with the run. Model calls wait for the OpenAI rate limit
+    (`set_openai_rate_limit`); the wait is not counted in the recorded wall
+    time. Cache and usage-store calls are blocking I/O, so they run in a
+    thread rather than on the event loop.
+    """
+    cache_enabled = settings.AGENT_CACHE_ENABLED
+    key = agent_cache.cache_key(agent, agent_input) if cache_enabled else None
+    prompt_hash = agent_prompt_hash(agent)
+    start = time.perf_counter()
+    usage, cached, error = None, None, None
+    waited = 0.0
+    try:
+        with (
+            track_stage(stage),
+            span(
+                f"agent.{stage}",
+                **{
+                    "agent.name": agent.name,
+                    "agent.model": agent.model,
+                    "agent.prompt_hash": prompt_hash,
+                },
+            ) as agent_span,
+        ):
+            if agent_span and tier:
+                agent_span.set_attribute("agent.tier", tier)
+            if cache_enabled and use_cache:
+                cached = await asyncio.to_thread(agent_cache.lookup, agent, key)
+                AGENT_CACHE_LOOKUPS.inc(
+                    stage=stage, result="hit" if cached is not None else "miss"
+                )
+                if agent_span:
+                    agent_span.set_attribute("agent.cache_hit", cached is not None)
+                if cached is not None:
+                    return cached
+            waited = await _wait_for_rate_limit()
+            if agent_span and waited:
+                agent_span.set_attribute("agent.rate_limit_wait_ms", waited * 1000)
+            result = await Runner.run(agent, agent_input)
+            usage = result.context_wrapper.usage
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        wall_ms = (time.perf_counter() - start - waited) * 1000
+        last_wall_ms_var.set(wall_ms)
+        await asyncio.to_thread(
+            record_agent_run,
+            stage=stage,
+            agent=agent,
+            prompt_hash=prompt_hash,
+            wall_ms=wall_ms,
+            usage=usage,
+            cache_hit=cached is not None,
+            error=error,
+            tier=tier,
+        )
+    if cache_enabled:
+        await asyncio.to_thread(agent_cache.store, key, result.final_output)
+    return result.final_output
+
+
+def agent_tool(agent: Agent, tool_name: str, tool_description: str, stage: str):
+    """
+    Like `agent.as_tool`, but the nested run goes through `run_agent` so it
+    is accounted for under `stage` (the SDK does not add a tool agent's
+    token usage to the calling run). Tool runs are never served from cache.
+    """
+
+    @function_tool(name_override=tool_name, description_override=tool_description)
+    async def run_tool_agent(input: str) -> str:
+        output = await run_agent(agent, input, stage=stage, use_cache=False)
+        return str(output)
+
+    return run_tool_agent
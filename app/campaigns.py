@@ -0,0 +1,599 @@
+# app/campaigns.py
+
+"""
+Campaign service: campaigns created through the API (`POST /campaigns`) run
+side by side, each with its own prospect list, template, sender identity and
+concurrency limit.
+
+A new campaign is "queued". The scheduler tick (`schedule_campaigns`, run by
+beat and after every finished shard) hands queued campaigns to the
+`plan_campaign` task, which validates the prospect list (see `prospects`)
+and stores it as shards of CAMPAIGN_SHARD_SIZE rows. Shards of running
+campaigns are then dispatched to `run_campaign_shard` round-robin
+(`fair_share`): at most CAMPAIGN_MAX_ACTIVE_SHARDS are sending at once, at
+most `max_concurrent_shards` of them from one campaign, and a large
+campaign never holds up a small one started after it. Sends are still
+claimed per prospect in campaign_sends, so a re-dispatched shard never
+emails anyone twice.
+
+Shards the Campaign_Sender_Agent fans out (`send_campaign_shard`) have no
+campaign row; they store their counts as done shards when they finish, and
+`campaign_progress` reports them.
+
+Only the database and task signatures are used here, so the web server can
+import this module without the agents SDK or the SendGrid client.
+"""
+
+import csv
+import itertools
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pydantic import BaseModel, Field
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from .celery_app import plan_campaign, run_campaign_shard
+from .config import settings
+from .database import Campaign, CampaignSend, CampaignShard, get_session
+from .logging_config import get_correlation_id, logger
+from .prospects import ValidationReport, iter_valid_prospects, template_fields
+
+ACTIVE_STATUSES = ("queued", "planning", "running")
+# Key of the Postgres advisory lock that serializes scheduler ticks.
+SCHEDULER_LOCK_KEY = 0x63616D70
+# Shards are written in batches of this many while a list is planned.
+SHARD_INSERT_BATCH = 20
+
+
+class CampaignRequest(BaseModel):
+    """Body of `POST /campaigns`."""
+
+    name: str
+    subject: str
+    body_template: str
+    # A CSV relative to CAMPAIGN_PROSPECTS_DIR, or the rows themselves.
+    prospects_path: str | None = None
+    prospects: list[dict[str, str]] | None = None
+    # Default to SENDER_EMAIL, SENDER_NAME and REPLY_TO_EMAIL.
+    sender_email: str | None = None
+    sender_name: str | None = None
+    reply_to_email: str | None = None
+    max_concurrent_shards: int | None = Field(None, ge=1)
+    shard_size: int | None = Field(None, ge=1, le=10_000)
+
+
+def resolve_prospects_path(relative_path: str) -> str:
+    """The prospect list's path, refusing anything outside CAMPAIGN_PROSPECTS_DIR."""
+    root = os.path.realpath(settings.CAMPAIGN_PROSPECTS_DIR)
+    path = os.path.realpath(os.path.join(root, relative_path))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError("prospects_path must be inside CAMPAIGN_PROSPECTS_DIR")
+    return path
+
+
+def _save_inline_prospects(campaign_id: str, rows: list[dict]) -> str:
+    relative_path = os.path.join("campaigns", f"{campaign_id}.csv")
+    path = resolve_prospects_path(relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, mode="w", encoding="utf-8", newline="") as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    return relative_path
+
+
+def _check_address(address: str | None, default: str, allowed: list[str], field: str):
+    if address is None:
+        return
+    permitted = {default.lower(), *(a.lower() for a in allowed)}
+    if address.strip().lower() not in permitted:
+        raise ValueError(f"{field} {address} is not an allowed address")
+
+
+def create_campaign(request: CampaignRequest) -> dict:
+    """
+    Stores a new queued campaign and returns its status. Raises ValueError
+    for a missing or inaccessible prospect list, or a sender or reply-to
+    address that is not configured (CAMPAIGN_ALLOWED_SENDERS/_REPLY_TO).
+    """
+    if bool(request.prospects_path) == bool(request.prospects):
+        raise ValueError("Give exactly one of prospects_path and prospects")
+    _check_address(
+        request.sender_email,
+        settings.SENDER_EMAIL,
+        settings.CAMPAIGN_ALLOWED_SENDERS,
+        "sender_email",
+    )
+    _check_address(
+        request.reply_to_email,
+        settings.REPLY_TO_EMAIL,
+        settings.CAMPAIGN_ALLOWED_REPLY_TO,
+        "reply_to_email",
+    )
+    campaign_id = uuid.uuid4().hex[:12]
+    if request.prospects:
+        prospects_path = _save_inline_prospects(campaign_id, request.prospects)
+    else:
+        prospects_path = request.prospects_path
+        if not os.path.isfile(resolve_prospects_path(prospects_path)):
+            raise ValueError(f"Prospect list not found: {prospects_path}")
+
+    now = datetime.now(timezone.utc)
+    campaign = Campaign(
+        id=campaign_id,
+        name=request.name,
+        status="queued",
+        subject=request.subject,
+        body_template=request.body_template,
+        prospects_path=prospects_path,
+        sender_email=request.sender_email or settings.SENDER_EMAIL,
+        sender_name=request.sender_name or settings.SENDER_NAME,
+        reply_to_email=request.reply_to_email or settings.REPLY_TO_EMAIL,
+        max_concurrent_shards=(
+            request.max_concurrent_shards or settings.CAMPAIGN_DEFAULT_CONCURRENCY
+        ),
+        shard_size=request.shard_size or settings.CAMPAIGN_SHARD_SIZE,
+        created_at=now,
+        updated_at=now,
+    )
+    with get_session() as db:
+        db.add(campaign)
+        db.commit()
+        status = _status(campaign, {}, {})
+    logger.info(
+        {
+            "message": "Campaign created",
+            "campaign_id": campaign_id,
+            "name": request.name,
+            "prospects_path": prospects_path,
+        }
+    )
+    return status
+
+
+def _set_status(campaign_id: str, status: str, expected: tuple, **fields) -> bool:
+    """Moves a campaign to `status` if it is in one of the `expected` states."""
+    now = datetime.now(timezone.utc)
+    statement = (
+        update(Campaign)
+        .where(Campaign.id == campaign_id, Campaign.status.in_(expected))
+        .values(status=status, updated_at=now, **fields)
+    )
+    if status in ("completed", "failed", "cancelled"):
+        statement = statement.values(completed_at=now)
+    with get_session() as db:
+        changed = db.execute(statement).rowcount
+        db.commit()
+    return bool(changed)
+
+
+def cancel_campaign(campaign_id: str) -> dict | None:
+    """
+    Stops dispatching the campaign's shards; shards already sending finish.
+    Returns the campaign's status, or None if it does not exist.
+    """
+    if _set_status(campaign_id, "cancelled", ACTIVE_STATUSES):
+        logger.info({"message": "Campaign cancelled", "campaign_id": campaign_id})
+    return get_campaign_status(campaign_id)
+
+
+# --- Planning ---
+
+
+def _insert_shards(shards: list[dict]):
+    if not shards:
+        return
+    statement = insert(CampaignShard).values(shards)
+    # Re-planning after a crash rewrites the same shards.
+    statement = statement.on_conflict_do_nothing(
+        index_elements=["campaign_id", "shard_index"]
+    )
+    with get_session() as db:
+        db.execute(statement)
+        db.commit()
+
+
+def plan_campaign_shards(campaign_id: str):
+    """
+    Validates a planning campaign's prospect list and stores its valid rows
+    as pending shards, then marks the campaign running (or failed).
+    """
+    with get_session() as db:
+        campaign = db.get(Campaign, campaign_id)
+    if campaign is None or campaign.status != "planning":
+        return
+    now = datetime.now(timezone.utc)
+    try:
+        path = resolve_prospects_path(campaign.prospects_path)
+        report = ValidationReport(
+            path, template_fields(campaign.subject, campaign.body_template)
+        )
+        shards = []
+        batches = itertools.batched(
+            iter_valid_prospects(path, report), campaign.shard_size
+        )
+        for shard_index, rows in enumerate(batches):
+            shards.append(
+                {
+                    "campaign_id": campaign_id,
+                    "shard_index": shard_index,
+                    "status": "pending",
+                    "prospects": json.dumps(rows, separators=(",", ":")),
+                    "size": len(rows),
+                    "updated_at": now,
+                }
+            )
+            if len(shards) >= SHARD_INSERT_BATCH:
+                _insert_shards(shards)
+                shards = []
+        _insert_shards(shards)
+        if report.missing_columns:
+            raise ValueError(
+                "The prospect list has no column for: "
+                f"{', '.join(report.missing_columns)}"
+            )
+    except Exception as e:
+        logger.error(
+            {
+                "message": "Campaign planning failed",
+                "campaign_id": campaign_id,
+                "error": str(e),
+            }
+        )
+        _set_status(campaign_id, "failed", ("planning",), error=str(e))
+        return
+
+    _set_status(
+        campaign_id,
+        "running",
+        ("planning",),
+        total_prospects=report.valid,
+        rejected_prospects=sum(report.rejected.values()),
+    )
+    logger.info(
+        {
+            "message": "Campaign planned",
+            "campaign_id": campaign_id,
+            "summary": report.summary(),
+        }
+    )
+
+
+# --- Scheduling ---
+
+
+def fair_share(demands: list[tuple[str, int]], capacity: int) -> dict[str, int]:
+    """
+    Splits `capacity` free shard slots over `demands`, (campaign id, shards
+    it can take) pairs in round-robin order: one slot per campaign per
+    round, starting from the first, until the slots or the demand run out.
+    """
+    grants: dict[str, int] = {}
+    wanting = [(campaign_id, want) for campaign_id, want in demands if want > 0]
+    while capacity > 0 and wanting:
+        next_round = []
+        for campaign_id, want in wanting:
+            if capacity == 0:
+                break
+            grants[campaign_id] = grants.get(campaign_id, 0) + 1
+            capacity -= 1
+            if want > 1:
+                next_round.append((campaign_id, want - 1))
+        wanting = next_round
+    return grants
+
+
+# Running campaigns with unfinished shards, least recently served first.
+SHARD_DEMAND = text(
+    """
+SELECT
+    c.id,
+    c.max_concurrent_shards,
+    count(*) FILTER (WHERE s.status = 'sending') AS sending,
+    count(*) FILTER (WHERE s.status = 'pending') AS pending
+FROM campaigns c
+JOIN campaign_shards s ON s.campaign_id = c.id AND s.status <> 'done'
+WHERE c.status = 'running'
+GROUP BY c.id
+ORDER BY c.last_dispatched_at NULLS FIRST, c.created_at
+"""
+)
+
+CLAIM_SHARDS = text(
+    """
+UPDATE campaign_shards
+SET status = 'sending', lease_until = :lease_until, updated_at = :now
+WHERE campaign_id = :campaign_id AND shard_index IN (
+    SELECT shard_index FROM campaign_shards
+    WHERE campaign_id = :campaign_id AND status = 'pending'
+    ORDER BY shard_index
+    LIMIT :limit
+)
+RETURNING shard_index
+"""
+)
+
+COMPLETE_CAMPAIGNS = text(
+    """
+UPDATE campaigns c
+SET status = 'completed', completed_at = :now, updated_at = :now
+WHERE c.status = 'running' AND NOT EXISTS (
+    SELECT 1 FROM campaign_shards s
+    WHERE s.campaign_id = c.id AND s.status <> 'done'
+)
+RETURNING c.id
+"""
+)
+
+
+def schedule_campaigns() -> dict:
+    """
+    One scheduler tick: starts planning queued campaigns, re-queues shards
+    (and plans) whose lease ran out, completes finished campaigns and
+    dispatches pending shards into the free slots. Ticks are serialized by
+    an advisory lock; a tick that cannot take it does nothing.
+    """
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=settings.CAMPAIGN_CLAIM_TIMEOUT_SECONDS)
+    with get_session() as db:
+        locked = db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"),
+            {"key": SCHEDULER_LOCK_KEY},
+        ).scalar()
+        if not locked:
+            return {"planned": 0, "dispatched": 0, "completed": 0}
+
+        # A worker died mid-plan or mid-shard: try again.
+        db.execute(
+            update(Campaign)
+            .where(Campaign.status == "planning", Campaign.updated_at < stale_before)
+            .values(status="queued", updated_at=now)
+        )
+        db.execute(
+            update(CampaignShard)
+            .where(CampaignShard.status == "sending", CampaignShard.lease_until < now)
+            .values(status="pending", lease_until=None, updated_at=now)
+        )
+        to_plan = (
+            db.execute(
+                update(Campaign)
+                .where(Campaign.status == "queued")
+                .values(status="planning", updated_at=now)
+                .returning(Campaign.id)
+            )
+            .scalars()
+            .all()
+        )
+        completed = db.execute(COMPLETE_CAMPAIGNS, {"now": now}).scalars().all()
+
+        sending = db.execute(
+            select(func.count())
+            .select_from(CampaignShard)
+            .where(CampaignShard.status == "sending")
+        ).scalar()
+        demands = [
+            (row.id, min(row.max_concurrent_shards - row.sending, row.pending))
+            for row in db.execute(SHARD_DEMAND)
+        ]
+        grants = fair_share(demands, settings.CAMPAIGN_MAX_ACTIVE_SHARDS - sending)
+        lease_until = now + timedelta(seconds=settings.CAMPAIGN_SHARD_LEASE_SECONDS)
+        dispatched = []
+        for campaign_id, count in grants.items():
+            claimed = db.execute(
+                CLAIM_SHARDS,
+                {
+                    "campaign_id": campaign_id,
+                    "limit": count,
+                    "lease_until": lease_until,
+                    "now": now,
+                },
+            ).scalars()
+            dispatched.extend((campaign_id, shard_index) for shard_index in claimed)
+        if grants:
+            db.execute(
+                update(Campaign)
+                .where(Campaign.id.in_(list(grants)))
+                .values(last_dispatched_at=now)
+            )
+        db.commit()
+
+    correlation_id = get_correlation_id()
+    for campaign_id in to_plan:
+        plan_campaign.delay(campaign_id, correlation_id=correlation_id)
+    for campaign_id, shard_index in dispatched:
+        run_campaign_shard.delay(
+            campaign_id, shard_index, correlation_id=correlation_id
+        )
+    for campaign_id in completed:
+        logger.info({"message": "Campaign completed", "campaign_id": campaign_id})
+    return {
+        "planned": len(to_plan),
+        "dispatched": len(dispatched),
+        "completed": len(completed),
+    }
+
+
+# --- Shard execution (worker side) ---
+
+
+def load_shard(campaign_id: str, shard_index: int):
+    """(campaign, prospect rows) of a shard, or None if either is gone."""
+    with get_session() as db:
+        campaign = db.get(Campaign, campaign_id)
+        shard = db.get(CampaignShard, (campaign_id, shard_index))
+    if campaign is None or shard is None:
+        return None
+    return campaign, json.loads(shard.prospects)
+
+
+def renew_shard_lease(campaign_id: str, shard_index: int):
+    """Extends a sending shard's lease by CAMPAIGN_SHARD_LEASE_SECONDS."""
+    now = datetime.now(timezone.utc)
+    with get_session() as db:
+        db.execute(
+            update(CampaignShard)
+            .where(
+                CampaignShard.campaign_id == campaign_id,
+                CampaignShard.shard_index == shard_index,
+                CampaignShard.status == "sending",
+            )
+            .values(
+                lease_until=now
+                + timedelta(seconds=settings.CAMPAIGN_SHARD_LEASE_SECONDS),
+                updated_at=now,
+            )
+        )
+        db.commit()
+
+
+def finish_shard(campaign_id: str, shard_index: int, counts: dict | None = None):
+    """
+    Marks a shard done with its sent/failed/skipped counts, or, without
+    counts, returns it to pending (its campaign is no longer running).
+    """
+    values = {"lease_until": None, "updated_at": datetime.now(timezone.utc)}
+    if counts is None:
+        values["status"] = "pending"
+    else:
+        values.update(status="done", **counts)
+    with get_session() as db:
+        db.execute(
+            update(CampaignShard)
+            .where(
+                CampaignShard.campaign_id == campaign_id,
+                CampaignShard.shard_index == shard_index,
+            )
+            .values(**values)
+        )
+        db.commit()
+
+
+# --- Agent Campaigns ---
+
+
+def record_shard_result(campaign_id: str, shard_index: int, size: int, counts: dict):
+    """
+    Stores the sent/failed/skipped counts of a shard the Campaign_Sender_Agent
+    queued (`send_campaign_shard`). Those shards have no campaign row and are
+    written only once they are done; a redelivered shard keeps the counts of
+    its first run.
+    """
+    statement = insert(CampaignShard).values(
+        campaign_id=campaign_id,
+        shard_index=shard_index,
+        status="done",
+        prospects="[]",
+        size=size,
+        updated_at=datetime.now(timezone.utc),
+        **counts,
+    )
+    statement = statement.on_conflict_do_nothing(
+        index_elements=["campaign_id", "shard_index"]
+    )
+    with get_session() as db:
+        db.execute(statement)
+        db.commit()
+
+
+def campaign_progress(campaign_id: str) -> dict:
+    """
+    Totals of a campaign queued by the Campaign_Sender_Agent: sent, failed
+    and still sending from `campaign_sends`, skipped (already sent) from its
+    finished shards.
+    """
+    with get_session() as db:
+        shards_done, skipped = db.execute(
+            select(
+                func.count(), func.coalesce(func.sum(CampaignShard.skipped), 0)
+            ).where(
+                CampaignShard.campaign_id == campaign_id,
+                CampaignShard.status == "done",
+            )
+        ).one()
+        sends = _counts_by_status(db, CampaignSend, [campaign_id]).get(campaign_id, {})
+    return {
+        "campaign_id": campaign_id,
+        "shards_done": shards_done,
+        "sent": sends.get("sent", 0),
+        "failed": sends.get("failed", 0),
+        "skipped": skipped,
+        "sending": sends.get("pending", 0),
+    }
+
+
+# --- Status ---
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _status(campaign: Campaign, shards: dict, sends: dict) -> dict:
+    total = campaign.total_prospects
+    finished = sends.get("sent", 0) + sends.get("failed", 0)
+    return {
+        "id": campaign.id,
+        "name": campaign.name,
+        "status": campaign.status,
+        "error": campaign.error,
+        "sender_email": campaign.sender_email,
+        "max_concurrent_shards": campaign.max_concurrent_shards,
+        "created_at": _isoformat(campaign.created_at),
+        "completed_at": _isoformat(campaign.completed_at),
+        "prospects": {
+            "total": total,
+            "rejected": campaign.rejected_prospects,
+            "sent": sends.get("sent", 0),
+            "failed": sends.get("failed", 0),
+            "sending": sends.get("pending", 0),
+        },
+        "shards": {
+            "total": sum(shards.values()),
+            "pending": shards.get("pending", 0),
+            "sending": shards.get("sending", 0),
+            "done": shards.get("done", 0),
+        },
+        "progress": round(finished / total, 4) if total else None,
+    }
+
+
+def _counts_by_status(db, model, campaign_ids: list[str]) -> dict[str, dict]:
+    rows = db.execute(
+        select(model.campaign_id, model.status, func.count())
+        .where(model.campaign_id.in_(campaign_ids))
+        .group_by(model.campaign_id, model.status)
+    )
+    counts: dict[str, dict] = {}
+    for campaign_id, status, count in rows:
+        counts.setdefault(campaign_id, {})[status] = count
+    return counts
+
+
+def list_campaign_statuses(status: str | None = None, limit: int = 20) -> list[dict]:
+    """The most recent campaigns (optionally only those in `status`) with progress."""
+    query = select(Campaign).order_by(Campaign.created_at.desc()).limit(limit)
+    if status:
+        query = query.where(Campaign.status == status)
+    with get_session() as db:
+        campaigns = db.scalars(query).all()
+        ids = [campaign.id for campaign in campaigns]
+        shards = _counts_by_status(db, CampaignShard, ids)
+        sends = _counts_by_status(db, CampaignSend, ids)
+    return [
+        _status(campaign, shards.get(campaign.id, {}), sends.get(campaign.id, {}))
+        for campaign in campaigns
+    ]
+
+
+def get_campaign_status(campaign_id: str) -> dict | None:
+    with get_session() as db:
+        campaign = db.get(Campaign, campaign_id)
+        if campaign is None:
+            return None
+        shards = _counts_by_status(db, CampaignShard, [campaign_id])
+        sends = _counts_by_status(db, CampaignSend, [campaign_id])
+    return _status(campaign, shards.get(campaign_id, {}), sends.get(campaign_id, {}))
@@ -0,0 +1,54 @@
+# app/celery_app.py
+
+"""
+The Celery application plus lightweight signatures of its tasks.
+
+Producers such as the web server only need to enqueue tasks, so they use the
+signatures below instead of importing `app.tasks`, which pulls in the agents
+SDK, the API clients and the task implementations. Signatures are sent by
+name; the worker (`celery -A app.tasks worker`) registers the tasks.
+"""
+
+from celery import Celery
+
+from .config import settings
+from .celery_instrumentation import ContextTask
+
+celery_app = Celery(
+    "tasks",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND or settings.CELERY_BROKER_URL,
+)
+celery_app.Task = ContextTask
+# No task's result is read back; tasks must opt in to storing one.
+celery_app.conf.task_ignore_result = True
+# Run by the `beat` service; follow-ups are a no-op unless FOLLOW_UP_ENABLED
+# and the Slack digest unless SLACK_DIGEST_ENABLED.
+celery_app.conf.beat_schedule = {
+    "send-due-follow-ups": {
+        "task": "app.tasks.send_due_follow_ups",
+        "schedule": settings.FOLLOW_UP_TICK_SECONDS,
+    },
+    "schedule-campaigns": {
+        "task": "app.tasks.schedule_campaigns",
+        "schedule": settings.CAMPAIGN_TICK_SECONDS,
+    },
+    "post-slack-digest": {
+        "task": "app.tasks.post_slack_digest",
+        "schedule": settings.SLACK_DIGEST_INTERVAL_SECONDS,
+    },
+    "purge-expired-drafts": {
+        "task": "app.tasks.purge_expired_drafts",
+        "schedule": settings.DRAFT_PURGE_INTERVAL_SECONDS,
+    },
+}
+
+process_inbound_email = celery_app.signature("app.tasks.process_inbound_email")
+send_approved_email = celery_app.signature("app.tasks.send_approved_email")
+add_approved_reply_to_history = celery_app.signature(
+    "app.tasks.add_approved_reply_to_history"
+)
+send_campaign_shard = celery_app.signature("app.tasks.send_campaign_shard")
+summarize_campaign = celery_app.signature("app.tasks.summarize_campaign")
+plan_campaign = celery_app.signature("app.tasks.plan_campaign")
+run_campaign_shard = celery_app.signature("app.tasks.run_campaign_shard")
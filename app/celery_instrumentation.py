@@ -1,10 +1,42 @@
 # app/celery_instrumentation.py
 
+import contextvars
+import time
 from celery import Task
+from celery.signals import before_task_publish
 from .logging_config import set_correlation_id, logger
+from .metrics import CELERY_TASK_DURATION, CELERY_TASKS, CELERY_QUEUE_WAIT
+from .tracing import span, record_span, current_span_id
+from .profiling import profile_task
+
+# Seconds the running task waited in the broker queue (None if unknown).
+queue_wait_var = contextvars.ContextVar("queue_wait", default=None)
+
+
+def current_queue_wait() -> float | None:
+    return queue_wait_var.get()
+
+
+@before_task_publish.connect
+def _stamp_publish_context(headers=None, **kwargs):
+    # Runs in the publishing process: lets the worker measure queue delay and
+    # attach its spans under the span that enqueued the task.
+    if headers is None:
+        return
+    headers.setdefault("enqueued_at_ns", time.time_ns())
+    parent_span_id = current_span_id()
+    if parent_span_id:
+        headers.setdefault("trace_parent", parent_span_id)
 
 
 class ContextTask(Task):
+    def _request_header(self, name: str):
+        value = getattr(self.request, name, None)
+        if value is None:
+            headers = getattr(self.request, "headers", {}) or {}
+            value = headers.get(name)
+        return value
+
     def __call__(self, *args, **kwargs):
         # Accept correlation_id in kwargs or request headers (if using custom send)
         cid = kwargs.pop("correlation_id", None)
@@ -12,6 +44,23 @@ class ContextTask(Task):
             headers = getattr(self.request, "headers", {}) or {}
             cid = headers.get("correlation_id")
         set_correlation_id(cid)
+
+        parent_span_id = self._request_header("trace_parent")
+        enqueued_at_ns = self._request_header("enqueued_at_ns")
+        queue_wait_var.set(None)
+        if enqueued_at_ns:
+            started_ns = time.time_ns()
+            queue_wait = max(started_ns - int(enqueued_at_ns), 0) / 1e9
+            queue_wait_var.set(queue_wait)
+            CELERY_QUEUE_WAIT.observe(queue_wait, task=self.name)
+            record_span(
+                "celery.queue_wait",
+                int(enqueued_at_ns),
+                started_ns,
+                parent_span_id=parent_span_id,
+                **{"celery.task_name": self.name},
+            )
+
         logger.info(
             {
                 "message": "Celery task START",
@@ -19,23 +68,40 @@ class ContextTask(Task):
                 "celery.id": self.request.id,
             }
         )
-        try:
-            result = self.run(*args, **kwargs)
-            logger.info(
-                {
-                    "message": "Celery task SUCCESS",
-                    "celery.task_name": self.name,
-                    "celery.id": self.request.id,
-                }
-            )
-            return result
-        except Exception as e:
-            logger.error(
-                {
-                    "message": "Celery task FAILURE",
-                    "error": str(e),
-                    "celery.task_name": self.name,
-                    "celery.id": self.request.id,
-                }
-            )
-            raise
+        start = time.perf_counter()
+        with (
+            span(
+                f"celery.task {self.name}",
+                parent_span_id=parent_span_id,
+                **{"celery.task_name": self.name, "celery.id": self.request.id},
+            ),
+            profile_task(self.name),
+        ):
+            try:
+                result = self.run(*args, **kwargs)
+                self._record_metrics("success", start)
+                logger.info(
+                    {
+                        "message": "Celery task SUCCESS",
+                        "celery.task_name": self.name,
+                        "celery.id": self.request.id,
+                    }
+                )
+                return result
+            except Exception as e:
+                self._record_metrics("failure", start)
+                logger.error(
+                    {
+                        "message": "Celery task FAILURE",
+                        "error": str(e),
+                        "celery.task_name": self.name,
+                        "celery.id": self.request.id,
+                    }
+                )
+                raise
+
+    def _record_metrics(self, state: str, start: float):
+        CELERY_TASK_DURATION.observe(
+            time.perf_counter() - start, task=self.name, state=state
+        )
+        CELERY_TASKS.inc(task=self.name, state=state)
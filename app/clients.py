@@ -0,0 +1,94 @@
+# app/clients.py
+
+"""
+Shared clients for the external APIs. With OFFLINE_MODE enabled every client
+is pointed at the local fake services (`python -m app.fakes`) instead.
+
+Client libraries are imported on first use, so processes that never call an
+API (e.g. the web tier for SendGrid and Tavily) do not pay for importing them.
+"""
+
+import threading
+
+from .config import settings
+
+OFFLINE_API_KEY = "offline"
+
+_lock = threading.Lock()
+_sendgrid_client = None
+_tavily_client = None
+_openai_configured = False
+
+
+def fake_service_url(service: str) -> str | None:
+    """Base URL of a fake service in offline mode, otherwise None."""
+    if not settings.OFFLINE_MODE:
+        return None
+    return f"{settings.FAKE_SERVICES_URL.rstrip('/')}/{service}"
+
+
+def _api_key(value: str) -> str:
+    return value or (OFFLINE_API_KEY if settings.OFFLINE_MODE else value)
+
+
+def get_sendgrid_client():
+    """Returns the process-wide SendGrid client, creating it on first use."""
+    global _sendgrid_client
+    if _sendgrid_client is None:
+        with _lock:
+            if _sendgrid_client is None:
+                from sendgrid import SendGridAPIClient
+
+                host = fake_service_url("sendgrid")
+                kwargs = {"host": host} if host else {}
+                _sendgrid_client = SendGridAPIClient(
+                    _api_key(settings.SENDGRID_API_KEY), **kwargs
+                )
+    return _sendgrid_client
+
+
+def get_tavily_client():
+    """Returns the process-wide Tavily client, creating it on first use."""
+    global _tavily_client
+    if _tavily_client is None:
+        with _lock:
+            if _tavily_client is None:
+                from tavily import TavilyClient
+
+                _tavily_client = TavilyClient(
+                    api_key=_api_key(settings.TAVILY_API_KEY),
+                    api_base_url=fake_service_url("tavily"),
+                )
+    return _tavily_client
+
+
+def configure_openai():
+    """
+    Routes Agents SDK model calls to the fake OpenAI service in offline mode.
+    The SDK's trace export is disabled there too, since it would call out to
+    the real platform.
+    """
+    global _openai_configured
+    if _openai_configured or not settings.OFFLINE_MODE:
+        return
+    from agents import set_default_openai_client, set_tracing_disabled
+    from openai import AsyncOpenAI
+
+    set_default_openai_client(
+        AsyncOpenAI(
+            api_key=_api_key(settings.OPENAI_API_KEY),
+            base_url=f"{fake_service_url('openai')}/v1",
+        ),
+        use_for_tracing=False,
+    )
+    set_tracing_disabled(True)
+    _openai_configured = True
+
+
+def slack_client_kwargs() -> dict:
+    """Keyword arguments for Slack's AsyncWebClient."""
+    kwargs = {"token": _api_key(settings.SLACK_BOT_TOKEN)}
+    base_url = fake_service_url("slack")
+    if base_url:
+        kwargs["base_url"] = f"{base_url}/api/"
+    return kwargs
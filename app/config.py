@@ -1,5 +1,6 @@
 # app/config.py
 
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -11,21 +12,283 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
     # --- API Keys & Secrets (from .env) ---
-    OPENAI_API_KEY: str
-    SENDGRID_API_KEY: str
-    SLACK_BOT_TOKEN: str
-    SLACK_CHANNEL_ID: str
+    # Required unless OFFLINE_MODE is enabled (see `_require_api_keys`).
+    OPENAI_API_KEY: str = ""
+    SENDGRID_API_KEY: str = ""
+    SLACK_BOT_TOKEN: str = ""
+    SLACK_CHANNEL_ID: str = ""
+    TAVILY_API_KEY: str = ""
+
+    # --- Infrastructure ---
+    CELERY_BROKER_URL: str = "redis://redis:6379/0"
+    # Celery result backend (no task result is read back); defaults to
+    # CELERY_BROKER_URL.
+    CELERY_RESULT_BACKEND: str | None = None
+    POSTGRES_USER: str = "postgres"
+    POSTGRES_PASSWORD: str = "postgres"
+    POSTGRES_DB: str = "sales_copilot"
+    POSTGRES_HOST: str = "postgres"
+    # Overrides the URL built from the POSTGRES_* values when set.
+    DATABASE_URL: str | None = None
 
     # --- Application Parameters ---
     SENDER_EMAIL: str = "user.name@example.com"
+    SENDER_NAME: str = "Sales Team"
+    SALES_REP_NAME: str = "Alex"
     REPLY_TO_EMAIL: str = "user.name@example.com"
     PROSPECTS_CSV_PATH: str = "prospects.csv"
+    # Validate, normalize and deduplicate the list before each campaign send.
+    PROSPECTS_PREFLIGHT_ENABLED: bool = True
 
     # --- Agent Model Names ---
     MANAGER_AGENT_MODEL: str = "gpt-4o"
     SDR_AGENT_MODEL: str = "gpt-4o"
+    RESEARCH_AGENT_MODEL: str = "gpt-4o-mini"
     WRITER_AGENT_MODEL: str = "gpt-4o-mini"
-    CAMAPIGN_SENDER_MODEL: str = "gpt-4o-mini"
+    CAMPAIGN_SENDER_MODEL: str = "gpt-4o-mini"
+
+    # --- Model Tiering ---
+    # Opt-in: the SDR analysis drops from SDR_AGENT_MODEL to SDR_FAST_MODEL
+    # while the broker queue holds at least BACKLOG_THRESHOLD messages, or
+    # when a reply would otherwise exceed its latency budget (time queued
+    # plus the full model's typical run time). Fast-tier analyses below
+    # SDR_ESCALATION_CONFIDENCE are redone on SDR_AGENT_MODEL.
+    MODEL_TIERING_ENABLED: bool = False
+    SDR_FAST_MODEL: str = "gpt-4o-mini"
+    MODEL_TIER_BACKLOG_THRESHOLD: int = 200
+    REPLY_LATENCY_BUDGET_SECONDS: float = 120.0
+    SDR_ESCALATION_CONFIDENCE: float = 0.7
+    # The queue depth is read from the broker at most this often per process.
+    MODEL_TIER_QUEUE_POLL_SECONDS: float = 5.0
+
+    # --- Offline Mode ---
+    # Points the OpenAI, SendGrid, Tavily and Slack clients at the local fake
+    # services (`python -m app.fakes`) instead of the real APIs.
+    OFFLINE_MODE: bool = False
+    FAKE_SERVICES_URL: str = "http://fakes:8099"
+    FAKE_SERVICES_PORT: int = 8099
+    # Response latency per service is lognormal: median (ms) and shape (sigma).
+    FAKE_LATENCY_MEDIAN_MS: dict[str, float] = {
+        "openai": 1500.0,
+        "sendgrid": 120.0,
+        "tavily": 700.0,
+        "slack": 150.0,
+    }
+    FAKE_LATENCY_SIGMA: float = 0.5
+    # Fraction of requests answered with a 5xx / a 429 with Retry-After.
+    FAKE_ERROR_RATE: float = 0.0
+    FAKE_RATE_LIMIT_RATE: float = 0.0
+    # Relative weights of the canned SDR classifications.
+    FAKE_CLASSIFICATION_WEIGHTS: dict[str, float] = {
+        "POSITIVE_INTEREST": 0.3,
+        "QUESTION": 0.2,
+        "OBJECTION": 0.15,
+        "NOT_INTERESTED": 0.2,
+        "LOGISTICAL": 0.1,
+        "UNCLEAR": 0.05,
+    }
+    # Seed for reproducible latencies, failures and outputs (None = random).
+    FAKE_SEED: int | None = None
+
+    # --- Conversation Context ---
+    # Replies see the last N messages verbatim plus a rolling summary of older
+    # ones; the summary is refreshed once BATCH messages have left the window.
+    CONVERSATION_RECENT_MESSAGES: int = 6
+    CONVERSATION_SUMMARY_BATCH: int = 4
+    SUMMARY_AGENT_MODEL: str = "gpt-4o-mini"
+
+    # --- Follow-ups ---
+    # Opt-in: prospects who do not answer a campaign email or an approved
+    # reply get automatic follow-ups, one per entry, each this many hours
+    # after our previous message. A prospect reply stops the sequence.
+    FOLLOW_UP_ENABLED: bool = False
+    FOLLOW_UP_DELAYS_HOURS: list[float] = [72, 168]
+    FOLLOW_UP_AGENT_MODEL: str = "gpt-4o-mini"
+    # Each beat tick claims at most BATCH_SIZE due conversations and writes
+    # up to CONCURRENCY drafts at a time.
+    FOLLOW_UP_TICK_SECONDS: float = 60.0
+    FOLLOW_UP_BATCH_SIZE: int = 50
+    FOLLOW_UP_CONCURRENCY: int = 5
+    # A claimed conversation becomes due again after this long if its
+    # follow-up was not sent (e.g. the worker died).
+    FOLLOW_UP_LEASE_SECONDS: int = 900
+
+    # --- Agent Output Cache ---
+    # Agent outputs are memoized by (agent, model, instructions, input, schema).
+    AGENT_CACHE_ENABLED: bool = True
+    # "redis" shares entries across workers; "local" is a per-process LRU.
+    AGENT_CACHE_BACKEND: str = "redis"
+    # Defaults to CELERY_BROKER_URL when unset.
+    AGENT_CACHE_REDIS_URL: str | None = None
+    AGENT_CACHE_TTL_SECONDS: int = 86400
+    # Size of the "local" LRU.
+    AGENT_CACHE_MAX_ENTRIES: int = 1024
+
+    # --- OpenAI Rate Limit ---
+    # Agent runs (not individual model requests) each process may start per
+    # minute; 0 disables the limit. `python -m app.reprocess` sets its own.
+    OPENAI_REQUESTS_PER_MINUTE: float = 0
+    OPENAI_BURST: int = 10
+
+    # --- Usage Accounting ---
+    # Every agent run is recorded in the agent_runs table (see app/usage_report.py).
+    USAGE_TRACKING_ENABLED: bool = True
+    # USD per 1M (input, output) tokens, used for cost estimates in reports.
+    MODEL_PRICING: dict[str, tuple[float, float]] = {
+        "gpt-4o": (2.50, 10.00),
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4.1": (2.00, 8.00),
+        "gpt-4.1-mini": (0.40, 1.60),
+    }
+
+    # --- Web Search ---
+    # Search results are split into passages, deduplicated and BM25-ranked;
+    # only the best passages within this many tokens reach the Research Agent.
+    WEB_SEARCH_TOKEN_BUDGET: int = 800
+    WEB_SEARCH_PASSAGE_WORDS: int = 80
+    # Word 3-gram Jaccard similarity above which passages count as duplicates.
+    WEB_SEARCH_DEDUP_THRESHOLD: float = 0.8
+
+    # --- Campaign Fan-out ---
+    # Campaigns are split into shards of this many prospects and sent by the
+    # worker pool; disable to send from the campaign process itself.
+    CAMPAIGN_FANOUT_ENABLED: bool = True
+    CAMPAIGN_SHARD_SIZE: int = 500
+    # A summary task checks a fanned-out campaign this often and logs its
+    # totals once every shard is done, or gives up after the timeout.
+    CAMPAIGN_SUMMARY_INTERVAL_SECONDS: float = 30.0
+    CAMPAIGN_RESULT_TIMEOUT_SECONDS: int = 3600
+    # A shard claims its prospects this many at a time, just before sending
+    # them. A prospect claimed by a shard that never reported back is sent
+    # again after CAMPAIGN_CLAIM_TIMEOUT_SECONDS (e.g. the worker was killed
+    # mid-shard); it must exceed CAMPAIGN_SHARD_LEASE_SECONDS.
+    CAMPAIGN_CLAIM_BATCH_SIZE: int = 50
+    CAMPAIGN_CLAIM_TIMEOUT_SECONDS: int = 900
+
+    # --- Campaign Service ---
+    # Campaigns created with POST /campaigns are sharded (CAMPAIGN_SHARD_SIZE)
+    # and handed to the worker pool by a beat tick, round-robin across
+    # running campaigns: at most MAX_ACTIVE_SHARDS shards send at once in
+    # total, and at most each campaign's own limit (DEFAULT_CONCURRENCY
+    # unless given). A sending shard renews its lease with every claim batch;
+    # one that has not for CAMPAIGN_SHARD_LEASE_SECONDS is handed out again.
+    CAMPAIGN_TICK_SECONDS: float = 5.0
+    CAMPAIGN_MAX_ACTIVE_SHARDS: int = 8
+    CAMPAIGN_DEFAULT_CONCURRENCY: int = 2
+    CAMPAIGN_SHARD_LEASE_SECONDS: int = 300
+    # Prospect lists are read from this directory (prospects_path is relative
+    # to it); lists posted inline are saved under its "campaigns" folder.
+    CAMPAIGN_PROSPECTS_DIR: str = "."
+    # The campaign API requires "Authorization: Bearer <token>"; it answers
+    # 503 to every request while no token is configured.
+    CAMPAIGN_API_TOKEN: str | None = None
+    # Verified SendGrid senders a campaign may use besides SENDER_EMAIL, and
+    # reply-to addresses (on the Inbound Parse domain) besides REPLY_TO_EMAIL.
+    CAMPAIGN_ALLOWED_SENDERS: list[str] = []
+    CAMPAIGN_ALLOWED_REPLY_TO: list[str] = []
+
+    # --- Outbound Email Flow Control ---
+    # Concurrent SendGrid sends adapt (AIMD) between these bounds.
+    SEND_INITIAL_CONCURRENCY: int = 4
+    SEND_MIN_CONCURRENCY: int = 1
+    SEND_MAX_CONCURRENCY: int = 32
+    # The window is halved at most once per interval on 429/5xx responses.
+    SEND_DECREASE_INTERVAL_SECONDS: float = 1.0
+    SEND_MAX_RETRIES: int = 5
+    SEND_RETRY_BASE_DELAY_SECONDS: float = 1.0
+    SEND_RETRY_MAX_DELAY_SECONDS: float = 60.0
+    # Sends per second to any one recipient domain, with overrides by domain.
+    SEND_DOMAIN_RATE_PER_SECOND: float = 5.0
+    SEND_DOMAIN_BURST: int = 10
+    SEND_DOMAIN_RATE_LIMITS: dict[str, float] = {}
+
+    # --- Slack Delivery ---
+    # Slack allows roughly one message per second per channel.
+    SLACK_MIN_POST_INTERVAL_SECONDS: float = 1.0
+    SLACK_MAX_RETRIES: int = 5
+    SLACK_RETRY_BASE_DELAY_SECONDS: float = 1.0
+    SLACK_RETRY_MAX_DELAY_SECONDS: float = 30.0
+    # Digest mode collapses low-priority classifications into one message,
+    # posted by beat every SLACK_DIGEST_INTERVAL_SECONDS.
+    SLACK_DIGEST_ENABLED: bool = False
+    SLACK_DIGEST_CLASSIFICATIONS: list[str] = ["NOT_INTERESTED"]
+    SLACK_DIGEST_INTERVAL_SECONDS: float = 300.0
+
+    # --- Draft Store ---
+    # Slack buttons only carry a draft ID; drafts are kept server-side for this
+    # long, and beat deletes expired ones every DRAFT_PURGE_INTERVAL_SECONDS.
+    DRAFT_TTL_HOURS: int = 168
+    DRAFT_PURGE_INTERVAL_SECONDS: float = 3600.0
+
+    # --- Logging ---
+    # Opt-in: hand records to a background thread for formatting and output.
+    LOG_QUEUE_ENABLED: bool = False
+    # Records beyond this many pending are dropped rather than blocking (0 = unbounded).
+    LOG_QUEUE_MAX_SIZE: int = 10000
+    # Opt-in per-message rate limits for chatty INFO events (first N per window
+    # pass, the rest are summarised in one rollup record). Warnings and errors
+    # are never sampled.
+    LOG_SAMPLING_ENABLED: bool = False
+    LOG_SAMPLING_WINDOW_SECONDS: float = 60.0
+    LOG_SAMPLING_RULES: dict[str, int] = {
+        "Successfully sent bulk email to prospect": 10,
+        "Celery task START": 20,
+        "Celery task SUCCESS": 20,
+        "Inbound request received": 60,
+    }
+    # How often aggregated progress records (e.g. bulk send rollups) are emitted.
+    LOG_ROLLUP_INTERVAL_SECONDS: float = 30.0
+
+    # --- Metrics ---
+    # Off by default: recording and the web /metrics endpoint need Redis
+    # (METRICS_REDIS_URL); docker-compose turns it on for web and worker.
+    METRICS_ENABLED: bool = False
+    # Per-process increments are pushed to Redis this often.
+    METRICS_FLUSH_INTERVAL_SECONDS: float = 5.0
+    # Defaults to CELERY_BROKER_URL when unset.
+    METRICS_REDIS_URL: str | None = None
+
+    # --- Tracing ---
+    TRACING_ENABLED: bool = False
+    # "file" writes OTLP/JSON lines to TRACING_FILE_PATH; "memory" keeps spans in process.
+    TRACING_EXPORTER: str = "file"
+    TRACING_FILE_PATH: str = "traces/spans.jsonl"
+
+    # --- Profiling ---
+    # Opt-in sampling profiler; a task/request is profiled if its name/path is
+    # listed or it falls within PROFILE_SAMPLE_RATE (0.0-1.0).
+    PROFILING_ENABLED: bool = False
+    PROFILE_TASKS: list[str] = []
+    PROFILE_ROUTES: list[str] = []
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_DIR: str = "profiles"
+
+    @model_validator(mode="after")
+    def _require_api_keys(self):
+        if self.OFFLINE_MODE:
+            return self
+        missing = [
+            name
+            for name in ("OPENAI_API_KEY", "SENDGRID_API_KEY", "SLACK_BOT_TOKEN", "SLACK_CHANNEL_ID")
+            if not getattr(self, name)
+        ]
+        if missing:
+            raise ValueError(
+                f"Missing required settings: {', '.join(missing)} "
+                "(set OFFLINE_MODE=true to run against the local fake services)"
+            )
+        return self
+
+    @model_validator(mode="after")
+    def _check_campaign_claims(self):
+        # A re-dispatched shard must still see the first worker's claims.
+        if self.CAMPAIGN_CLAIM_TIMEOUT_SECONDS <= self.CAMPAIGN_SHARD_LEASE_SECONDS:
+            raise ValueError(
+                "CAMPAIGN_CLAIM_TIMEOUT_SECONDS must be longer than "
+                "CAMPAIGN_SHARD_LEASE_SECONDS"
+            )
+        return self
 
 # Create a single, importable instance of the settings
 settings = Settings()
@@ -0,0 +1,90 @@
+# app/conversation_context.py
+
+"""
+Bounded conversation context for the reply agents.
+
+The last CONVERSATION_RECENT_MESSAGES messages are passed verbatim and older
+ones are folded into a rolling summary stored on the conversation row. The
+summary is refreshed only once CONVERSATION_SUMMARY_BATCH messages have been
+pushed out of the verbatim window, so most replies reuse the stored summary
+and the prompt stays bounded however long the thread grows.
+"""
+
+import asyncio
+import json
+
+from .agent_registry import get_agent
+from .agent_runner import run_agent
+from .config import settings
+from .database import update_conversation_summary
+from .logging_config import logger
+
+
+def _compact(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def get_summarizer_agent():
+    return get_agent(
+        "Conversation_Summarizer",
+        settings.SUMMARY_AGENT_MODEL,
+        prompt_file="conversation_summarizer.txt",
+    )
+
+
+def _summarize(previous_summary: str | None, messages: list[dict]) -> str:
+    summarizer_input = _compact(
+        {"current_summary": previous_summary or "", "new_messages": messages}
+    )
+    return asyncio.run(
+        run_agent(get_summarizer_agent(), summarizer_input, stage="summarize")
+    )
+
+
+def build_conversation_context(conversation) -> str:
+    """
+    Returns the conversation as passed to the agents: the plain message list
+    for short threads, otherwise the summary plus the recent messages.
+    Refreshes the stored summary first when enough messages have aged out.
+    """
+    history = json.loads(conversation.conversation_history or "[]")
+    summary = conversation.summary
+    summarized = conversation.summarized_count or 0
+
+    # Messages outside the verbatim window not yet covered by the summary.
+    cutoff = max(len(history) - settings.CONVERSATION_RECENT_MESSAGES, 0)
+    if cutoff - summarized >= settings.CONVERSATION_SUMMARY_BATCH:
+        try:
+            summary = _summarize(summary, history[summarized:cutoff])
+            update_conversation_summary(
+                conversation.prospect_email, conversation.subject, summary, cutoff
+            )
+            logger.info(
+                {
+                    "message": "Conversation summary refreshed",
+                    "prospect_email": conversation.prospect_email,
+                    "summarized_count": cutoff,
+                    "messages": len(history),
+                }
+            )
+            summarized = cutoff
+        except Exception as e:
+            # Fall back to the previous summary and a longer verbatim tail.
+            logger.warning(
+                {
+                    "message": "Conversation summary refresh failed",
+                    "prospect_email": conversation.prospect_email,
+                    "error": str(e),
+                }
+            )
+
+    return format_context(history, summary, summarized)
+
+
+def format_context(history: list[dict], summary: str | None, summarized: int) -> str:
+    """The agent input for `history` whose first `summarized` messages are `summary`."""
+    if not summarized:
+        return _compact(history)
+    return _compact(
+        {"earlier_messages_summary": summary, "recent_messages": history[summarized:]}
+    )
@@ -1,25 +1,38 @@
 # app/database.py
 
 import json
+import secrets
+import threading
+from datetime import datetime, timedelta, timezone
 from sqlalchemy import (
     create_engine,
+    text,
     Column,
     String,
     Text,
     PrimaryKeyConstraint,
+    Index,
     Boolean,
+    Integer,
+    Float,
+    DateTime,
+    case,
+    select,
+    tuple_,
 )
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import sessionmaker, declarative_base
-from .utils import normalize_subject
 from .config import settings
 
 # Use environment variables to build the database URL
 DB_USER = settings.POSTGRES_USER
 DB_PASSWORD = settings.POSTGRES_PASSWORD
 DB_NAME = settings.POSTGRES_DB
-DB_HOST = "postgres"  # This is the service name from docker-compose.yml
+DB_HOST = settings.POSTGRES_HOST  # The service name from docker-compose.yml
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+DATABASE_URL = (
+    settings.DATABASE_URL or f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+)
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -34,33 +47,275 @@ class Conversation(Base):
     conversation_history = Column(Text, default="[]")
     # Flag to track if research has been performed for this thread.
     research_performed = Column(Boolean, default=False, nullable=False)
+    # Rolling summary of the first `summarized_count` messages of the history.
+    summary = Column(Text, nullable=True)
+    summarized_count = Column(Integer, default=0, nullable=False)
+    # When the next follow-up is due (NULL: none scheduled), how many have
+    # been sent, and the Message-ID of our latest email to thread it under.
+    next_action_at = Column(DateTime(timezone=True), nullable=True)
+    follow_up_count = Column(Integer, default=0, nullable=False)
+    last_message_id = Column(String, nullable=True)
 
     # Define a composite primary key
-    __table_args__ = (PrimaryKeyConstraint("prospect_email", "subject"),)
+    __table_args__ = (
+        PrimaryKeyConstraint("prospect_email", "subject"),
+        # Partial: only conversations with a follow-up scheduled are indexed,
+        # so finding due ones costs the same however many threads there are.
+        Index(
+            "ix_conversations_next_action_at",
+            "next_action_at",
+            postgresql_where=next_action_at.isnot(None),
+        ),
+    )
+
+
+class Draft(Base):
+    """
+    A versioned reply draft referenced from Slack buttons by its short ID.
+    Version 1 is the first generated draft; later versions (personalized
+    rewrite, rep edits) are stored alongside it.
+    """
+
+    __tablename__ = "drafts"
+    draft_id = Column(String(16), primary_key=True)
+    version = Column(Integer, primary_key=True)
+    prospect_email = Column(String, nullable=False)
+    reply_subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    author = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # Conversation key and the inbound Message-ID the draft answers, so the
+    # sent reply is threaded and recorded under the right conversation.
+    thread_subject = Column(String, nullable=True)
+    in_reply_to = Column(String, nullable=True)
+    # The References header to send: the inbound chain plus in_reply_to.
+    thread_references = Column(Text, nullable=True)
+
+    __table_args__ = (PrimaryKeyConstraint("draft_id", "version"),)
+
+
+class MessageIndex(Base):
+    """
+    Maps every Message-ID we send or receive to its conversation, so replies
+    are threaded by their In-Reply-To/References headers with one indexed
+    read instead of by subject.
+    """
+
+    __tablename__ = "message_index"
+    message_id = Column(String, primary_key=True)
+    prospect_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    # "outbound" or "inbound"
+    direction = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class AgentRun(Base):
+    """
+    One agent execution (or cache hit) with its token usage and wall time,
+    tied to the correlation ID and the prospect or campaign it served.
+    Aggregated by `python -m app.usage_report`.
+    """
+
+    __tablename__ = "agent_runs"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    correlation_id = Column(String, nullable=True, index=True)
+    stage = Column(String, nullable=False)
+    agent = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    prompt_hash = Column(String(16), nullable=True)
+    requests = Column(Integer, default=0, nullable=False)
+    input_tokens = Column(Integer, default=0, nullable=False)
+    output_tokens = Column(Integer, default=0, nullable=False)
+    wall_ms = Column(Float, nullable=False)
+    cache_hit = Column(Boolean, default=False, nullable=False)
+    error = Column(String, nullable=True)
+    # Model tier picked by `model_policy` ("full", "fast", "escalated"), if any.
+    tier = Column(String, nullable=True)
+    prospect_email = Column(String, nullable=True)
+    campaign_id = Column(String, nullable=True, index=True)
+
+
+class CampaignSend(Base):
+    """
+    Delivery state of one prospect in one campaign. Shard tasks claim a row
+    before sending, so redelivered or re-run shards never send twice.
+    """
+
+    __tablename__ = "campaign_sends"
+    campaign_id = Column(String, primary_key=True)
+    prospect_email = Column(String, primary_key=True)
+    # "pending" while a shard is sending, then "sent" or "failed".
+    status = Column(String, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (PrimaryKeyConstraint("campaign_id", "prospect_email"),)
+
+
+class Campaign(Base):
+    """
+    A campaign created through the campaign API (`app/campaigns.py`), with
+    its own prospect list, template, sender and concurrency limit.
+    """
+
+    __tablename__ = "campaigns"
+    id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    # queued -> planning -> running -> completed, or failed / cancelled.
+    status = Column(String, nullable=False, index=True)
+    subject = Column(Text, nullable=False)
+    body_template = Column(Text, nullable=False)
+    prospects_path = Column(String, nullable=False)
+    sender_email = Column(String, nullable=False)
+    sender_name = Column(String, nullable=False)
+    reply_to_email = Column(String, nullable=False)
+    # Shards of this campaign that may be sending at once.
+    max_concurrent_shards = Column(Integer, nullable=False)
+    shard_size = Column(Integer, nullable=False)
+    # Set once the prospect list has been validated and sharded.
+    total_prospects = Column(Integer, nullable=True)
+    rejected_prospects = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Round-robin position: the campaign served least recently goes first.
+    last_dispatched_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class CampaignShard(Base):
+    """
+    One slice of a campaign's validated prospect list (a JSON snapshot of
+    its rows), dispatched to the worker pool by the campaign scheduler.
+    """
+
+    __tablename__ = "campaign_shards"
+    campaign_id = Column(String, primary_key=True)
+    shard_index = Column(Integer, primary_key=True)
+    # pending -> sending -> done; a "sending" shard whose lease expired is
+    # handed out again.
+    status = Column(String, nullable=False)
+    prospects = Column(Text, nullable=False)
+    size = Column(Integer, nullable=False)
+    sent = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    skipped = Column(Integer, default=0, nullable=False)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("campaign_id", "shard_index"),
+        # Partial: the scheduler only ever looks at unfinished shards.
+        Index(
+            "ix_campaign_shards_active",
+            "status",
+            postgresql_where=status != "done",
+        ),
+    )
+
+
+class ReprocessResult(Base):
+    """
+    SDR output for one conversation in a reprocessing run
+    (`python -m app.reprocess`); runs under different prompts or models are
+    compared by joining on the conversation key.
+    """
+
+    __tablename__ = "reprocess_results"
+    run_id = Column(String, primary_key=True)
+    prospect_email = Column(String, primary_key=True)
+    subject = Column(String, primary_key=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    model = Column(String, nullable=False)
+    prompt_hash = Column(String(16), nullable=True)
+    classification = Column(String, nullable=True)
+    summary = Column(Text, nullable=True)
+    draft_reply = Column(Text, nullable=True)
+    wall_ms = Column(Float, nullable=True)
+    error = Column(String, nullable=True)
+
+    __table_args__ = (PrimaryKeyConstraint("run_id", "prospect_email", "subject"),)
+
+
+# Columns (and indexes) added after their table was first created.
+# `create_all` skips existing tables, so these are applied idempotently on
+# startup.
+ADDITIVE_COLUMNS = [
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary TEXT",
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS "
+    "summarized_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE drafts ADD COLUMN IF NOT EXISTS thread_subject VARCHAR",
+    "ALTER TABLE drafts ADD COLUMN IF NOT EXISTS in_reply_to VARCHAR",
+    "ALTER TABLE drafts ADD COLUMN IF NOT EXISTS thread_references TEXT",
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS "
+    "next_action_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS "
+    "follow_up_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message_id VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_conversations_next_action_at "
+    "ON conversations (next_action_at) WHERE next_action_at IS NOT NULL",
+    "ALTER TABLE agent_runs ADD COLUMN IF NOT EXISTS tier VARCHAR",
+]
 
 
 def init_db():
     # Add checkfirst=True to prevent errors if the table already exists
     Base.metadata.create_all(bind=engine, checkfirst=True)
+    with engine.begin() as connection:
+        for statement in ADDITIVE_COLUMNS:
+            connection.execute(text(statement))
+    # Not purge_expired_drafts: get_session would re-enter ensure_schema.
+    with SessionLocal() as db:
+        _delete_expired_drafts(db)
+        db.commit()
+
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def ensure_schema():
+    """
+    Runs `init_db` once per process, on first database use rather than at
+    import, so importing the app never needs a database round-trip.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            init_db()
+            _schema_ready = True
+
+
+def get_session():
+    """Returns a new session, making sure the schema exists first."""
+    ensure_schema()
+    return SessionLocal()
 
 
 def get_db():
-    db = SessionLocal()
+    db = get_session()
     try:
         yield db
     finally:
         db.close()
 
 
+# Conversations are keyed by (prospect_email, thread subject). The thread
+# subject is resolved by the caller (see `resolve_thread`) and used as-is.
+
+
 def add_message_to_conversation(
     prospect_email: str, subject: str, sender: str, message: str
 ):
     db = next(get_db())
-    normalized_subject = normalize_subject(subject)
     # Query now uses both email and subject
     conversation = (
         db.query(Conversation)
-        .filter_by(prospect_email=prospect_email, subject=normalized_subject)
+        .filter_by(prospect_email=prospect_email, subject=subject)
         .first()
     )
 
@@ -68,7 +323,7 @@ def add_message_to_conversation(
         # Be explicit on creation to ensure the field is never NULL
         conversation = Conversation(
             prospect_email=prospect_email,
-            subject=normalized_subject,
+            subject=subject,
             conversation_history="[]",
         )
         db.add(conversation)
@@ -77,7 +332,11 @@ def add_message_to_conversation(
     history_str = conversation.conversation_history
     history = json.loads(history_str) if history_str else []
     history.append({"sender": sender, "message": message})
-    conversation.conversation_history = json.dumps(history, indent=2)
+    # Stored compactly: the history is sent to the agents as-is.
+    conversation.conversation_history = json.dumps(history, separators=(",", ":"))
+    if sender == "prospect":
+        # The prospect answered: no more automatic follow-ups on this thread.
+        conversation.next_action_at = None
 
     db.commit()
     db.refresh(conversation)
@@ -85,12 +344,10 @@ def add_message_to_conversation(
 
 def get_conversation_history(prospect_email: str, subject: str) -> str:
     db = next(get_db())
-    # Normalize the subject to ensure consistent querying
-    normalized_subject = normalize_subject(subject)
     # Query now uses both email and subject
     conversation = (
         db.query(Conversation)
-        .filter_by(prospect_email=prospect_email, subject=normalized_subject)
+        .filter_by(prospect_email=prospect_email, subject=subject)
         .first()
     )
 
@@ -105,10 +362,9 @@ def get_conversation_history(prospect_email: str, subject: str) -> str:
 def mark_research_performed(prospect_email: str, subject: str):
     """Sets the research_performed flag to True for a conversation."""
     db = next(get_db())
-    normalized_subject = normalize_subject(subject)
     conversation = (
         db.query(Conversation)
-        .filter_by(prospect_email=prospect_email, subject=normalized_subject)
+        .filter_by(prospect_email=prospect_email, subject=subject)
         .first()
     )
 
@@ -119,3 +375,449 @@ def mark_research_performed(prospect_email: str, subject: str):
         return True
 
     return False
+
+
+def update_conversation_summary(
+    prospect_email: str, subject: str, summary: str, summarized_count: int
+) -> bool:
+    """
+    Stores a rolling summary covering the first `summarized_count` messages.
+    Never replaces a summary that already covers more of the thread (e.g.
+    one written concurrently by another worker).
+    """
+    with get_session() as db:
+        updated = (
+            db.query(Conversation)
+            .filter(
+                Conversation.prospect_email == prospect_email,
+                Conversation.subject == subject,
+                Conversation.summarized_count < summarized_count,
+            )
+            .update(
+                {"summary": summary, "summarized_count": summarized_count},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+    return bool(updated)
+
+
+def create_draft(
+    prospect_email: str,
+    reply_subject: str,
+    body: str,
+    author: str,
+    thread_subject: str | None = None,
+    in_reply_to: str | None = None,
+    thread_references: str | None = None,
+) -> str:
+    """Stores a new draft as version 1 and returns its short ID."""
+    now = datetime.now(timezone.utc)
+    draft_id = secrets.token_urlsafe(8)
+    with get_session() as db:
+        db.add(
+            Draft(
+                draft_id=draft_id,
+                version=1,
+                prospect_email=prospect_email,
+                reply_subject=reply_subject,
+                body=body,
+                author=author,
+                created_at=now,
+                expires_at=now + timedelta(hours=settings.DRAFT_TTL_HOURS),
+                thread_subject=thread_subject,
+                in_reply_to=in_reply_to,
+                thread_references=thread_references,
+            )
+        )
+        db.commit()
+    return draft_id
+
+
+def add_draft_version(draft_id: str, body: str, author: str) -> int | None:
+    """
+    Stores `body` as the next version of an existing draft and returns the new
+    version number, or None if the draft does not exist.
+    """
+    now = datetime.now(timezone.utc)
+    with get_session() as db:
+        latest = (
+            db.query(Draft)
+            .filter_by(draft_id=draft_id)
+            .order_by(Draft.version.desc())
+            .first()
+        )
+        if not latest:
+            return None
+        version = latest.version + 1
+        db.add(
+            Draft(
+                draft_id=draft_id,
+                version=version,
+                prospect_email=latest.prospect_email,
+                reply_subject=latest.reply_subject,
+                body=body,
+                author=author,
+                created_at=now,
+                expires_at=now + timedelta(hours=settings.DRAFT_TTL_HOURS),
+                thread_subject=latest.thread_subject,
+                in_reply_to=latest.in_reply_to,
+                thread_references=latest.thread_references,
+            )
+        )
+        db.commit()
+    return version
+
+
+def get_latest_draft(draft_id: str) -> Draft | None:
+    """Returns the newest unexpired version of a draft (a primary-key lookup)."""
+    with get_session() as db:
+        return (
+            db.query(Draft)
+            .filter(
+                Draft.draft_id == draft_id,
+                Draft.expires_at > datetime.now(timezone.utc),
+            )
+            .order_by(Draft.version.desc())
+            .first()
+        )
+
+
+def record_messages(rows: list[dict], direction: str):
+    """
+    Indexes Message-IDs under their conversation. `rows` hold message_id,
+    prospect_email and subject (the thread key); known IDs are left as-is.
+    """
+    if not rows:
+        return
+    now = datetime.now(timezone.utc)
+    statement = (
+        insert(MessageIndex)
+        .values(
+            [
+                {
+                    "message_id": row["message_id"],
+                    "prospect_email": row["prospect_email"],
+                    "subject": row["subject"],
+                    "direction": direction,
+                    "created_at": now,
+                }
+                for row in rows
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["message_id"])
+    )
+    with get_session() as db:
+        db.execute(statement)
+        db.commit()
+
+
+def resolve_thread(message_ids: list[str]) -> tuple[str, str] | None:
+    """
+    Returns the (prospect_email, thread subject) of the first of
+    `message_ids` that is indexed, or None if none are. Callers pass
+    In-Reply-To first, then References from newest to oldest.
+    """
+    if not message_ids:
+        return None
+    with get_session() as db:
+        rows = (
+            db.query(
+                MessageIndex.message_id,
+                MessageIndex.prospect_email,
+                MessageIndex.subject,
+            )
+            .filter(MessageIndex.message_id.in_(message_ids))
+            .all()
+        )
+    found = {row.message_id: (row.prospect_email, row.subject) for row in rows}
+    for message_id in message_ids:
+        if message_id in found:
+            return found[message_id]
+    return None
+
+
+def _delete_expired_drafts(db) -> int:
+    return (
+        db.query(Draft)
+        .filter(Draft.expires_at <= datetime.now(timezone.utc))
+        .delete(synchronize_session=False)
+    )
+
+
+def purge_expired_drafts() -> int:
+    with get_session() as db:
+        deleted = _delete_expired_drafts(db)
+        db.commit()
+    return deleted
+
+
+def record_agent_run(**fields):
+    with get_session() as db:
+        db.add(AgentRun(created_at=datetime.now(timezone.utc), **fields))
+        db.commit()
+
+
+def claim_campaign_sends(campaign_id: str, prospect_emails: list[str]) -> set[str]:
+    """
+    Marks the given prospects as being sent in this campaign and returns the
+    ones this caller may send to: new prospects, earlier failures, and
+    claims older than CAMPAIGN_CLAIM_TIMEOUT_SECONDS. Prospects already sent
+    (or being sent by another shard) are not returned.
+    """
+    if not prospect_emails:
+        return set()
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=settings.CAMPAIGN_CLAIM_TIMEOUT_SECONDS)
+    statement = insert(CampaignSend).values(
+        [
+            {
+                "campaign_id": campaign_id,
+                "prospect_email": email,
+                "status": "pending",
+                "updated_at": now,
+            }
+            for email in prospect_emails
+        ]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["campaign_id", "prospect_email"],
+        set_={"status": "pending", "updated_at": now},
+        where=(CampaignSend.status == "failed")
+        | (
+            (CampaignSend.status == "pending")
+            & (CampaignSend.updated_at < stale_before)
+        ),
+    ).returning(CampaignSend.prospect_email)
+    with get_session() as db:
+        claimed = {row.prospect_email for row in db.execute(statement)}
+        db.commit()
+    return claimed
+
+
+def mark_campaign_send(campaign_id: str, prospect_email: str, sent: bool):
+    with get_session() as db:
+        db.query(CampaignSend).filter_by(
+            campaign_id=campaign_id, prospect_email=prospect_email
+        ).update(
+            {
+                "status": "sent" if sent else "failed",
+                "updated_at": datetime.now(timezone.utc),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+def follow_up_due_at(follow_up_count: int, now: datetime) -> datetime | None:
+    """When follow-up number `follow_up_count` (0-based) is due, or None if done."""
+    delays = settings.FOLLOW_UP_DELAYS_HOURS
+    if follow_up_count >= len(delays):
+        return None
+    return now + timedelta(hours=delays[follow_up_count])
+
+
+def schedule_follow_up(
+    prospect_email: str,
+    subject: str,
+    last_message_id: str,
+    follow_up_count: int,
+    claimed_until: datetime | None = None,
+):
+    """
+    Records our latest email on a conversation and schedules follow-up
+    number `follow_up_count`, or ends the sequence once all were sent.
+    With `claimed_until` (the lease from `claim_due_follow_ups`) the next
+    follow-up is only scheduled if the lease still holds: a prospect reply
+    in the meantime has cleared it and must not be re-armed.
+    """
+    now = datetime.now(timezone.utc)
+    next_action_at = follow_up_due_at(follow_up_count, now)
+    if claimed_until is not None:
+        next_action_at = case(
+            (Conversation.next_action_at == claimed_until, next_action_at),
+            else_=Conversation.next_action_at,
+        )
+    with get_session() as db:
+        db.query(Conversation).filter_by(
+            prospect_email=prospect_email, subject=subject
+        ).update(
+            {
+                "next_action_at": next_action_at,
+                "follow_up_count": follow_up_count,
+                "last_message_id": last_message_id,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+def follow_up_claim_held(
+    prospect_email: str, subject: str, claimed_until: datetime
+) -> bool:
+    """False once a prospect reply (or anything else) replaced the claim's lease."""
+    with get_session() as db:
+        held = db.execute(
+            select(Conversation.prospect_email).where(
+                Conversation.prospect_email == prospect_email,
+                Conversation.subject == subject,
+                Conversation.next_action_at == claimed_until,
+            )
+        ).first()
+    return held is not None
+
+
+# The existing row's history has no message from the prospect.
+PROSPECT_NEVER_REPLIED = text(
+    "NOT (coalesce(nullif(conversations.conversation_history, ''), '[]')::jsonb"
+    ' @> \'[{"sender": "prospect"}]\')'
+)
+
+
+def start_follow_up_sequences(rows: list[dict]):
+    """
+    Creates (or restarts) the conversations for sent campaign emails so
+    their follow-ups are scheduled. `rows` hold prospect_email, subject
+    (the thread key), message (the email as sent) and message_id. A thread
+    the prospect has already replied on is left alone: its follow-ups
+    stay stopped.
+    """
+    # One row per conversation: a statement may not update a row twice.
+    rows = list({(row["prospect_email"], row["subject"]): row for row in rows}.values())
+    if not rows:
+        return
+    due_at = follow_up_due_at(0, datetime.now(timezone.utc))
+    statement = insert(Conversation).values(
+        [
+            {
+                "prospect_email": row["prospect_email"],
+                "subject": row["subject"],
+                "conversation_history": json.dumps(
+                    [{"sender": "sales_rep", "message": row["message"]}],
+                    separators=(",", ":"),
+                ),
+                "research_performed": False,
+                "summarized_count": 0,
+                "next_action_at": due_at,
+                "follow_up_count": 0,
+                "last_message_id": row["message_id"],
+            }
+            for row in rows
+        ]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["prospect_email", "subject"],
+        set_={
+            "next_action_at": statement.excluded.next_action_at,
+            "follow_up_count": 0,
+            "last_message_id": statement.excluded.last_message_id,
+        },
+        where=PROSPECT_NEVER_REPLIED,
+    )
+    with get_session() as db:
+        db.execute(statement)
+        db.commit()
+
+
+CLAIM_DUE_FOLLOW_UPS = text(
+    """
+    WITH due AS (
+        SELECT prospect_email, subject
+        FROM conversations
+        WHERE next_action_at IS NOT NULL AND next_action_at <= :now
+        ORDER BY next_action_at
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE conversations AS c
+    SET next_action_at = :lease_until
+    FROM due
+    WHERE c.prospect_email = due.prospect_email AND c.subject = due.subject
+    RETURNING c.*
+    """
+)
+
+
+def claim_due_follow_ups(limit: int) -> list[Conversation]:
+    """
+    Claims up to `limit` conversations whose follow-up is due, oldest first,
+    in one statement that reads only the due rows of the partial index.
+    Claimed rows are pushed out by FOLLOW_UP_LEASE_SECONDS, so concurrent
+    ticks skip them and a follow-up that is never sent is retried later.
+    Returns detached Conversation objects; their next_action_at is the
+    lease, which a prospect reply clears.
+    """
+    now = datetime.now(timezone.utc)
+    params = {
+        "now": now,
+        "limit": limit,
+        "lease_until": now + timedelta(seconds=settings.FOLLOW_UP_LEASE_SECONDS),
+    }
+    with get_session() as db:
+        rows = db.execute(CLAIM_DUE_FOLLOW_UPS, params).all()
+        db.commit()
+    return [Conversation(**row._mapping) for row in rows]
+
+
+def load_unprocessed_conversations(
+    run_id: str, after: tuple[str, str] | None = None, limit: int = 500
+) -> list:
+    """
+    The next `limit` conversations, in key order after `after` (the last
+    (prospect_email, subject) of the previous page), with no successful
+    result in reprocessing run `run_id`. Paging by key keeps each query
+    short and only one page in memory however many conversations there
+    are. Rows that failed in an earlier attempt of the run are returned
+    again.
+    """
+    done = (
+        select(ReprocessResult.prospect_email)
+        .where(
+            ReprocessResult.run_id == run_id,
+            ReprocessResult.prospect_email == Conversation.prospect_email,
+            ReprocessResult.subject == Conversation.subject,
+            ReprocessResult.error.is_(None),
+        )
+        .exists()
+    )
+    query = (
+        select(Conversation)
+        .where(~done)
+        .order_by(Conversation.prospect_email, Conversation.subject)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(
+            tuple_(Conversation.prospect_email, Conversation.subject) > tuple_(*after)
+        )
+    with get_session() as db:
+        return list(db.scalars(query))
+
+
+def save_reprocess_results(rows: list[dict]):
+    """Upserts reprocessing results, replacing earlier failed attempts."""
+    if not rows:
+        return
+    now = datetime.now(timezone.utc)
+    statement = insert(ReprocessResult).values(
+        [{"created_at": now, **row} for row in rows]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["run_id", "prospect_email", "subject"],
+        set_={
+            column: statement.excluded[column]
+            for column in (
+                "created_at",
+                "model",
+                "prompt_hash",
+                "classification",
+                "summary",
+                "draft_reply",
+                "wall_ms",
+                "error",
+            )
+        },
+    )
+    with get_session() as db:
+        db.execute(statement)
+        db.commit()
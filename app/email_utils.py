@@ -1,18 +1,48 @@
 # app/email_utils.py
 
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, ReplyTo
+from sendgrid.helpers.mail import Header, Mail, ReplyTo
 from .config import settings
+from .clients import get_sendgrid_client
 from .logging_config import logger
+from .metrics import track_stage
+from .send_controller import get_send_controller
+from .tracing import span
 import markdown2
 
 
-def send_single_email(to_email: str, subject: str, body: str):
+def add_thread_headers(
+    message: Mail,
+    message_id: str | None,
+    in_reply_to: str | None = None,
+    references: str | None = None,
+):
     """
-    Sends a single email using SendGrid.
+    Sets Message-ID and, for replies, In-Reply-To and References.
+    `references` is the full chain (see `utils.reply_references`); without
+    it the chain is just the parent.
+    """
+    if message_id:
+        message.add_header(Header("Message-ID", message_id))
+    if in_reply_to:
+        message.add_header(Header("In-Reply-To", in_reply_to))
+        message.add_header(Header("References", references or in_reply_to))
+
+
+def send_single_email(
+    to_email: str,
+    subject: str,
+    body: str,
+    message_id: str | None = None,
+    in_reply_to: str | None = None,
+    references: str | None = None,
+):
+    """
+    Sends a single email using SendGrid, retrying throttled and transient
+    failures through the shared send controller. `message_id`,
+    `in_reply_to` and `references` set the threading headers.
     """
     try:
-        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
+        sg = get_sendgrid_client()
         from_email_with_name = (settings.SENDER_EMAIL, settings.SENDER_NAME)
         reply_to_address = settings.REPLY_TO_EMAIL
 
@@ -26,8 +56,10 @@ def send_single_email(to_email: str, subject: str, body: str):
             html_content=html_body,
         )
         message.reply_to = ReplyTo(reply_to_address)
+        add_thread_headers(message, message_id, in_reply_to, references)
 
-        response = sg.send(message)
+        with track_stage("sendgrid_send"), span("sendgrid.send"):
+            response = get_send_controller().send(sg, message, to_email)
         logger.info(
             {
                 "message": "Successfully sent single email",
@@ -0,0 +1,10 @@
+# app/fakes/__init__.py
+
+"""
+Local stand-ins for the OpenAI, SendGrid, Tavily and Slack APIs, used when
+OFFLINE_MODE is enabled. Run with `python -m app.fakes`.
+"""
+
+from .server import create_app
+
+__all__ = ["create_app"]
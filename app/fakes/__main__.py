@@ -0,0 +1,14 @@
+# app/fakes/__main__.py
+
+from aiohttp import web
+
+from ..config import settings
+from ..logging_config import logger, setup_logging
+from .server import create_app
+
+if __name__ == "__main__":
+    setup_logging()
+    logger.info(
+        {"message": "Starting fake services", "port": settings.FAKE_SERVICES_PORT}
+    )
+    web.run_app(create_app(), port=settings.FAKE_SERVICES_PORT, print=None)
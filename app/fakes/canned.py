@@ -0,0 +1,165 @@
+# app/fakes/canned.py
+
+"""
+Canned OpenAI Responses API outputs.
+
+The agent's output schema (sent as `text.format.schema`) decides the payload:
+`SdrAnalysis`, `ResearchOutput` and `FinalReply` fields get realistic values,
+anything else gets a placeholder of the right JSON type. Tool use is emulated
+by calling every function tool the conversation has not called yet, then the
+first handoff, and only then answering.
+"""
+
+import json
+import random
+import secrets
+import time
+
+from ..config import settings
+
+CANNED_STRINGS = {
+    "summary": "The prospect is interested and asked about pricing for a small team.",
+    "draft_reply": (
+        "Hi there,\n\nThanks for getting back to me. Happy to walk you through "
+        "pricing and how teams like yours get started. Would a 20-minute call "
+        "this Thursday or Friday work?\n\nBest regards"
+    ),
+    "research_summary": (
+        "The company recently announced an initiative to automate its sales "
+        "operations with AI."
+    ),
+}
+
+CANNED_TEXT = (
+    "Subject: Automating your sales workflow\n\n"
+    "Hi {{FirstName}},\n\nI noticed {{Company}} is growing its sales team. "
+    "SovereignAI helps teams automate outreach and follow-ups with agents.\n\n"
+    "Open to a quick chat next week?"
+)
+
+HANDOFF_PREFIX = "transfer_to_"
+
+
+def _placeholder(key: str, schema: dict, rng: random.Random):
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return _placeholder(key, schema["anyOf"][0], rng)
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return _fill_object(schema, rng)
+    if kind == "array":
+        return []
+    if kind in ("integer", "number"):
+        if key == "confidence":
+            # Mostly confident, with a tail that exercises SDR escalation.
+            return round(rng.uniform(0.5, 1.0), 2)
+        return 0
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    if key == "classification":
+        weights = settings.FAKE_CLASSIFICATION_WEIGHTS
+        return rng.choices(list(weights), weights=list(weights.values()))[0]
+    return CANNED_STRINGS.get(key, f"Sample {key.replace('_', ' ')}")
+
+
+def _fill_object(schema: dict, rng: random.Random) -> dict:
+    return {
+        key: _placeholder(key, prop, rng)
+        for key, prop in schema.get("properties", {}).items()
+    }
+
+
+def _called_tools(input_items) -> set[str]:
+    if not isinstance(input_items, list):
+        return set()
+    return {
+        item.get("name")
+        for item in input_items
+        if isinstance(item, dict) and item.get("type") == "function_call"
+    }
+
+
+def _function_call(tool: dict, rng: random.Random) -> dict:
+    arguments = _fill_object(tool.get("parameters") or {}, rng)
+    return {
+        "type": "function_call",
+        "id": f"fc_{secrets.token_hex(12)}",
+        "call_id": f"call_{secrets.token_hex(12)}",
+        "name": tool["name"],
+        "arguments": json.dumps(arguments),
+        "status": "completed",
+    }
+
+
+def _message(text: str) -> dict:
+    return {
+        "type": "message",
+        "id": f"msg_{secrets.token_hex(12)}",
+        "status": "completed",
+        "role": "assistant",
+        "content": [{"type": "output_text", "text": text, "annotations": []}],
+    }
+
+
+def next_output_items(body: dict, rng: random.Random) -> list[dict]:
+    """Chooses the model's next output items for a Responses API request."""
+    tools = [t for t in body.get("tools") or [] if t.get("type") == "function"]
+    called = _called_tools(body.get("input"))
+
+    pending = [
+        t
+        for t in tools
+        if not t["name"].startswith(HANDOFF_PREFIX) and t["name"] not in called
+    ]
+    if pending:
+        return [_function_call(t, rng) for t in pending]
+    handoffs = [t for t in tools if t["name"].startswith(HANDOFF_PREFIX)]
+    if handoffs and not called.intersection(t["name"] for t in handoffs):
+        return [_function_call(handoffs[0], rng)]
+
+    schema = ((body.get("text") or {}).get("format") or {}).get("schema")
+    if schema:
+        return [_message(json.dumps(_fill_object(schema, rng)))]
+    return [_message(CANNED_TEXT)]
+
+
+def _estimate_tokens(value) -> int:
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return max(1, len(text) // 4)
+
+
+def build_response(body: dict, rng: random.Random) -> dict:
+    output = next_output_items(body, rng)
+    input_tokens = _estimate_tokens(body.get("input", "")) + _estimate_tokens(
+        body.get("instructions") or ""
+    )
+    output_tokens = _estimate_tokens(output)
+    return {
+        "id": f"resp_{secrets.token_hex(12)}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": body.get("model", "gpt-4o"),
+        "output": output,
+        "parallel_tool_calls": True,
+        "tool_choice": body.get("tool_choice", "auto"),
+        "tools": body.get("tools") or [],
+        "error": None,
+        "incomplete_details": None,
+        "instructions": body.get("instructions"),
+        "metadata": {},
+        "temperature": body.get("temperature"),
+        "top_p": body.get("top_p"),
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
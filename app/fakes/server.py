@@ -0,0 +1,154 @@
+# app/fakes/server.py
+
+"""
+aiohttp application serving the fake APIs, one path prefix per service:
+
+    /openai/v1/responses          OpenAI Responses API (canned outputs)
+    /sendgrid/v3/mail/send        SendGrid mail send
+    /tavily/search                Tavily search
+    /slack/api/<method>           Slack Web API (chat.postMessage, chat.update,
+                                  views.open, ...)
+
+Every request is delayed by a lognormal latency drawn per service and may be
+answered with a 5xx or a 429 (with Retry-After) at the configured rates.
+"""
+
+import asyncio
+import json
+import math
+import random
+import secrets
+import time
+
+from aiohttp import web
+
+from ..config import settings
+from ..logging_config import logger
+from .canned import build_response
+
+# Error bodies in each API's own shape, so client libraries raise their usual
+# exceptions.
+_RATE_LIMIT_BODIES = {
+    "openai": {
+        "error": {
+            "message": "Rate limit reached",
+            "type": "requests",
+            "code": "rate_limit_exceeded",
+        }
+    },
+    "sendgrid": {"errors": [{"message": "too many requests"}]},
+    "tavily": {"detail": {"error": "Rate limit exceeded"}},
+    "slack": {"ok": False, "error": "ratelimited"},
+}
+_SERVER_ERROR_BODIES = {
+    "openai": {"error": {"message": "The server had an error", "type": "server_error"}},
+    "sendgrid": {"errors": [{"message": "internal error"}]},
+    "tavily": {"detail": {"error": "Internal server error"}},
+    "slack": {"ok": False, "error": "internal_error"},
+}
+
+
+def _latency_seconds(service: str, rng: random.Random) -> float:
+    median_ms = settings.FAKE_LATENCY_MEDIAN_MS.get(service, 0.0)
+    if median_ms <= 0:
+        return 0.0
+    return median_ms * math.exp(rng.gauss(0.0, settings.FAKE_LATENCY_SIGMA)) / 1000
+
+
+@web.middleware
+async def _simulate_network(request: web.Request, handler):
+    service = request.path.strip("/").split("/", 1)[0]
+    rng = request.app["rng"]
+    await asyncio.sleep(_latency_seconds(service, rng))
+
+    roll = rng.random()
+    if roll < settings.FAKE_RATE_LIMIT_RATE:
+        return web.json_response(
+            _RATE_LIMIT_BODIES.get(service, {}),
+            status=429,
+            headers={"Retry-After": "1"},
+        )
+    if roll < settings.FAKE_RATE_LIMIT_RATE + settings.FAKE_ERROR_RATE:
+        return web.json_response(_SERVER_ERROR_BODIES.get(service, {}), status=503)
+    return await handler(request)
+
+
+async def _read_body(request: web.Request) -> dict:
+    if request.content_type == "application/json":
+        return await request.json()
+    form = await request.post()
+    return dict(form)
+
+
+async def openai_responses(request: web.Request) -> web.Response:
+    body = await request.json()
+    return web.json_response(build_response(body, request.app["rng"]))
+
+
+async def sendgrid_mail_send(request: web.Request) -> web.Response:
+    await request.read()
+    return web.Response(status=202, headers={"X-Message-Id": secrets.token_hex(11)})
+
+
+async def tavily_search(request: web.Request) -> web.Response:
+    body = await request.json()
+    query = body.get("query", "")
+    max_results = int(body.get("max_results") or 2)
+    results = [
+        {
+            "title": f"Result {i + 1} for {query}",
+            "url": f"https://example.com/articles/{secrets.token_hex(4)}",
+            "content": (
+                f"Coverage related to {query}: the company announced new "
+                "automation initiatives and expanded its sales organisation."
+            ),
+            "score": round(0.9 - i * 0.1, 2),
+            "raw_content": None,
+        }
+        for i in range(max_results)
+    ]
+    return web.json_response(
+        {
+            "query": query,
+            "answer": None,
+            "images": [],
+            "results": results,
+            "response_time": 0.0,
+        }
+    )
+
+
+async def slack_api(request: web.Request) -> web.Response:
+    method = request.match_info["method"]
+    body = await _read_body(request)
+    response = {"ok": True}
+    if method in ("chat.postMessage", "chat.update"):
+        channel = body.get("channel", "C00000000")
+        ts = body.get("ts") or f"{time.time():.6f}"
+        if isinstance(channel, str):
+            response.update({"channel": channel, "ts": ts})
+        response["message"] = {"text": body.get("text", ""), "ts": ts}
+    elif method == "views.open":
+        view = body.get("view")
+        if isinstance(view, str):
+            view = json.loads(view)
+        response["view"] = {"id": f"V{secrets.token_hex(5).upper()}", **(view or {})}
+    return web.json_response(response)
+
+
+def create_app() -> web.Application:
+    app = web.Application(middlewares=[_simulate_network])
+    app["rng"] = random.Random(settings.FAKE_SEED)
+    app.router.add_post("/openai/v1/responses", openai_responses)
+    app.router.add_post("/sendgrid/v3/mail/send", sendgrid_mail_send)
+    app.router.add_post("/tavily/search", tavily_search)
+    app.router.add_post("/slack/api/{method}", slack_api)
+    logger.info(
+        {
+            "message": "Fake services configured",
+            "latency_median_ms": settings.FAKE_LATENCY_MEDIAN_MS,
+            "error_rate": settings.FAKE_ERROR_RATE,
+            "rate_limit_rate": settings.FAKE_RATE_LIMIT_RATE,
+        }
+    )
+    return app
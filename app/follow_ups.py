@@ -0,0 +1,184 @@
+# app/follow_ups.py
+
+"""
+Automatic follow-ups for prospects who have not replied.
+
+Sending a campaign email or an approved reply schedules the conversation's
+next follow-up in `conversations.next_action_at` (see
+`database.schedule_follow_up`); a prospect reply clears it. Each beat tick
+claims only the due conversations, a batch at a time, through a partial
+index, writes their follow-ups with at most FOLLOW_UP_CONCURRENCY agent
+runs in flight, and sends them threaded under our previous email. A
+conversation whose prospect replied while its follow-up was being written
+is skipped and not re-armed.
+"""
+
+import asyncio
+
+from .agent_runner import run_agent
+from .config import settings
+from .conversation_context import build_conversation_context
+from .database import (
+    add_message_to_conversation,
+    claim_due_follow_ups,
+    follow_up_claim_held,
+    record_messages,
+    schedule_follow_up,
+)
+from .email_utils import send_single_email
+from .logging_config import logger
+from .reply_agent import FinalReply, get_follow_up_agent
+from .tracing import span
+from .usage import set_run_context
+from .utils import make_message_id, make_reply_subject
+
+
+def _follow_up_input(conversation, context: str) -> str:
+    number = conversation.follow_up_count + 1
+    total = len(settings.FOLLOW_UP_DELAYS_HOURS)
+    days = settings.FOLLOW_UP_DELAYS_HOURS[conversation.follow_up_count] / 24
+    return (
+        f"Conversation History: {context}\n"
+        f"Follow-up: {number} of {total}, {days:g} days after our last email"
+    )
+
+
+async def _write_follow_ups(inputs: list[str]) -> list:
+    """Runs the follow-up writer for each input, at most CONCURRENCY at once."""
+    semaphore = asyncio.Semaphore(settings.FOLLOW_UP_CONCURRENCY)
+    agent = get_follow_up_agent()
+
+    async def write(agent_input: str):
+        async with semaphore:
+            # Not cached: a repeated input must still get a fresh attempt.
+            return await run_agent(
+                agent, agent_input, stage="follow_up", use_cache=False
+            )
+
+    return await asyncio.gather(
+        *(write(agent_input) for agent_input in inputs), return_exceptions=True
+    )
+
+
+def _send_follow_up(conversation, draft: FinalReply) -> bool:
+    # The claim set next_action_at to the lease.
+    lease_until = conversation.next_action_at
+    message_id = make_message_id()
+    sent = send_single_email(
+        conversation.prospect_email,
+        make_reply_subject(conversation.subject),
+        draft.draft_reply,
+        message_id,
+        conversation.last_message_id,
+    )
+    if not sent:
+        # Left claimed: due again once the lease expires.
+        return False
+    record_messages(
+        [
+            {
+                "message_id": message_id,
+                "prospect_email": conversation.prospect_email,
+                "subject": conversation.subject,
+            }
+        ],
+        direction="outbound",
+    )
+    add_message_to_conversation(
+        conversation.prospect_email,
+        conversation.subject,
+        "sales_rep",
+        draft.draft_reply,
+    )
+    schedule_follow_up(
+        conversation.prospect_email,
+        conversation.subject,
+        message_id,
+        conversation.follow_up_count + 1,
+        claimed_until=lease_until,
+    )
+    return True
+
+
+def process_due_follow_ups() -> dict:
+    """
+    Claims one batch of due conversations, writes and sends their
+    follow-ups, and returns counts ("more" is set when the batch was full,
+    i.e. further conversations may be due).
+    """
+    with span("db.claim_follow_ups"):
+        conversations = claim_due_follow_ups(settings.FOLLOW_UP_BATCH_SIZE)
+    counts = {"claimed": len(conversations), "sent": 0, "failed": 0, "cancelled": 0}
+    more = len(conversations) == settings.FOLLOW_UP_BATCH_SIZE
+    # Sequences that FOLLOW_UP_DELAYS_HOURS has since been shortened to end.
+    for conversation in conversations:
+        if conversation.follow_up_count >= len(settings.FOLLOW_UP_DELAYS_HOURS):
+            schedule_follow_up(
+                conversation.prospect_email,
+                conversation.subject,
+                conversation.last_message_id,
+                conversation.follow_up_count,
+                claimed_until=conversation.next_action_at,
+            )
+    conversations = [
+        conversation
+        for conversation in conversations
+        if conversation.follow_up_count < len(settings.FOLLOW_UP_DELAYS_HOURS)
+    ]
+    if not conversations:
+        return {**counts, "more": more}
+
+    # Context building may refresh a summary (its own agent run), so it runs
+    # before the concurrent drafting.
+    inputs = [
+        _follow_up_input(conversation, build_conversation_context(conversation))
+        for conversation in conversations
+    ]
+    drafts = asyncio.run(_write_follow_ups(inputs))
+
+    for conversation, draft in zip(conversations, drafts):
+        set_run_context(prospect_email=conversation.prospect_email)
+        if isinstance(draft, BaseException):
+            counts["failed"] += 1
+            logger.error(
+                {
+                    "message": "Follow-up drafting failed",
+                    "prospect_email": conversation.prospect_email,
+                    "error": str(draft),
+                }
+            )
+            continue
+        if not follow_up_claim_held(
+            conversation.prospect_email,
+            conversation.subject,
+            conversation.next_action_at,
+        ):
+            counts["cancelled"] += 1
+            logger.info(
+                {
+                    "message": "Follow-up cancelled: the prospect replied",
+                    "prospect_email": conversation.prospect_email,
+                }
+            )
+            continue
+        try:
+            sent = _send_follow_up(conversation, draft)
+        except Exception as e:
+            sent = False
+            logger.error(
+                {
+                    "message": "Follow-up send failed",
+                    "prospect_email": conversation.prospect_email,
+                    "error": str(e),
+                }
+            )
+        counts["sent" if sent else "failed"] += 1
+        if sent:
+            logger.info(
+                {
+                    "message": "Follow-up sent",
+                    "prospect_email": conversation.prospect_email,
+                    "follow_up_number": conversation.follow_up_count + 1,
+                }
+            )
+    return {**counts, "more": more}
@@ -1,34 +1,55 @@
 # app/logging_config.py
 
+import atexit
+import json
 import logging
+import logging.handlers
+import math
+import os
+import queue
 import sys
+import threading
+import time
 import uuid
 import contextvars
 from pythonjsonlogger import jsonlogger
 from datetime import datetime, timezone
 from .config import settings
 
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is used otherwise
+    orjson = None
+
 # Context variable for correlation ID
 correlation_id_var = contextvars.ContextVar("correlation_id", default=None)
 
 SERVICE_NAME = getattr(settings, "SERVICE_NAME", "agentic-sales-copilot")
 APP_ENV = getattr(settings, "APP_ENV", "dev")
 
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+# or a filter and is emitted as a field.
+_RESERVED_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+}
+
 
 class CorrelationFilter(logging.Filter):
     def filter(self, record):
-        cid = correlation_id_var.get()
-        if cid:
-            record.correlation_id = cid
-        else:
-            record.correlation_id = None
+        # Runs on the calling thread, so it only captures what is context-local.
+        # Static fields are module constants and the timestamp is derived from
+        # `record.created` by the formatter.
+        record.correlation_id = correlation_id_var.get()
         record.service_name = SERVICE_NAME
         record.env = APP_ENV
-        # Use UTC timestamp; Logstash pipeline adds timezone offset as needed
-        record.utc_time = datetime.now(timezone.utc).isoformat()
         return True
 
 
+def _utc_isoformat(created: float) -> str:
+    return datetime.fromtimestamp(created, timezone.utc).isoformat()
+
+
 class ECSJsonFormatter(jsonlogger.JsonFormatter):
     def add_fields(self, log_record, record, message_dict):
         super().add_fields(log_record, record, message_dict)
@@ -43,22 +64,315 @@ class ECSJsonFormatter(jsonlogger.JsonFormatter):
             log_record["correlation.id"] = record.correlation_id
         # Provide @timestamp aligned to UTC
         if "@timestamp" not in log_record:
-            log_record["@timestamp"] = getattr(record, "utc_time")
+            log_record["@timestamp"] = _utc_isoformat(record.created)
         if "env" not in log_record:
             log_record["env"] = getattr(record, "env", APP_ENV)
 
 
+class FastECSJsonFormatter(logging.Formatter):
+    """
+    Produces the same fields as ECSJsonFormatter without python-json-logger's
+    per-record format-string parsing. The UTC second prefix of @timestamp is
+    cached, and orjson is used when installed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._cached_second = None
+        self._cached_prefix = ""
+
+    def _timestamp(self, created: float) -> str:
+        second = int(created)
+        if second != self._cached_second:
+            self._cached_prefix = time.strftime(
+                "%Y-%m-%dT%H:%M:%S", time.gmtime(second)
+            )
+            self._cached_second = second
+        return f"{self._cached_prefix}.{int((created - second) * 1e6):06d}+00:00"
+
+    def format(self, record):
+        if isinstance(record.msg, dict):
+            log_record = {"message": ""}
+            log_record.update(record.msg)
+        else:
+            log_record = {"message": record.getMessage()}
+        log_record.setdefault("filename", record.filename)
+        log_record.setdefault("funcName", record.funcName)
+        log_record.setdefault("lineno", record.lineno)
+
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_RECORD_ATTRS and key not in log_record:
+                log_record[key] = value
+        if record.exc_info:
+            log_record["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            log_record["stack_info"] = self.formatStack(record.stack_info)
+
+        log_record.setdefault("log.level", record.levelname)
+        log_record.setdefault("service.name", SERVICE_NAME)
+        correlation_id = getattr(record, "correlation_id", None)
+        if correlation_id:
+            log_record.setdefault("correlation.id", correlation_id)
+        log_record.setdefault("@timestamp", self._timestamp(record.created))
+        log_record.setdefault("env", APP_ENV)
+
+        if orjson is not None:
+            return orjson.dumps(
+                log_record, default=str, option=orjson.OPT_NON_STR_KEYS
+            ).decode()
+        return json.dumps(log_record, default=str, separators=(",", ":"))
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread untouched. The stock QueueHandler
+    formats the message on the calling thread in `prepare`, which is exactly
+    the cost this handler exists to avoid. When the queue is full, records are
+    dropped (and counted) instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _message_key(record: logging.LogRecord) -> str:
+    if isinstance(record.msg, dict):
+        return str(record.msg.get("message", ""))
+    return str(record.msg)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits chatty events per message key. Within each window the first
+    `limit` records for a key pass; the rest are counted and reported in one
+    rollup record once the window has ended, when the next record of any
+    key comes through (or on `flush`). Records at WARNING and above always
+    pass, as do keys without a rule.
+    """
+
+    def __init__(self, rules: dict[str, int], window_seconds: float):
+        super().__init__()
+        self._rules = rules
+        self._window = window_seconds
+        # key -> [window_start, seen, passed]
+        self._windows: dict[str, list] = {}
+        # When the oldest open window ends.
+        self._next_expiry = math.inf
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        now = time.monotonic()
+        if now >= self._next_expiry:
+            self._close_expired(now)
+        if record.levelno >= logging.WARNING:
+            return True
+        key = _message_key(record)
+        limit = self._rules.get(key)
+        if limit is None:
+            return True
+
+        closed = None
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self._window:
+                closed = window
+                window = self._windows[key] = [now, 0, 0]
+                self._next_expiry = min(self._next_expiry, now + self._window)
+            window[1] += 1
+            allowed = window[2] < limit
+            if allowed:
+                window[2] += 1
+        if closed is not None:
+            self._emit_rollup(key, closed, now)
+        return allowed
+
+    def flush(self):
+        now = time.monotonic()
+        with self._lock:
+            windows, self._windows = self._windows, {}
+            self._next_expiry = math.inf
+        for key, window in windows.items():
+            self._emit_rollup(key, window, now)
+
+    def _close_expired(self, now: float):
+        # Keys that went quiet are reported without waiting for their next
+        # record.
+        with self._lock:
+            expired = {
+                key: window
+                for key, window in self._windows.items()
+                if now - window[0] >= self._window
+            }
+            for key in expired:
+                del self._windows[key]
+            self._next_expiry = min(
+                (window[0] + self._window for window in self._windows.values()),
+                default=math.inf,
+            )
+        for key, window in expired.items():
+            self._emit_rollup(key, window, now)
+
+    def _emit_rollup(self, key: str, window: list, now: float):
+        window_start, seen, passed = window
+        if seen == passed:
+            return
+        logging.getLogger("agentic_sales_copilot.sampling").info(
+            {
+                "message": "Sampled log rollup",
+                "sampling.key": key,
+                "sampling.seen": seen,
+                "sampling.suppressed": seen - passed,
+                "sampling.window_s": round(now - window_start, 1),
+            }
+        )
+
+
+class EventRollup:
+    """
+    Aggregates a high-volume event stream into one log record per interval,
+    e.g. "Bulk email rollup: sent 1,000 emails in 42s, 3 failures". Call
+    `flush` when the stream ends so the tail is reported.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        action: str = "processed",
+        noun: str = "events",
+        interval_seconds: float | None = None,
+    ):
+        self.name = name
+        self.action = action
+        self.noun = noun
+        self.interval = (
+            settings.LOG_ROLLUP_INTERVAL_SECONDS
+            if interval_seconds is None
+            else interval_seconds
+        )
+        self.total = 0
+        self.total_failures = 0
+        self._count = 0
+        self._failures = 0
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, ok: bool = True):
+        with self._lock:
+            self._count += 1
+            self.total += 1
+            if not ok:
+                self._failures += 1
+                self.total_failures += 1
+            due = time.monotonic() - self._window_start >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            count, failures = self._count, self._failures
+            elapsed = time.monotonic() - self._window_start
+            self._count = self._failures = 0
+            self._window_start = time.monotonic()
+        if not count:
+            return
+        logger.info(
+            {
+                "message": (
+                    f"{self.name}: {self.action} {count - failures:,} {self.noun} "
+                    f"in {elapsed:.0f}s, {failures:,} failures"
+                ),
+                "rollup.name": self.name,
+                "rollup.count": count,
+                "rollup.failures": failures,
+                "rollup.elapsed_s": round(elapsed, 1),
+                "rollup.total": self.total,
+                "rollup.total_failures": self.total_failures,
+            }
+        )
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """
+    A QueueListener that can stop while its queue is full. The stock
+    `enqueue_sentinel` uses put_nowait and raises queue.Full on a saturated
+    queue; this one waits (up to `sentinel_timeout`) for the listener thread
+    to make room.
+    """
+
+    sentinel_timeout = 5.0
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel, timeout=self.sentinel_timeout)
+
+
+_sampling_filter: SamplingFilter | None = None
+_queue_handler: NonBlockingQueueHandler | None = None
+_output_handler: logging.Handler | None = None
+_listener: DrainingQueueListener | None = None
+
+
+def _start_listener():
+    global _listener
+    _listener = DrainingQueueListener(
+        _queue_handler.queue, _output_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def _restart_listener_after_fork():
+    # Threads do not survive fork (Celery prefork, gunicorn), so each child
+    # gets a fresh queue and its own listener thread.
+    if _listener is not None:
+        _queue_handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_MAX_SIZE)
+        _start_listener()
+
+
 def setup_logging():
     if getattr(setup_logging, "_configured", False):
         return
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
 
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = ECSJsonFormatter("%(message)s %(filename)s %(funcName)s %(lineno)d")
-    handler.setFormatter(formatter)
-    handler.addFilter(CorrelationFilter())
-    logger.handlers = [handler]
+    global _sampling_filter
+    if settings.LOG_SAMPLING_ENABLED:
+        _sampling_filter = SamplingFilter(
+            settings.LOG_SAMPLING_RULES, settings.LOG_SAMPLING_WINDOW_SECONDS
+        )
+
+    if settings.LOG_QUEUE_ENABLED:
+        global _queue_handler, _output_handler
+        _output_handler = logging.StreamHandler(sys.stdout)
+        _output_handler.setFormatter(FastECSJsonFormatter())
+        _queue_handler = NonBlockingQueueHandler(
+            queue.Queue(maxsize=settings.LOG_QUEUE_MAX_SIZE)
+        )
+        # The filter must run on the calling thread to see its correlation ID.
+        _queue_handler.addFilter(CorrelationFilter())
+        logger.handlers = [_queue_handler]
+        _start_listener()
+        os.register_at_fork(after_in_child=_restart_listener_after_fork)
+        atexit.register(shutdown_logging)
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+        formatter = ECSJsonFormatter("%(message)s %(filename)s %(funcName)s %(lineno)d")
+        handler.setFormatter(formatter)
+        handler.addFilter(CorrelationFilter())
+        logger.handlers = [handler]
+
+    if _sampling_filter is not None:
+        # Sample before the record is queued or formatted.
+        logger.handlers[0].addFilter(_sampling_filter)
+        atexit.register(_sampling_filter.flush)
 
     # Silence overly verbose third-party libs if needed
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -67,6 +381,39 @@ def setup_logging():
     setup_logging._configured = True
 
 
+def shutdown_logging():
+    """
+    Drains the logging queue and stops the listener thread. Records logged
+    afterwards are written synchronously so nothing emitted during interpreter
+    shutdown is lost. Pending sampling rollups are emitted first.
+    """
+    global _listener
+    if _sampling_filter is not None:
+        _sampling_filter.flush()
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    try:
+        listener.stop()
+    except queue.Full:
+        # The listener made no room in time; it is abandoned (a daemon
+        # thread) and the records still queued are lost.
+        pass
+
+    _output_handler.addFilter(CorrelationFilter())
+    if _sampling_filter is not None:
+        _output_handler.addFilter(_sampling_filter)
+    logging.getLogger().handlers = [_output_handler]
+    if _queue_handler.dropped:
+        logger.warning(
+            {
+                "message": "Log records dropped because the logging queue was full",
+                "dropped": _queue_handler.dropped,
+            }
+        )
+    _output_handler.flush()
+
+
 logger = logging.getLogger("agentic_sales_copilot")
 
 
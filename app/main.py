@@ -2,76 +2,244 @@
 
 # Standard library imports
 import asyncio
+import concurrent.futures
+import contextvars
 import csv
+import itertools
+import threading
+import time
+import uuid
+from typing import NamedTuple
+
 import markdown2
-from agents import Agent, Runner, trace, function_tool
-from sendgrid import SendGridAPIClient
+from agents import Agent, trace, function_tool
 from sendgrid.helpers.mail import Mail, ReplyTo
 
 # Local application imports
-from .prompt_loader import load_prompt
+from .agent_registry import get_agent, agent_version
+from .agent_runner import agent_tool, run_agent
 from .config import settings
-from .logging_config import logger, setup_logging
+from .campaigns import campaign_progress
+from .celery_app import send_campaign_shard, summarize_campaign
+from .clients import get_sendgrid_client, configure_openai
+from .database import record_messages, start_follow_up_sequences
+from .email_utils import add_thread_headers
+from .logging_config import logger, setup_logging, EventRollup, get_correlation_id
+from .metrics import track_stage
+from .prospects import ValidationReport, iter_valid_prospects, template_fields
+from .send_controller import get_send_controller
+from .tracing import span
+from .usage import campaign_id_var, set_run_context
+from .utils import make_message_id, normalize_subject
 
 setup_logging()
+configure_openai()
 
 
-@function_tool
-def send_personalized_bulk_email(subject: str, body_template: str):
+def personalize(template: str, prospect: dict) -> str:
+    """Replaces each {{Column}} placeholder with the prospect's value."""
+    for key, value in prospect.items():
+        # This prevents errors if the CSV has trailing commas.
+        if key is None:
+            continue
+        template = template.replace(
+            "{{" + key + "}}", value if value is not None else ""
+        )
+    return template
+
+
+def iter_prospects(path: str):
+    """Streams prospect rows from the CSV instead of loading the whole file."""
+    with open(path, mode="r", encoding="utf-8", newline="") as infile:
+        yield from csv.DictReader(infile)
+
+
+class SenderIdentity(NamedTuple):
+    email: str
+    name: str
+    reply_to: str
+
+
+def default_sender() -> SenderIdentity:
+    return SenderIdentity(
+        settings.SENDER_EMAIL, settings.SENDER_NAME, settings.REPLY_TO_EMAIL
+    )
+
+
+def build_campaign_message(
+    prospect: dict,
+    subject: str,
+    body_template: str,
+    message_id: str | None = None,
+    sender: SenderIdentity | None = None,
+) -> Mail:
     """
-    This is the pure Python logic for sending the email campaign using SendGrid.
+    Renders the personalized subject and markdown body into a SendGrid Mail
+    from `sender` (the configured sender by default).
     """
-    logger.info({"message": "Running Mail Merge Tool", "subject_template": subject})
-    try:
-        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
-        from_email_with_name = (settings.SENDER_EMAIL, settings.SENDER_NAME)
-        inbound_reply_address = settings.REPLY_TO_EMAIL
+    sender = sender or default_sender()
+    message = Mail(
+        from_email=(sender.email, sender.name),
+        to_emails=prospect["Email"],
+        subject=personalize(subject, prospect),
+        html_content=markdown2.markdown(personalize(body_template, prospect)),
+    )
+    message.reply_to = ReplyTo(sender.reply_to)
+    add_thread_headers(message, message_id)
+    return message
 
-        with open(settings.PROSPECTS_CSV_PATH, mode="r", encoding="utf-8") as infile:
-            reader = csv.DictReader(infile)
-            prospects = list(reader)
 
-            for prospect in prospects:
-                personalized_body_md = body_template
-                personalized_subject = subject
-
-                for key, value in prospect.items():
-                    # This prevents errors if the CSV has trailing commas.
-                    if key is None:
-                        continue
-                    placeholder_to_find = "{{" + key + "}}"
-                    value_to_use = value if value is not None else ""
-                    personalized_subject = personalized_subject.replace(
-                        placeholder_to_find, value_to_use
-                    )
-                    personalized_body_md = personalized_body_md.replace(
-                        placeholder_to_find, value_to_use
-                    )
+class OutboundMessageIndex:
+    """
+    Records the Message-IDs of sent campaign emails in the message index in
+    batches, so replies to them are threaded by header, and (when follow-ups
+    are enabled) starts each prospect's follow-up sequence. Use `add` as
+    (part of) `send_campaign`'s `on_result` and call `flush` when done.
+    """
+
+    def __init__(self, subject_template: str, body_template: str, batch_size=500):
+        self.subject_template = subject_template
+        self.body_template = body_template
+        self.batch_size = batch_size
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def add(self, prospect: dict, ok: bool, message_id: str):
+        if not ok:
+            return
+        row = {
+            "message_id": message_id,
+            "prospect_email": prospect["Email"],
+            "subject": normalize_subject(personalize(self.subject_template, prospect)),
+        }
+        if settings.FOLLOW_UP_ENABLED:
+            # Becomes the first message of the conversation's history.
+            row["message"] = personalize(self.body_template, prospect)
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) < self.batch_size:
+                return
+            rows, self._rows = self._rows, []
+        self._record(rows)
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        self._record(rows)
+
+    def _record(self, rows: list[dict]):
+        try:
+            record_messages(rows, direction="outbound")
+        except Exception as e:
+            # Replies to these emails fall back to subject threading.
+            logger.warning(
+                {"message": "Error indexing campaign messages", "error": str(e)}
+            )
+        if not settings.FOLLOW_UP_ENABLED:
+            return
+        try:
+            start_follow_up_sequences(rows)
+        except Exception as e:
+            logger.warning(
+                {"message": "Error scheduling campaign follow-ups", "error": str(e)}
+            )
+
 
-                personalized_body_html = markdown2.markdown(personalized_body_md)
+def send_campaign(
+    subject: str,
+    body_template: str,
+    prospects,
+    sg=None,
+    on_result=None,
+    sender: SenderIdentity | None = None,
+) -> dict:
+    """
+    Sends the personalized campaign to every prospect in `prospects` (any
+    iterable of CSV rows) and returns the status dict reported to the agent,
+    including "sent" and "failed" counts. Emails come from `sender` (the
+    configured sender by default) and each gets a new Message-ID;
+    `on_result(prospect, ok, message_id)` is called (from a send thread)
+    after each send.
+
+    Messages are rendered on the calling thread and sent from a pool of
+    SEND_MAX_CONCURRENCY threads; the send controller decides how many
+    actually run at once, paces recipient domains and retries throttled
+    sends. A send that still fails is logged and skipped; the rest of the
+    list still goes out.
+    """
+    rollup = EventRollup("Bulk email rollup", action="sent", noun="emails")
+    controller = get_send_controller()
+
+    def send_one(prospect: dict, message: Mail, message_id: str):
+        try:
+            with track_stage("sendgrid_send"), span("sendgrid.send"):
+                response = controller.send(sg, message, prospect["Email"])
+        except Exception as e:
+            rollup.record(ok=False)
+            logger.error(
+                {
+                    "message": "Error sending bulk email to prospect",
+                    "prospect_email": prospect["Email"],
+                    "error": str(e),
+                }
+            )
+            if on_result:
+                on_result(prospect, False, message_id)
+            return
+        rollup.record(ok=True)
+        if on_result:
+            on_result(prospect, True, message_id)
+        logger.info(
+            {
+                "message": "Successfully sent bulk email to prospect",
+                "prospect_email": prospect["Email"],
+                "status_code": response.status_code,
+            }
+        )
 
-                message = Mail(
-                    from_email=from_email_with_name,
-                    to_emails=prospect["Email"],
-                    subject=personalized_subject,
-                    html_content=personalized_body_html,
+    try:
+        sg = sg or get_sendgrid_client()
+        workers = settings.SEND_MAX_CONCURRENCY
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="campaign-send"
+        ) as pool:
+            # Bounded look-ahead so large lists are never rendered up front.
+            pending = set()
+            for prospect in prospects:
+                message_id = make_message_id()
+                message = build_campaign_message(
+                    prospect, subject, body_template, message_id, sender
                 )
-                message.reply_to = ReplyTo(inbound_reply_address)
-
-                response = sg.send(message)
-                logger.info(
-                    {
-                        "message": "Successfully sent bulk email to prospect",
-                        "prospect_email": prospect["Email"],
-                        "status_code": response.status_code,
-                    }
+                # Carry the correlation ID and span context into the pool.
+                context = contextvars.copy_context()
+                pending.add(
+                    pool.submit(context.run, send_one, prospect, message, message_id)
                 )
+                if len(pending) >= 2 * workers:
+                    _, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+            concurrent.futures.wait(pending)
 
+        rollup.flush()
+        sent = rollup.total - rollup.total_failures
+        counts = {"sent": sent, "failed": rollup.total_failures}
+        if rollup.total_failures:
+            return {
+                "status": "partial_success",
+                "message": (
+                    f"Emails sent to {sent} of {rollup.total} prospects; "
+                    f"{rollup.total_failures} failed."
+                ),
+                **counts,
+            }
         return {
             "status": "success",
-            "message": f"Emails successfully sent to {len(prospects)} prospects.",
+            "message": f"Emails successfully sent to {rollup.total} prospects.",
+            **counts,
         }
     except Exception as e:
+        rollup.flush()
         logger.error(
             {
                 "message": "An error occurred in the bulk email tool",
@@ -85,81 +253,212 @@ def send_personalized_bulk_email(subject: str, body_template: str):
         }
 
 
-async def run_autonomous_sales_workflow():
-    logger.info({"message": "Starting autonomous sales workflow..."})
-
-    sender_instructions = "You are a specialized agent responsible for executing email campaigns. You will receive the subject and body of an email, and your only job is to use the `send_personalized_bulk_email` tool to send it."
-    campaign_sender_agent = Agent(
-        name="Campaign_Sender_Agent",
-        instructions=sender_instructions,
-        tools=[send_personalized_bulk_email],
-        model=settings.CAMPAIGN_SENDER_MODEL,
+def dispatch_campaign(
+    campaign_id: str, subject: str, body_template: str, prospects
+) -> dict:
+    """
+    Hands the campaign to the worker pool: prospects are split into shards
+    of CAMPAIGN_SHARD_SIZE rows, each queued as a `send_campaign_shard` task
+    as soon as it is read, so only one shard is held in memory. Returns once
+    every shard is queued; `summarize_campaign` logs the totals when the
+    last shard is done and `get_campaign_progress` reports them meanwhile.
+    """
+    shards = prospects_queued = 0
+    try:
+        correlation_id = get_correlation_id()
+        for rows in itertools.batched(prospects, settings.CAMPAIGN_SHARD_SIZE):
+            send_campaign_shard.delay(
+                campaign_id,
+                shards,
+                subject,
+                body_template,
+                list(rows),
+                correlation_id=correlation_id,
+            )
+            shards += 1
+            prospects_queued += len(rows)
+        if not shards:
+            return {"status": "success", "message": "No prospects to send to."}
+        summarize_campaign.apply_async(
+            (campaign_id, shards, time.time()),
+            {"correlation_id": correlation_id},
+            countdown=settings.CAMPAIGN_SUMMARY_INTERVAL_SECONDS,
+        )
+        logger.info(
+            {
+                "message": "Campaign shards dispatched",
+                "campaign_id": campaign_id,
+                "shards": shards,
+                "prospects": prospects_queued,
+            }
+        )
+        return {
+            "status": "success",
+            "message": (
+                f"Campaign {campaign_id} queued for {prospects_queued} prospects "
+                f"in {shards} shards; the worker pool is sending it. Its sent, "
+                "failed and skipped totals are available from "
+                "`get_campaign_progress`."
+            ),
+            "campaign_id": campaign_id,
+            "shards": shards,
+            "prospects": prospects_queued,
+        }
+    except Exception as e:
+        logger.error(
+            {
+                "message": "Error dispatching campaign shards",
+                "campaign_id": campaign_id,
+                "error_type": type(e).__name__,
+                "error": str(e),
+            }
+        )
+        return {
+            "status": "error",
+            "message": (
+                f"Failed to dispatch email campaign {campaign_id} after "
+                f"{shards} shards: {e}. Prospects already sent will be "
+                "skipped if it is run again."
+            ),
+        }
+
+
+@function_tool
+def get_campaign_progress(campaign_id: str):
+    """
+    Returns the sent, failed, skipped and still-sending counts of a campaign
+    queued for the worker pool, and how many of its shards are done.
+    """
+    try:
+        return {"status": "success", **campaign_progress(campaign_id)}
+    except Exception as e:
+        logger.error(
+            {
+                "message": "Error reading campaign progress",
+                "campaign_id": campaign_id,
+                "error_type": type(e).__name__,
+                "error": str(e),
+            }
+        )
+        return {
+            "status": "error",
+            "message": f"Could not read the progress of campaign {campaign_id}: {e}",
+        }
+
+
+@function_tool
+def send_personalized_bulk_email(subject: str, body_template: str):
+    """
+    This is the pure Python logic for sending the email campaign using SendGrid.
+    """
+    logger.info({"message": "Running Mail Merge Tool", "subject_template": subject})
+    path = settings.PROSPECTS_CSV_PATH
+    report = None
+    if settings.PROSPECTS_PREFLIGHT_ENABLED:
+        # Only normalized, unique, well-formed prospects with every field the
+        # templates use are sent; the report is complete once they are consumed.
+        report = ValidationReport(path, template_fields(subject, body_template))
+        prospects = iter_valid_prospects(path, report)
+    else:
+        prospects = iter_prospects(path)
+
+    if settings.CAMPAIGN_FANOUT_ENABLED:
+        campaign_id = campaign_id_var.get() or uuid.uuid4().hex[:12]
+        result = dispatch_campaign(campaign_id, subject, body_template, prospects)
+    else:
+        index = OutboundMessageIndex(subject, body_template)
+        result = send_campaign(subject, body_template, prospects, on_result=index.add)
+        index.flush()
+
+    if report:
+        stats = {k: v for k, v in report.as_dict().items() if k != "samples"}
+        logger.info({"message": "Prospect list validated", **stats})
+        if report.missing_columns:
+            result["message"] += (
+                " The prospect list has no column for: "
+                f"{', '.join(report.missing_columns)}."
+            )
+        elif report.rejected:
+            result["message"] += f" Pre-flight check: {report.summary()}."
+    return result
+
+
+SENDER_INSTRUCTIONS = "You are a specialized agent responsible for executing email campaigns. You will receive the subject and body of an email, and your only job is to use the `send_personalized_bulk_email` tool to send it. If the campaign was queued for the worker pool, use `get_campaign_progress` with its campaign_id to report the sent, failed and skipped totals."
+WRITER_PROMPTS = {
+    "Professional_Sales_Agent": "professional_sales_agent.txt",
+    "Engaging_Sales_Agent": "engaging_sales_agent.txt",
+    "Busy_Sales_Agent": "busy_sales_agent.txt",
+}
+
+
+def get_sales_manager() -> Agent:
+    """
+    Returns the Sales Manager and its team from the agent registry. Prompts
+    are read once and agents are rebuilt only when a prompt file changes.
+    """
+    campaign_sender_agent = get_agent(
+        "Campaign_Sender_Agent",
+        settings.CAMPAIGN_SENDER_MODEL,
+        instructions=SENDER_INSTRUCTIONS,
+        tools=[send_personalized_bulk_email, get_campaign_progress],
         handoff_description="Use this agent to send the final, approved email campaign to the prospect list.",
     )
 
-    # Using f-strings to inject settings directly into the loaded prompts
-    instructions1 = load_prompt("professional_sales_agent.txt").format(
-        sales_rep_name=settings.SALES_REP_NAME
-    )
-    instructions2 = load_prompt("engaging_sales_agent.txt").format(
-        sales_rep_name=settings.SALES_REP_NAME
-    )
-    instructions3 = load_prompt("busy_sales_agent.txt").format(
-        sales_rep_name=settings.SALES_REP_NAME
-    )
+    # Inject settings directly into the loaded prompts
+    sales_agents = [
+        get_agent(
+            name,
+            settings.WRITER_AGENT_MODEL,
+            prompt_file=prompt_file,
+            prompt_vars={"sales_rep_name": settings.SALES_REP_NAME},
+        )
+        for name, prompt_file in WRITER_PROMPTS.items()
+    ]
 
-    sales_agent1 = Agent(
-        name="Professional_Sales_Agent",
-        instructions=instructions1,
-        model=settings.WRITER_AGENT_MODEL,
-    )
-    sales_agent2 = Agent(
-        name="Engaging_Sales_Agent",
-        instructions=instructions2,
-        model=settings.WRITER_AGENT_MODEL,
-    )
-    sales_agent3 = Agent(
-        name="Busy_Sales_Agent",
-        instructions=instructions3,
-        model=settings.WRITER_AGENT_MODEL,
+    # Create a new, specialized Selector Agent
+    email_selector_agent = get_agent(
+        "Email_Selector_Agent",
+        settings.MANAGER_AGENT_MODEL,  # Use a powerful model for decision making
+        prompt_file="email_selector.txt",
     )
 
     description = (
         """Write a complete cold sales email, including a subject line and a body."""
     )
-
-    tool1 = sales_agent1.as_tool(
-        tool_name="Professional_Sales_Agent", tool_description=description
-    )
-    tool2 = sales_agent2.as_tool(
-        tool_name="Engaging_Sales_Agent", tool_description=description
-    )
-    tool3 = sales_agent3.as_tool(
-        tool_name="Busy_Sales_Agent", tool_description=description
+    tools = [
+        agent_tool(agent, agent.name, description, stage="campaign_writer")
+        for agent in sales_agents
+    ]
+    tools.append(
+        agent_tool(
+            email_selector_agent,
+            "Email_Selector",
+            "Use this tool to select the single best email draft from a list of options.",
+            stage="campaign_selector",
+        )
     )
 
-    # Create a new, specialized Selector Agent
-    selector_instructions = load_prompt("email_selector.txt")
-    email_selector_agent = Agent(
-        name="Email_Selector_Agent",
-        instructions=selector_instructions,
-        model=settings.MANAGER_AGENT_MODEL,  # Use a powerful model for decision making
-    )
-    selector_tool = email_selector_agent.as_tool(
-        tool_name="Email_Selector",
-        tool_description="Use this tool to select the single best email draft from a list of options.",
+    # The manager is rebuilt whenever one of its tools or handoffs changes.
+    team = [*sales_agents, email_selector_agent, campaign_sender_agent]
+    return get_agent(
+        "Sales_Manager",
+        settings.MANAGER_AGENT_MODEL,
+        prompt_file="sales_manager.txt",
+        version_key=tuple(agent_version(agent) for agent in team),
+        tools=tools,
+        handoffs=[campaign_sender_agent],
     )
 
-    # Update the Sales Manager's instructions and tools
-    sales_manager_instructions = load_prompt("sales_manager.txt")
-    sales_manager = Agent(
-        name="Sales_Manager",
-        instructions=sales_manager_instructions,
-        tools=[tool1, tool2, tool3, selector_tool],
-        handoffs=[campaign_sender_agent],
-        model=settings.MANAGER_AGENT_MODEL,
+
+async def run_autonomous_sales_workflow():
+    campaign_id = uuid.uuid4().hex[:12]
+    set_run_context(campaign_id=campaign_id)
+    logger.info(
+        {"message": "Starting autonomous sales workflow...", "campaign_id": campaign_id}
     )
 
+    sales_manager = get_sales_manager()
+
     initial_prompt = """
     You are master orchestrator for running email campaign for SovereignAI. A company that sells agentic AI based solutions to bring autonomy and automation in business processes.
     Target companies or businesses that are in tech industry and looking for AI automation to increase their productivity.
@@ -167,7 +466,10 @@ async def run_autonomous_sales_workflow():
     """
 
     with trace("Autonomous_Sales_Campaign_with_Handoff_v3"):
-        await Runner.run(sales_manager, initial_prompt)
+        # Never cached: the run sends the campaign.
+        await run_agent(
+            sales_manager, initial_prompt, stage="sales_manager", use_cache=False
+        )
 
     logger.info(
         {"message": "Workflow Complete. Finalized cold sales email sent to prospects"}
@@ -0,0 +1,359 @@
+# app/metrics.py
+
+"""
+Prometheus-style metrics shared by the web server and Celery workers.
+
+Each process accumulates counter and histogram increments in memory and a
+background thread flushes them to one Redis hash every
+METRICS_FLUSH_INTERVAL_SECONDS. On the same tick it stores its process
+gauges (DB pool usage) in a hash of its own, labelled with
+instance="<host>:<pid>", which expires once the process stops reporting.
+The web server's `/metrics` renders all of it; deployment gauges (queue
+depth) are read at scrape time.
+"""
+
+import atexit
+import math
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import redis
+
+from .config import settings
+from .logging_config import logger
+
+PREFIX = "sales_copilot_"
+REDIS_KEY = "metrics:samples"
+PROCESS_KEY_PREFIX = "metrics:process:"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample_name(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return f"{name}{{{rendered}}}"
+
+
+class _Buffer:
+    """Per-process pending increments, keyed by rendered sample name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict[str, float] = {}
+        self._pid = None
+        self._stop = threading.Event()
+
+    def add(self, sample: str, amount: float):
+        self._ensure_flusher()
+        with self._lock:
+            self._pending[sample] = self._pending.get(sample, 0.0) + amount
+
+    def start(self):
+        self._ensure_flusher()
+
+    def started_here(self) -> bool:
+        return self._pid == os.getpid()
+
+    def _ensure_flusher(self):
+        # Threads do not survive fork, so each process starts its own flusher.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pending = {}
+            self._pid = os.getpid()
+            threading.Thread(
+                target=self._run, name="metrics-flusher", daemon=True
+            ).start()
+
+    def _run(self):
+        while not self._stop.wait(settings.METRICS_FLUSH_INTERVAL_SECONDS):
+            self.flush()
+
+    def flush(self):
+        if self._pid != os.getpid():
+            # Nothing recorded in this process yet (pending data, if any, is
+            # a copy inherited from the parent and is flushed there).
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        gauges = _process_samples()
+        if not pending and not gauges:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for sample, amount in pending.items():
+                pipe.hincrbyfloat(REDIS_KEY, sample, amount)
+            if gauges:
+                key = _process_key()
+                pipe.delete(key)
+                pipe.hset(key, mapping=gauges)
+                # A process that stopped reporting drops out of /metrics.
+                pipe.expire(
+                    key, max(30, int(3 * settings.METRICS_FLUSH_INTERVAL_SECONDS))
+                )
+            pipe.execute()
+        except Exception as e:
+            # Keep the increments for the next attempt.
+            with self._lock:
+                for sample, amount in pending.items():
+                    self._pending[sample] = self._pending.get(sample, 0.0) + amount
+            logger.warning({"message": "Error flushing metrics", "error": str(e)})
+
+
+_buffer = _Buffer()
+_registry: dict[str, "_Metric"] = {}
+_redis_client = None
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            settings.METRICS_REDIS_URL or settings.CELERY_BROKER_URL
+        )
+    return _redis_client
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        _registry[self.name] = self
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if settings.METRICS_ENABLED:
+            _buffer.add(_sample_name(self.name, labels), amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        # Buckets are stored cumulatively, as the exposition format expects.
+        for bound in self.buckets:
+            if value <= bound:
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                _buffer.add(
+                    _sample_name(f"{self.name}_bucket", {**labels, "le": le}), 1
+                )
+        _buffer.add(_sample_name(f"{self.name}_sum", labels), value)
+        _buffer.add(_sample_name(f"{self.name}_count", labels), 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Gauge(_Metric):
+    """A deployment-wide gauge whose value is read by `collect` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect):
+        super().__init__(name, documentation)
+        self.collect = collect
+
+
+class ProcessGauge(Gauge):
+    """
+    A gauge of one process's own state (e.g. its DB pool). Every process
+    reports `collect` on each flush, labelled with its instance.
+    """
+
+
+def _process_key() -> str:
+    return f"{PROCESS_KEY_PREFIX}{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_samples() -> dict[str, float]:
+    instance = f"{socket.gethostname()}:{os.getpid()}"
+    samples = {}
+    for name, metric in _registry.items():
+        if not isinstance(metric, ProcessGauge):
+            continue
+        try:
+            for labels, value in metric.collect():
+                samples[_sample_name(name, {**labels, "instance": instance})] = value
+        except Exception as e:
+            logger.warning(
+                {"message": "Error collecting gauge", "metric": name, "error": str(e)}
+            )
+    return samples
+
+
+# --- Metric Definitions ---
+
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds",
+    "Duration of reply and campaign pipeline stages.",
+)
+STAGE_ERRORS = Counter(
+    "stage_errors_total", "Pipeline stage failures by stage and error type."
+)
+CLASSIFICATIONS = Counter(
+    "reply_classifications_total", "Inbound replies by SDR classification."
+)
+AGENT_CACHE_LOOKUPS = Counter(
+    "agent_cache_lookups_total", "Agent output cache lookups by stage and result."
+)
+MODEL_TIER_CHOICES = Counter(
+    "model_tier_choices_total", "Model tier picked per agent run by stage and reason."
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Celery task run time by task and state."
+)
+CELERY_TASKS = Counter("celery_tasks_total", "Celery task outcomes by state.")
+CELERY_QUEUE_WAIT = Histogram(
+    "celery_queue_wait_seconds", "Time from enqueue to task start by task."
+)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Times a pipeline stage (e.g. "sdr", "web_search", "slack_post") and
+    counts its failures by exception type.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=stage, error_type=type(e).__name__)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage)
+
+
+def _queue_depth():
+    return [({"queue": "celery"}, get_redis().llen("celery"))]
+
+
+def _db_pool_usage():
+    from .database import engine
+
+    pool = engine.pool
+    return [
+        ({"state": "checked_out"}, pool.checkedout()),
+        ({"state": "size"}, pool.size()),
+        ({"state": "overflow"}, pool.overflow()),
+    ]
+
+
+Gauge(
+    "celery_queue_depth", "Messages waiting in the Celery broker queue.", _queue_depth
+)
+ProcessGauge(
+    "db_pool_connections",
+    "SQLAlchemy connection pool usage per process (web, worker children).",
+    _db_pool_usage,
+)
+
+
+# --- Exposition ---
+
+
+def _family(sample: str) -> str:
+    name = sample.split("{", 1)[0]
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in _registry:
+            return name[: -len(suffix)]
+    return name
+
+
+def _sample_sort_key(item: tuple[str, float]):
+    # Orders histogram buckets numerically by their "le" label.
+    sample = item[0]
+    base, sep, le = sample.partition('le="')
+    if not sep:
+        return (sample, 0.0)
+    return (base, float(le.split('"', 1)[0]))
+
+
+def render_metrics() -> str:
+    """Renders all metrics in the Prometheus text exposition format."""
+    _buffer.flush()
+    client = get_redis()
+    hashes = [client.hgetall(REDIS_KEY)]
+    hashes += [
+        client.hgetall(key) for key in client.scan_iter(match=f"{PROCESS_KEY_PREFIX}*")
+    ]
+    samples: dict[str, list[tuple[str, float]]] = {}
+    for values in hashes:
+        for raw_sample, value in values.items():
+            sample = raw_sample.decode()
+            samples.setdefault(_family(sample), []).append((sample, float(value)))
+
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        if isinstance(metric, Gauge) and not isinstance(metric, ProcessGauge):
+            try:
+                for labels, value in metric.collect():
+                    lines.append(f"{_sample_name(name, labels)} {value}")
+            except Exception as e:
+                logger.warning(
+                    {
+                        "message": "Error collecting gauge",
+                        "metric": name,
+                        "error": str(e),
+                    }
+                )
+            continue
+        for sample, value in sorted(samples.get(name, []), key=_sample_sort_key):
+            lines.append(f"{sample} {int(value) if value.is_integer() else value}")
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics():
+    """Starts this process's flusher, so its process gauges are reported while idle."""
+    if settings.METRICS_ENABLED:
+        _buffer.start()
+
+
+def shutdown_metrics():
+    _buffer.flush()
+    if settings.METRICS_ENABLED and _buffer.started_here():
+        # This process's gauges go now rather than when the key expires.
+        try:
+            get_redis().delete(_process_key())
+        except Exception as e:
+            logger.warning(
+                {"message": "Error removing process metrics", "error": str(e)}
+            )
+
+
+atexit.register(shutdown_metrics)
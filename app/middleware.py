@@ -1,9 +1,13 @@
 # app/middleware.py
 
+import time
 import uuid
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi import Request
 from .logging_config import set_correlation_id, logger
+from .metrics import HTTP_REQUEST_DURATION
+from .tracing import span
+from .profiling import profile_request
 
 
 class CorrelationIdMiddleware(BaseHTTPMiddleware):
@@ -12,6 +16,28 @@ class CorrelationIdMiddleware(BaseHTTPMiddleware):
         cid = incoming or str(uuid.uuid4())
         set_correlation_id(cid)
         logger.info({"message": "Inbound request received", "path": request.url.path})
-        response = await call_next(request)
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            with (
+                span(
+                    f"HTTP {request.method} {request.url.path}",
+                    **{"http.method": request.method, "url.path": request.url.path},
+                ) as request_span,
+                profile_request(request.url.path),
+            ):
+                response = await call_next(request)
+                status_code = response.status_code
+                if request_span:
+                    request_span.set_attribute("http.status_code", status_code)
+        finally:
+            # Label by route template to keep label cardinality bounded.
+            route = request.scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=request.method,
+                route=getattr(route, "path", "unmatched"),
+                status=status_code,
+            )
         response.headers["X-Correlation-ID"] = cid
         return response
@@ -0,0 +1,128 @@
+# app/model_policy.py
+
+"""
+Load-aware model choice for the SDR analysis.
+
+SDR_AGENT_MODEL is the "full" tier. With MODEL_TIERING_ENABLED a reply is
+analysed on the "fast" tier (SDR_FAST_MODEL) instead when
+
+  * the broker queue holds at least MODEL_TIER_BACKLOG_THRESHOLD messages, or
+  * the time the task already waited in the queue plus the full tier's
+    typical run time would exceed REPLY_LATENCY_BUDGET_SECONDS.
+
+A fast-tier analysis whose confidence is below SDR_ESCALATION_CONFIDENCE is
+redone on the full tier ("escalated"), so during a backlog only ambiguous
+replies pay the full model's latency. The tier is recorded on every agent
+run (`agent_runs.tier`).
+"""
+
+import threading
+import time
+from typing import NamedTuple
+
+import redis
+
+from .celery_instrumentation import current_queue_wait
+from .config import settings
+from .logging_config import logger
+from .metrics import MODEL_TIER_CHOICES
+
+FULL, FAST, ESCALATED = "full", "fast", "escalated"
+
+# Celery's default queue; the reply tasks are not routed elsewhere.
+BROKER_QUEUE = "celery"
+
+
+class TierChoice(NamedTuple):
+    tier: str
+    model: str
+    reason: str
+
+
+class _QueueDepth:
+    """Broker queue length, read at most once per MODEL_TIER_QUEUE_POLL_SECONDS."""
+
+    def __init__(self):
+        self._client = None
+        self._value: int | None = None
+        self._read_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def get(self) -> int | None:
+        if time.monotonic() - self._read_at < settings.MODEL_TIER_QUEUE_POLL_SECONDS:
+            return self._value
+        with self._lock:
+            now = time.monotonic()
+            if now - self._read_at >= settings.MODEL_TIER_QUEUE_POLL_SECONDS:
+                try:
+                    if self._client is None:
+                        self._client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+                    self._value = self._client.llen(BROKER_QUEUE)
+                except Exception as e:
+                    # Unknown depth: decide on the latency budget alone.
+                    logger.warning(
+                        {"message": "Could not read queue depth", "error": str(e)}
+                    )
+                    self._value = None
+                self._read_at = now
+        return self._value
+
+
+class _LatencyEstimate:
+    """Exponentially weighted mean of full-tier run times seen by this process."""
+
+    ALPHA = 0.2
+
+    def __init__(self):
+        self.value: float | None = None
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            if self.value is None:
+                self.value = seconds
+            else:
+                self.value += self.ALPHA * (seconds - self.value)
+
+
+_queue_depth = _QueueDepth()
+_full_latency = _LatencyEstimate()
+
+
+def choose_sdr_tier() -> TierChoice:
+    """The tier and model for the next SDR analysis, from the current load."""
+    if not settings.MODEL_TIERING_ENABLED:
+        return TierChoice(FULL, settings.SDR_AGENT_MODEL, "disabled")
+
+    depth = _queue_depth.get()
+    expected = (current_queue_wait() or 0.0) + (_full_latency.value or 0.0)
+    if depth is not None and depth >= settings.MODEL_TIER_BACKLOG_THRESHOLD:
+        choice = TierChoice(FAST, settings.SDR_FAST_MODEL, "backlog")
+    elif expected > settings.REPLY_LATENCY_BUDGET_SECONDS:
+        choice = TierChoice(FAST, settings.SDR_FAST_MODEL, "latency_budget")
+    else:
+        choice = TierChoice(FULL, settings.SDR_AGENT_MODEL, "within_budget")
+    MODEL_TIER_CHOICES.inc(stage="sdr", tier=choice.tier, reason=choice.reason)
+    if choice.tier == FAST:
+        logger.info(
+            {
+                "message": "SDR analysis moved to fast tier",
+                "reason": choice.reason,
+                "queue_depth": depth,
+                "expected_seconds": round(expected, 2),
+            }
+        )
+    return choice
+
+
+def escalation(choice: TierChoice, confidence: float) -> TierChoice | None:
+    """The full-tier rerun for a low-confidence fast-tier analysis, if needed."""
+    if choice.tier != FAST or confidence >= settings.SDR_ESCALATION_CONFIDENCE:
+        return None
+    MODEL_TIER_CHOICES.inc(stage="sdr", tier=ESCALATED, reason="low_confidence")
+    return TierChoice(ESCALATED, settings.SDR_AGENT_MODEL, "low_confidence")
+
+
+def observe_full_latency(seconds: float):
+    """Feeds a full-tier SDR run time into the latency budget estimate."""
+    _full_latency.observe(seconds)
@@ -0,0 +1,139 @@
+# app/profiling.py
+
+"""
+Opt-in sampling profiler for Celery tasks and HTTP requests.
+
+A helper thread samples the profiled thread's stack every
+PROFILE_INTERVAL_MS and aggregates the samples as collapsed stacks
+("root;caller;callee count"), the input format of flamegraph.pl, speedscope
+and inferno. Frames blocked in socket/SSL/select calls show up as I/O waits;
+the logged thread CPU time vs wall time gives the overall split.
+
+When PROFILING_ENABLED is off, the hooks return a shared no-op context
+manager without touching the sampler.
+"""
+
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+from .config import settings
+from .logging_config import logger, get_correlation_id
+
+_NOOP = nullcontext()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples one thread's call stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        self.thread_id = thread_id
+        self.interval = interval_seconds
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+
+
+class _Profile:
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self):
+        self._profiler = SamplingProfiler(
+            threading.get_ident(), settings.PROFILE_INTERVAL_MS / 1000
+        )
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self._profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiler.stop()
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.thread_time() - self._cpu_start
+        try:
+            path = self._write()
+            logger.info(
+                {
+                    "message": "Profile written",
+                    "profile.kind": self.kind,
+                    "profile.name": self.name,
+                    "profile.path": path,
+                    "profile.samples": sum(self._profiler.stacks.values()),
+                    "profile.wall_s": round(wall, 3),
+                    "profile.cpu_s": round(cpu, 3),
+                    "profile.cpu_ratio": round(cpu / wall, 3) if wall else None,
+                }
+            )
+        except OSError as e:
+            logger.error({"message": "Error writing profile", "error": str(e)})
+        return False
+
+    def _write(self) -> str:
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.name).strip("_")
+        cid = get_correlation_id() or "no-correlation-id"
+        path = os.path.join(
+            settings.PROFILE_DIR, f"{cid}-{self.kind}-{safe_name}.folded"
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self._profiler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def _selected(name: str, names: list[str]) -> bool:
+    if name in names:
+        return True
+    rate = settings.PROFILE_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def profile_task(task_name: str):
+    """Context manager profiling a Celery task if it is selected."""
+    if not settings.PROFILING_ENABLED or not _selected(
+        task_name, settings.PROFILE_TASKS
+    ):
+        return _NOOP
+    return _Profile("task", task_name)
+
+
+def profile_request(path: str):
+    """
+    Context manager profiling an HTTP request if it is selected. Requests run
+    on the event loop thread, so concurrent requests share the samples.
+    """
+    if not settings.PROFILING_ENABLED or not _selected(path, settings.PROFILE_ROUTES):
+        return _NOOP
+    return _Profile("http", path)
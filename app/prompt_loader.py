@@ -1,16 +1,67 @@
 # app/prompt_loader.py
 
+import hashlib
+import threading
 from pathlib import Path
+from typing import NamedTuple
 
+from .logging_config import logger
 
-def load_prompt(file_name: str) -> str:
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+
+class Prompt(NamedTuple):
+    text: str
+    hash: str
+
+
+def prompt_hash(text: str) -> str:
+    """Short, stable version identifier of a prompt's final (formatted) text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+# (file name, format vars) -> (mtime_ns, Prompt)
+_cache: dict[tuple, tuple[int, Prompt]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_prompt(file_name: str, **format_vars) -> Prompt:
+    """
+    Returns a prompt from the 'prompts' directory, formatted with
+    `format_vars`, together with its hash. The file is read and formatted
+    once and only re-read when its mtime changes, so edits are picked up
+    without a restart. Raises FileNotFoundError if the file does not exist.
+    """
+    path = PROMPTS_DIR / file_name
+    mtime_ns = path.stat().st_mtime_ns
+    key = (file_name, tuple(sorted(format_vars.items())))
+    cached = _cache.get(key)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+        text = path.read_text(encoding="utf-8")
+        if format_vars:
+            text = text.format(**format_vars)
+        prompt = Prompt(text, prompt_hash(text))
+        _cache[key] = (mtime_ns, prompt)
+    if cached:
+        logger.info(
+            {
+                "message": "Prompt reloaded",
+                "prompt.file": file_name,
+                "prompt.hash": prompt.hash,
+                "prompt.previous_hash": cached[1].hash,
+            }
+        )
+    return prompt
+
+
+def load_prompt(file_name: str, **format_vars) -> str:
     """
     Loads a prompt from a file in the 'prompts' directory.
     """
-    prompt_path = Path(__file__).parent / "prompts" / file_name
-    try:
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        # Fallback or error handling
-        return f"Error: Prompt file '{file_name}' not found."
+    return get_prompt(file_name, **format_vars).text
@@ -0,0 +1,266 @@
+# app/prospects.py
+
+"""
+Pre-flight validation of the prospect list, and the email index used to
+look prospects up when they reply.
+
+One streaming pass over the CSV normalizes emails (trimmed, lower-cased),
+rejects rows with a missing or malformed address, drops duplicates (the
+first valid row per email wins) and flags rows with an empty value in any
+column the campaign template references. The campaign sender only sends to
+the rows that pass; the CLI writes them to a cleaned CSV plus a JSON report:
+
+    python -m app.prospects prospects.csv --output prospects.clean.csv \\
+        --report prospects.report.json --template "Hi {{FirstName}} at {{Company}}"
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from .config import settings
+from .logging_config import logger
+
+EMAIL_COLUMN = "Email"
+# Deliberately pragmatic: one "@", no whitespace, a dotted domain with a
+# 2+ letter TLD. SendGrid and the receiving server do the real checks.
+EMAIL_RE = re.compile(
+    r"[^@\s]+@[a-z0-9](?:[a-z0-9-]*[a-z0-9])?(?:\.[a-z0-9-]+)*\.[a-z]{2,}"
+)
+PLACEHOLDER_RE = re.compile(r"\{\{(.+?)\}\}")
+MAX_SAMPLES_PER_REASON = 20
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def template_fields(*templates: str) -> list[str]:
+    """Column names referenced as {{Column}} placeholders, in first-use order."""
+    fields = {}
+    for template in templates:
+        for name in PLACEHOLDER_RE.findall(template or ""):
+            fields.setdefault(name, None)
+    return list(fields)
+
+
+class ValidationReport:
+    """Counts and sample rows collected while scanning a prospect list."""
+
+    def __init__(self, path: str, required_fields: list[str]):
+        self.path = path
+        self.required_fields = required_fields
+        self.missing_columns: list[str] = []
+        self.rows = 0
+        self.valid = 0
+        self.rejected = Counter()
+        self.samples: dict[str, list[dict]] = {}
+        self._start = time.perf_counter()
+        self.elapsed_seconds = 0.0
+
+    def reject(self, reason: str, line: int, email: str, detail: str | None = None):
+        self.rejected[reason] += 1
+        samples = self.samples.setdefault(reason, [])
+        if len(samples) < MAX_SAMPLES_PER_REASON:
+            sample = {"line": line, "email": email}
+            if detail:
+                sample["detail"] = detail
+            samples.append(sample)
+
+    def finish(self):
+        self.elapsed_seconds = time.perf_counter() - self._start
+
+    def as_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "required_fields": self.required_fields,
+            "missing_columns": self.missing_columns,
+            "rows": self.rows,
+            "valid": self.valid,
+            "rejected": dict(self.rejected),
+            "samples": self.samples,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rows_per_second": (
+                round(self.rows / self.elapsed_seconds)
+                if self.elapsed_seconds
+                else None
+            ),
+        }
+
+    def summary(self) -> str:
+        rejected = ", ".join(f"{n} {reason}" for reason, n in self.rejected.items())
+        return f"{self.valid} of {self.rows} prospects valid" + (
+            f" (rejected: {rejected})" if rejected else ""
+        )
+
+
+def iter_valid_rows(path: str, report: ValidationReport):
+    """
+    Yields (header, values) for each valid, first-seen prospect row, with the
+    email normalized (leading blanks in other cells are skipped by the
+    parser). Rejections are counted in `report`, which is complete once the
+    generator is exhausted.
+    """
+    with open(path, mode="r", encoding="utf-8", newline="") as infile:
+        reader = csv.reader(infile, skipinitialspace=True)
+        header = next(reader, None) or []
+        report.missing_columns = [
+            name
+            for name in [EMAIL_COLUMN, *report.required_fields]
+            if name not in header
+        ]
+        if report.missing_columns:
+            # Every row would be rejected; count them without parsing further.
+            report.rows = sum(1 for _ in reader)
+            report.rejected["missing_columns"] = report.rows
+            report.finish()
+            return
+
+        width = len(header)
+        email_index = header.index(EMAIL_COLUMN)
+        required = [(name, header.index(name)) for name in report.required_fields]
+        seen = set()
+        line = 1
+        for line, values in enumerate(reader, start=2):
+            if len(values) != width:
+                # Trailing empty cells (e.g. stray commas) are harmless.
+                if len(values) > width and not "".join(values[width:]).strip():
+                    values = values[:width]
+                elif values:
+                    report.rows += 1
+                    report.reject("malformed_row", line, "", f"{len(values)} columns")
+                    continue
+                else:
+                    continue  # blank line
+            report.rows += 1
+            email = values[email_index].strip().lower()
+            if not email:
+                report.reject("missing_email", line, "")
+            elif not EMAIL_RE.fullmatch(email):
+                report.reject("invalid_email", line, email)
+            elif email in seen:
+                report.reject("duplicate", line, email)
+            else:
+                missing = [name for name, i in required if not values[i].strip()]
+                if missing:
+                    report.reject("missing_field", line, email, ",".join(missing))
+                    continue
+                seen.add(email)
+                report.valid += 1
+                values[email_index] = email
+                yield header, values
+        report.finish()
+
+
+def iter_valid_prospects(path: str, report: ValidationReport):
+    """`iter_valid_rows` as CSV-style dicts, for the campaign sender."""
+    for header, values in iter_valid_rows(path, report):
+        yield dict(zip(header, values))
+
+
+def validate_prospects(
+    path: str, required_fields: list[str] = (), output_path: str | None = None
+) -> ValidationReport:
+    """Scans `path`, optionally writing the cleaned list to `output_path`."""
+    report = ValidationReport(path, list(required_fields))
+    rows = iter_valid_rows(path, report)
+    if output_path:
+        with open(output_path, mode="w", encoding="utf-8", newline="") as outfile:
+            writer = csv.writer(outfile)
+            first = next(rows, None)
+            if first:
+                header, values = first
+                writer.writerow(header)
+                writer.writerow(values)
+                writer.writerows(values for _, values in rows)
+    else:
+        for _ in rows:
+            pass
+    return report
+
+
+# --- Email index ---
+
+_index: dict[str, tuple[str, ...]] = {}
+_index_header: list[str] = []
+_index_mtime: float | None = None
+_index_lock = threading.Lock()
+
+
+def _load_index(path: str, mtime: float):
+    global _index, _index_header, _index_mtime
+    index = {}
+    with open(path, mode="r", encoding="utf-8", newline="") as infile:
+        reader = csv.reader(infile)
+        header = next(reader, None) or []
+        if EMAIL_COLUMN in header:
+            email_index = header.index(EMAIL_COLUMN)
+            for values in reader:
+                if len(values) > email_index:
+                    # Rows are kept as tuples (not dicts) to keep large lists small.
+                    index.setdefault(
+                        normalize_email(values[email_index]), tuple(values)
+                    )
+    index.pop("", None)
+    _index, _index_header, _index_mtime = index, header, mtime
+    logger.info(
+        {"message": "Prospect index loaded", "path": path, "prospects": len(index)}
+    )
+
+
+def find_prospect(email: str, path: str | None = None) -> dict | None:
+    """
+    Returns the prospect row for `email` (case-insensitive) from an index of
+    the CSV that is rebuilt whenever the file changes. Raises
+    FileNotFoundError if the CSV does not exist.
+    """
+    path = path or settings.PROSPECTS_CSV_PATH
+    mtime = os.stat(path).st_mtime
+    if mtime != _index_mtime:
+        with _index_lock:
+            if mtime != _index_mtime:
+                _load_index(path, mtime)
+    values = _index.get(normalize_email(email))
+    if values is None:
+        return None
+    return dict(zip(_index_header, values))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Validate, normalize and deduplicate a prospect CSV."
+    )
+    parser.add_argument("path", nargs="?", default=settings.PROSPECTS_CSV_PATH)
+    parser.add_argument("--output", help="Write the cleaned list here.")
+    parser.add_argument("--report", help="Write the JSON report here.")
+    parser.add_argument(
+        "--template",
+        action="append",
+        default=[],
+        help="Subject or body template; its {{placeholders}} must be non-empty.",
+    )
+    parser.add_argument(
+        "--field", action="append", default=[], help="Additional required column."
+    )
+    args = parser.parse_args()
+
+    required = template_fields(*args.template)
+    required += [name for name in args.field if name not in required]
+    report = validate_prospects(args.path, required, args.output)
+    result = report.as_dict()
+    if args.report:
+        with open(args.report, mode="w", encoding="utf-8") as outfile:
+            json.dump(result, outfile, indent=2)
+    print(json.dumps({k: v for k, v in result.items() if k != "samples"}, indent=2))
+    if report.missing_columns:
+        sys.exit(f"Missing columns: {', '.join(report.missing_columns)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# app/rate_limit.py
+
+"""
+Thread-safe token bucket shared by the outbound email and OpenAI limiters.
+
+`reserve` never blocks: it takes a token and returns how long the caller
+must wait before using it, so the same bucket works from threads
+(`time.sleep`) and from any event loop (`asyncio.sleep`).
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes one token and returns how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
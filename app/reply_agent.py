@@ -2,7 +2,7 @@
 
 from agents import Agent
 from .config import settings
-from .prompt_loader import load_prompt
+from .agent_registry import get_agent
 from pydantic import BaseModel, Field
 from .tools import web_search
 
@@ -15,6 +15,10 @@ class SdrAnalysis(BaseModel):
     classification: str = Field(
         ..., description="The classification of the prospect's intent."
     )
+    confidence: float = Field(
+        ...,
+        description="Confidence in the classification, from 0.0 (a guess) to 1.0 (unambiguous).",
+    )
     summary: str = Field(
         ..., description="A one-sentence summary of the prospect's key message."
     )
@@ -41,34 +45,49 @@ class FinalReply(BaseModel):
 
 
 # --- Agent Definitions ---
+# Agents come from the registry: built on first use and rebuilt only when
+# their prompt file changes.
+
 
 # 1. SDR Agent (As per original spec: Classify, Summarize, Draft Standard Reply)
-sdr_instructions = load_prompt("sdr_instructions.txt")
-SDR_Agent = Agent(
-    name="SDR_Reply_Processor",
-    instructions=sdr_instructions,
-    model=settings.SDR_AGENT_MODEL,
-    output_type=SdrAnalysis,
-)
+def get_sdr_agent(model: str | None = None) -> Agent:
+    return get_agent(
+        "SDR_Reply_Processor",
+        model or settings.SDR_AGENT_MODEL,
+        prompt_file="sdr_instructions.txt",
+        output_type=SdrAnalysis,
+    )
+
 
 # 2. Research Agent (Tool-using specialist for qualified leads)
-research_agent_instructions = load_prompt("research_agent_instructions.txt")
-Research_Agent = Agent(
-    name="Lead_Researcher",
-    instructions=research_agent_instructions,
-    tools=[web_search],
-    model=settings.RESEARCH_AGENT_MODEL,
-    output_type=ResearchOutput,
-)
+def get_research_agent() -> Agent:
+    return get_agent(
+        "Lead_Researcher",
+        settings.RESEARCH_AGENT_MODEL,
+        prompt_file="research_agent_instructions.txt",
+        tools=[web_search],
+        output_type=ResearchOutput,
+    )
+
 
 # 3. Personalized Writer Agent (Expert copywriter for qualified leads)
-# Format the prompt to inject the sales rep's name from settings
-personalized_writer_instructions = load_prompt(
-    "personalized_writer_instructions.txt"
-).format(sales_rep_name=settings.SALES_REP_NAME)
-Personalized_Writer_Agent = Agent(
-    name="Personalized_Reply_Writer",
-    instructions=personalized_writer_instructions,
-    model=settings.WRITER_AGENT_MODEL,
-    output_type=FinalReply,
-)
+def get_personalized_writer_agent() -> Agent:
+    # Format the prompt to inject the sales rep's name from settings
+    return get_agent(
+        "Personalized_Reply_Writer",
+        settings.WRITER_AGENT_MODEL,
+        prompt_file="personalized_writer_instructions.txt",
+        prompt_vars={"sales_rep_name": settings.SALES_REP_NAME},
+        output_type=FinalReply,
+    )
+
+
+# 4. Follow-up Writer Agent (Nudges prospects who have not replied)
+def get_follow_up_agent() -> Agent:
+    return get_agent(
+        "Follow_Up_Writer",
+        settings.FOLLOW_UP_AGENT_MODEL,
+        prompt_file="follow_up_writer.txt",
+        prompt_vars={"sales_rep_name": settings.SALES_REP_NAME},
+        output_type=FinalReply,
+    )
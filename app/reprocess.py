@@ -0,0 +1,322 @@
+# app/reprocess.py
+
+"""
+Replays the SDR analysis over stored conversations under a given prompt and
+model, to measure the effect of a prompt or model change on past replies.
+
+    python -m app.reprocess run baseline
+    python -m app.reprocess run candidate --model gpt-4.1-mini \
+        --prompt-file /tmp/sdr_instructions_v2.txt --concurrency 16 --rpm 300
+    python -m app.reprocess compare baseline candidate
+
+Conversations are read from Postgres a page at a time and each is analysed
+as of the prospect's latest message. Results go to the reprocess_results
+table and nothing is sent: no drafts, Slack cards or emails. A run is
+resumable: running the same run ID again skips the conversations it
+already processed and retries the ones that failed.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+from sqlalchemy import text
+
+from .agent_registry import get_agent, agent_prompt_hash
+from .agent_runner import last_wall_ms_var, run_agent, set_openai_rate_limit
+from .config import settings
+from .conversation_context import format_context
+from .database import (
+    get_session,
+    load_unprocessed_conversations,
+    save_reprocess_results,
+)
+from .logging_config import logger
+from .reply_agent import SdrAnalysis
+from .usage import set_run_context
+
+# Results are written in batches of this size; a crash loses at most one
+# batch of work, which the next attempt redoes.
+WRITE_BATCH_SIZE = 50
+READ_PAGE_SIZE = 500
+PROGRESS_INTERVAL_SECONDS = 10.0
+
+
+def get_reprocess_agent(model: str, prompt_file: str):
+    return get_agent(
+        "SDR_Reply_Processor",
+        model,
+        prompt_file=prompt_file,
+        output_type=SdrAnalysis,
+    )
+
+
+def replay_context(conversation) -> str | None:
+    """
+    The SDR input as of the prospect's latest message, or None when the
+    prospect never wrote. Later messages (our reply, follow-ups) are
+    dropped; the stored summary is used only if it covers messages before
+    that point and is never refreshed.
+    """
+    history = json.loads(conversation.conversation_history or "[]")
+    last = next(
+        (
+            index
+            for index in range(len(history) - 1, -1, -1)
+            if history[index].get("sender") == "prospect"
+        ),
+        None,
+    )
+    if last is None:
+        return None
+    history = history[: last + 1]
+    summarized = conversation.summarized_count or 0
+    if not conversation.summary or summarized >= len(history):
+        summarized = 0
+    return format_context(history, conversation.summary, summarized)
+
+
+def _percentile(values: list[float], fraction: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class _Progress:
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.started = time.monotonic()
+        self.last_report = self.started
+        self.processed = 0
+        self.errors = 0
+        self.skipped = 0
+        self.latencies_ms: list[float] = []
+        self.classifications = Counter()
+
+    def add(self, row: dict):
+        self.processed += 1
+        if row["error"]:
+            self.errors += 1
+        else:
+            self.latencies_ms.append(row["wall_ms"])
+            self.classifications[row["classification"]] += 1
+
+    def maybe_report(self):
+        now = time.monotonic()
+        if now - self.last_report < PROGRESS_INTERVAL_SECONDS:
+            return
+        self.last_report = now
+        logger.info({"message": "Reprocess progress", **self.summary()})
+
+    def summary(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "run_id": self.run_id,
+            "processed": self.processed,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(elapsed, 1),
+            "per_second": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": _percentile(self.latencies_ms, 0.5),
+            "p95_ms": _percentile(self.latencies_ms, 0.95),
+            "classifications": dict(self.classifications),
+        }
+
+
+async def _analyse(agent, run_id: str, conversation, agent_input: str) -> dict:
+    set_run_context(prospect_email=conversation.prospect_email)
+    row = {
+        "run_id": run_id,
+        "prospect_email": conversation.prospect_email,
+        "subject": conversation.subject,
+        "model": str(agent.model),
+        "prompt_hash": agent_prompt_hash(agent),
+        "classification": None,
+        "summary": None,
+        "draft_reply": None,
+        "error": None,
+    }
+    try:
+        # Not served from the cache: the run measures the model as it is now.
+        analysis: SdrAnalysis = await run_agent(
+            agent, agent_input, stage="reprocess", use_cache=False
+        )
+        row.update(
+            classification=analysis.classification,
+            summary=analysis.summary,
+            draft_reply=analysis.draft_reply,
+        )
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"[:500]
+    # Measured by run_agent, like agent_runs.wall_ms: without the rate-limit
+    # wait, which only reflects the --rpm chosen for the run.
+    row["wall_ms"] = last_wall_ms_var.get()
+    return row
+
+
+async def _unprocessed_conversations(run_id: str):
+    """Conversations to process, one page per query, read off the event loop."""
+    after = None
+    while True:
+        page = await asyncio.to_thread(
+            load_unprocessed_conversations, run_id, after, READ_PAGE_SIZE
+        )
+        for conversation in page:
+            yield conversation
+        if len(page) < READ_PAGE_SIZE:
+            return
+        after = (page[-1].prospect_email, page[-1].subject)
+
+
+async def reprocess(
+    run_id: str,
+    model: str,
+    prompt_file: str,
+    concurrency: int,
+    limit: int | None = None,
+) -> dict:
+    """
+    Runs the SDR agent over every conversation not yet processed in `run_id`,
+    at most `concurrency` at a time, and returns the run's throughput stats.
+    """
+    agent = get_reprocess_agent(model, prompt_file)
+    progress = _Progress(run_id)
+    slots = asyncio.Semaphore(concurrency)
+    pending: set[asyncio.Task] = set()
+    results: list[dict] = []
+
+    async def flush(force: bool = False):
+        if len(results) >= WRITE_BATCH_SIZE or (force and results):
+            batch = results[:]
+            results.clear()
+            await asyncio.to_thread(save_reprocess_results, batch)
+
+    def on_done(task: asyncio.Task):
+        slots.release()
+        pending.discard(task)
+        row = task.result()
+        results.append(row)
+        progress.add(row)
+
+    logger.info(
+        {
+            "message": "Reprocess run started",
+            "run_id": run_id,
+            "model": model,
+            "prompt_hash": agent_prompt_hash(agent),
+            "concurrency": concurrency,
+        }
+    )
+    started = 0
+    async for conversation in _unprocessed_conversations(run_id):
+        if limit is not None and started >= limit:
+            break
+        agent_input = replay_context(conversation)
+        if agent_input is None:
+            progress.skipped += 1
+            continue
+        await slots.acquire()
+        task = asyncio.create_task(_analyse(agent, run_id, conversation, agent_input))
+        task.add_done_callback(on_done)
+        pending.add(task)
+        started += 1
+        await flush()
+        progress.maybe_report()
+
+    if pending:
+        await asyncio.wait(set(pending))
+    await flush(force=True)
+    stats = progress.summary()
+    logger.info({"message": "Reprocess run complete", **stats})
+    return stats
+
+
+COMPARE_QUERY = """
+SELECT
+    b.classification AS baseline,
+    c.classification AS candidate,
+    count(*) AS conversations
+FROM reprocess_results b
+JOIN reprocess_results c
+    ON c.prospect_email = b.prospect_email AND c.subject = b.subject
+WHERE b.run_id = :baseline AND c.run_id = :candidate
+    AND b.error IS NULL AND c.error IS NULL
+GROUP BY b.classification, c.classification
+ORDER BY count(*) DESC
+"""
+
+
+def compare_runs(baseline: str, candidate: str) -> list[dict]:
+    """Classification pairs (baseline, candidate) over the conversations both runs processed."""
+    params = {"baseline": baseline, "candidate": candidate}
+    with get_session() as db:
+        return [dict(row._mapping) for row in db.execute(text(COMPARE_QUERY), params)]
+
+
+def print_comparison(rows: list[dict], baseline: str, candidate: str):
+    total = sum(row["conversations"] for row in rows)
+    agreed = sum(
+        row["conversations"] for row in rows if row["baseline"] == row["candidate"]
+    )
+    print(f"{baseline:<24} {candidate:<24} {'count':>8}")
+    print("-" * 58)
+    for row in rows:
+        marker = "" if row["baseline"] == row["candidate"] else "  *"
+        print(
+            f"{str(row['baseline'])[:24]:<24} {str(row['candidate'])[:24]:<24} "
+            f"{row['conversations']:>8}{marker}"
+        )
+    if total:
+        print(f"\nAgreement: {agreed}/{total} ({agreed / total:.1%})")
+    else:
+        print("\nNo conversations processed by both runs.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Process conversations under a run ID.")
+    run.add_argument("run_id")
+    run.add_argument("--model", default=settings.SDR_AGENT_MODEL)
+    run.add_argument(
+        "--prompt-file",
+        default="sdr_instructions.txt",
+        help="File in app/prompts, or a path to a candidate prompt.",
+    )
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument(
+        "--rpm",
+        type=float,
+        default=settings.OPENAI_REQUESTS_PER_MINUTE or 300,
+        help="Agent runs started per minute (0: unlimited).",
+    )
+    run.add_argument("--limit", type=int, help="Process at most this many.")
+
+    compare = commands.add_parser("compare", help="Compare the results of two runs.")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--json", action="store_true", help="Print rows as JSON.")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        set_openai_rate_limit(args.rpm)
+        stats = asyncio.run(
+            reprocess(
+                args.run_id, args.model, args.prompt_file, args.concurrency, args.limit
+            )
+        )
+        print(json.dumps(stats, indent=2))
+    else:
+        rows = compare_runs(args.baseline, args.candidate)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            print_comparison(rows, args.baseline, args.candidate)
+
+
+if __name__ == "__main__":
+    main()
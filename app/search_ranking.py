@@ -0,0 +1,150 @@
+# app/search_ranking.py
+
+"""
+Extractive pre-ranking of web search results for the Research Agent.
+
+Result contents are split into sentence-aligned passages, near-duplicates
+(across queries and sites) are dropped, and the rest are scored with BM25
+against the prospect's name and company. Only the best passages that fit
+within WEB_SEARCH_TOKEN_BUDGET are passed on, so the research prompt size is
+predictable regardless of how much the search returns.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with".split()
+)
+
+# BM25 parameters (the usual defaults).
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class Passage:
+    url: str
+    text: str
+    tokens: list[str] = field(repr=False)
+    score: float = 0.0
+
+
+def split_passages(url: str, content: str, max_words: int) -> list[Passage]:
+    """Splits `content` into passages of whole sentences, up to `max_words` each."""
+    passages, current, words = [], [], 0
+    for sentence in _SENTENCE_RE.split(content.strip()):
+        n = len(sentence.split())
+        if current and words + n > max_words:
+            passages.append(" ".join(current))
+            current, words = [], 0
+        current.append(sentence)
+        words += n
+    if current:
+        passages.append(" ".join(current))
+    return [Passage(url, text, tokenize(text)) for text in passages if text]
+
+
+def _shingles(tokens: list[str], size: int = 3) -> set[tuple[str, ...]]:
+    if len(tokens) < size:
+        return {tuple(tokens)}
+    return {tuple(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def dedupe(passages: list[Passage], threshold: float) -> list[Passage]:
+    """Drops passages whose word 3-gram Jaccard similarity to a kept one is >= threshold."""
+    kept: list[tuple[Passage, set]] = []
+    for passage in passages:
+        shingles = _shingles(passage.tokens)
+        if not shingles or any(
+            len(shingles & other) / len(shingles | other) >= threshold
+            for _, other in kept
+        ):
+            continue
+        kept.append((passage, shingles))
+    return [passage for passage, _ in kept]
+
+
+def bm25_score(passages: list[Passage], query: list[str]):
+    """Sets each passage's BM25 score for the query terms."""
+    if not passages:
+        return
+    n = len(passages)
+    avg_len = sum(len(p.tokens) for p in passages) / n or 1.0
+    document_frequency = Counter()
+    for p in passages:
+        document_frequency.update(set(p.tokens))
+    idf = {
+        term: math.log(
+            1 + (n - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5)
+        )
+        for term in set(query)
+    }
+    for p in passages:
+        frequencies = Counter(p.tokens)
+        length_norm = K1 * (1 - B + B * len(p.tokens) / avg_len)
+        p.score = sum(
+            idf[term] * frequencies[term] * (K1 + 1) / (frequencies[term] + length_norm)
+            for term in query
+            if frequencies[term]
+        )
+
+
+def select_passages(
+    results: list[dict],
+    query: str,
+    token_budget: int,
+    max_words: int,
+    dedupe_threshold: float,
+) -> tuple[list[Passage], dict]:
+    """
+    Returns the highest-scoring distinct passages from Tavily `results`
+    that fit within `token_budget`, plus stats for logging.
+    """
+    passages = []
+    seen_urls = set()
+    for result in results:
+        url = result.get("url", "")
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        passages.extend(split_passages(url, result.get("content") or "", max_words))
+
+    distinct = dedupe(passages, dedupe_threshold)
+    bm25_score(distinct, tokenize(query))
+    ranked = sorted(distinct, key=lambda p: p.score, reverse=True)
+    # Passages that mention none of the query terms are only used as filler
+    # when nothing relevant was found.
+    relevant = [p for p in ranked if p.score > 0] or ranked
+
+    selected, used = [], 0
+    for passage in relevant:
+        cost = estimate_tokens(passage.text)
+        if used + cost > token_budget:
+            continue
+        selected.append(passage)
+        used += cost
+
+    stats = {
+        "results": len(results),
+        "passages": len(passages),
+        "duplicates_dropped": len(passages) - len(distinct),
+        "passages_selected": len(selected),
+        "input_tokens": sum(estimate_tokens(p.text) for p in passages),
+        "selected_tokens": used,
+    }
+    return selected, stats
@@ -0,0 +1,186 @@
+# app/send_controller.py
+
+"""
+Flow control for outbound email.
+
+Every SendGrid send (approved replies and bulk campaigns) goes through one
+process-wide `SendController`, which:
+
+  - limits concurrent sends with an AIMD window: +1/limit per success,
+    halved (at most once per SEND_DECREASE_INTERVAL_SECONDS) on 429/5xx,
+    bounded by SEND_MIN_CONCURRENCY..SEND_MAX_CONCURRENCY
+  - paces each recipient domain with a token bucket
+    (SEND_DOMAIN_RATE_PER_SECOND / SEND_DOMAIN_BURST, SEND_DOMAIN_RATE_LIMITS
+    for per-domain overrides)
+  - retries 429 (honouring Retry-After for all senders), 5xx and connection
+    errors with exponential backoff and full jitter, up to SEND_MAX_RETRIES;
+    other 4xx responses are not retried
+
+The controller is thread-safe; the bulk sender drives it from a thread pool.
+"""
+
+import random
+import threading
+import time
+
+from .config import settings
+from .logging_config import logger
+from .rate_limit import TokenBucket
+
+
+class SendError(Exception):
+    """Raised when a send is rejected or still failing after all retries."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _status_code(error: Exception) -> int | None:
+    # python_http_client's HTTPError carries the response status; anything
+    # without one (URLError, timeouts) is treated as a connection error.
+    status = getattr(error, "status_code", None)
+    return int(status) if status is not None else None
+
+
+def _retry_after_seconds(error: Exception) -> float | None:
+    headers = getattr(error, "headers", None) or {}
+    try:
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    ceiling = min(
+        settings.SEND_RETRY_MAX_DELAY_SECONDS,
+        settings.SEND_RETRY_BASE_DELAY_SECONDS * (2**attempt),
+    )
+    return random.uniform(0, ceiling)
+
+
+def recipient_domain(email: str) -> str:
+    return email.rpartition("@")[2].strip().lower()
+
+
+class SendController:
+    def __init__(self):
+        self.limit = float(settings.SEND_INITIAL_CONCURRENCY)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._slots = threading.Condition()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+
+    # --- Concurrency window ---
+
+    def _acquire_slot(self):
+        with self._slots:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._slots.wait(pause)
+                elif self._in_flight >= int(self.limit):
+                    self._slots.wait()
+                else:
+                    self._in_flight += 1
+                    return
+
+    def _release_slot(self, outcome: str, retry_after: float | None = None):
+        with self._slots:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if outcome == "success":
+                self.limit = min(
+                    settings.SEND_MAX_CONCURRENCY, self.limit + 1 / self.limit
+                )
+            elif outcome == "throttled":
+                if now - self._last_decrease >= settings.SEND_DECREASE_INTERVAL_SECONDS:
+                    self.limit = max(settings.SEND_MIN_CONCURRENCY, self.limit / 2)
+                    self._last_decrease = now
+                    logger.warning(
+                        {
+                            "message": "Send concurrency decreased",
+                            "concurrency_limit": int(self.limit),
+                        }
+                    )
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            self._slots.notify_all()
+
+    # --- Per-domain pacing ---
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            with self._buckets_lock:
+                bucket = self._buckets.get(domain)
+                if bucket is None:
+                    rate = settings.SEND_DOMAIN_RATE_LIMITS.get(
+                        domain, settings.SEND_DOMAIN_RATE_PER_SECOND
+                    )
+                    bucket = TokenBucket(rate, settings.SEND_DOMAIN_BURST)
+                    self._buckets[domain] = bucket
+        return bucket
+
+    # --- Sending ---
+
+    def send(self, sg, message, to_email: str):
+        """
+        Sends `message` with the SendGrid client `sg`, waiting for a domain
+        token and a concurrency slot, and retrying transient failures.
+        Returns the SendGrid response or raises SendError.
+        """
+        bucket = self._bucket(recipient_domain(to_email))
+        max_retries = settings.SEND_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            wait = bucket.reserve()
+            if wait:
+                time.sleep(wait)
+            self._acquire_slot()
+            try:
+                response = sg.send(message)
+            except Exception as e:
+                status = _status_code(e)
+                retry_after = _retry_after_seconds(e) if status == 429 else None
+                if status is not None and status != 429 and status < 500:
+                    self._release_slot("rejected")
+                    raise SendError(str(e), status) from e
+                self._release_slot(
+                    "throttled" if status is not None else "error", retry_after
+                )
+                if attempt == max_retries:
+                    raise SendError(
+                        f"Send failed after {attempt + 1} attempts: {e}", status
+                    ) from e
+                delay = retry_after or _backoff_delay(attempt)
+                logger.warning(
+                    {
+                        "message": "SendGrid send failed, retrying",
+                        "to_email": to_email,
+                        "status_code": status,
+                        "error": str(e),
+                        "attempt": attempt + 1,
+                        "delay_seconds": round(delay, 3),
+                    }
+                )
+                time.sleep(delay)
+                continue
+            self._release_slot("success")
+            return response
+
+
+_controller: SendController | None = None
+_controller_lock = threading.Lock()
+
+
+def get_send_controller() -> SendController:
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = SendController()
+    return _controller
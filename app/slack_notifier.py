@@ -1,125 +1,611 @@
 # app/slack_notifier.py
 
-import json
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import os
+import random
 import re
 import html
+import json
+import threading
+import time
+
+import aiohttp
+import redis
+from slack_sdk.errors import SlackApiError
 from slack_sdk.web.async_client import AsyncWebClient
 from .config import settings
+from .clients import slack_client_kwargs
 from .logging_config import logger
+from .metrics import track_stage
+from .tracing import span
 
+DIGEST_KEY = "slack:digest"
 
-async def send_slack_notification(
-    analysis_json: dict, original_sender: str, original_subject: str
-):
+_client: AsyncWebClient | None = None
+_client_lock = threading.Lock()
+_redis_client = None
+
+
+def get_slack_client() -> AsyncWebClient:
     """
-    Formats the agent's analysis and sends an interactive notification to a Slack channel.
+    Returns the process-wide Slack client, creating it on first use.
     """
-    try:
-        client = AsyncWebClient(token=settings.SLACK_BOT_TOKEN)
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AsyncWebClient(**slack_client_kwargs())
+    return _client
 
-        cleaned_sender = html.unescape(original_sender)
 
-        # Parse name and email for better formatting
-        sender_name = cleaned_sender
-        prospect_email = ""
+def _retry_after_seconds(response) -> float:
+    headers = getattr(response, "headers", None) or {}
+    for key in ("Retry-After", "retry-after"):
+        if key in headers:
+            try:
+                return float(headers[key])
+            except (TypeError, ValueError):
+                break
+    return settings.SLACK_RETRY_BASE_DELAY_SECONDS
 
-        email_match = re.search(r"<(.+?)>", cleaned_sender)
-        if email_match:
-            prospect_email = email_match.group(1)
-            sender_name = cleaned_sender.split("<")[0].strip()
 
-        classification = analysis_json.get("classification", "N/A")
-        summary = analysis_json.get("summary", "No summary provided.")
-        draft_reply = analysis_json.get("draft_reply", "No draft reply provided.")
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    ceiling = min(
+        settings.SLACK_RETRY_MAX_DELAY_SECONDS,
+        settings.SLACK_RETRY_BASE_DELAY_SECONDS * (2**attempt),
+    )
+    return random.uniform(0, ceiling)
+
+
+class SlackDispatcher:
+    """
+    Funnels every outbound Slack Web API call of this process through one
+    shared client and a rate-limited queue.
+
+    Calls are queued per channel and each channel's queue is drained by its
+    own consumer on a background event loop, so callers on any thread or
+    event loop (Celery tasks use `asyncio.run`) share the same per-channel
+    pacing while a slow or rate-limited channel never holds up another.
+    Channels addressed by name are paced under the ID Slack returns for
+    them, so a post by name and an update by ID share one slot. Calls are
+    retried on 429 (honouring Retry-After), 5xx and connection errors.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # channel -> queue of pending calls; both only used on the loop thread.
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._next_post_at: dict[str, float] = {}
+        # channel name -> ID, learned from Slack's responses.
+        self._channel_ids: dict[str, str] = {}
 
-        # Check if the subject already starts with "Re: " (case-insensitive)
-        if original_subject.lower().startswith("re: "):
-            reply_subject = original_subject
+    # --- Lifecycle ---
+
+    def _ensure_started(self):
+        # A forked child (Celery prefork) inherits the attributes but not the
+        # thread, so the loop is (re)started per process.
+        if self._loop is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return
+            self._next_post_at = {}
+            self._channel_ids = {}
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(
+                target=self._run_loop,
+                args=(loop, ready),
+                name="slack-dispatcher",
+                daemon=True,
+            )
+            thread.start()
+            ready.wait()
+            self._loop = loop
+            self._pid = os.getpid()
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        self._queues = {}
+        self._tasks = set()
+        loop.call_soon(ready.set)
+        loop.run_forever()
+        loop.close()
+
+    def shutdown(self, timeout: float = 10.0):
+        """
+        Cancels the channel consumers (calls still queued fail) and stops the
+        background loop.
+        """
+        if self._loop is None or self._pid != os.getpid():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self._loop).result(
+                timeout
+            )
+        except Exception as e:
+            logger.error(
+                {"message": "Error stopping Slack dispatcher", "error": str(e)}
+            )
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    # --- Public API ---
+
+    def submit(self, method: str, **kwargs) -> concurrent.futures.Future:
+        """
+        Queues a Slack Web API call (e.g. "chat_postMessage") and returns a
+        Future resolved with the SlackResponse.
+        """
+        self._ensure_started()
+        future = concurrent.futures.Future()
+        # The caller's context (correlation ID, current span) travels with
+        # the call so logs and spans on the dispatcher thread stay attributed.
+        context = contextvars.copy_context()
+        self._loop.call_soon_threadsafe(self._enqueue, method, kwargs, future, context)
+        return future
+
+    async def call(self, method: str, **kwargs):
+        """Awaitable wrapper around `submit` for use inside any event loop."""
+        return await asyncio.wrap_future(self.submit(method, **kwargs))
+
+    # --- Internals ---
+
+    def _enqueue(self, method: str, kwargs: dict, future, context):
+        # Runs on the loop thread; the first call for a channel starts its
+        # consumer.
+        channel = self._channel_key(kwargs.get("channel", ""))
+        queue = self._queues.get(channel)
+        if queue is None:
+            queue = self._queues[channel] = asyncio.Queue()
+            self._tasks.add(asyncio.get_running_loop().create_task(self._drain(queue)))
+        queue.put_nowait((method, kwargs, future, context))
+
+    async def _drain(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            method, kwargs, future, context = await queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            # Awaited immediately: a channel's calls run one at a time, in order.
+            await loop.create_task(
+                self._process(method, kwargs, future), context=context
+            )
+
+    async def _process(self, method: str, kwargs: dict, future):
+        try:
+            # Includes time spent waiting for a rate-limit slot and retries.
+            with track_stage("slack_post"), span(f"slack.{method}"):
+                response = await self._call_with_retry(method, kwargs)
+        except asyncio.CancelledError:
+            future.set_exception(RuntimeError("Slack dispatcher shut down"))
+            raise
+        except Exception as e:
+            future.set_exception(e)
         else:
-            reply_subject = f"Re: {original_subject}"
+            future.set_result(response)
+
+    async def _cancel_tasks(self):
+        tasks, self._tasks = self._tasks, set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        queues, self._queues = self._queues, {}
+        for queue in queues.values():
+            while not queue.empty():
+                _, _, future, _ = queue.get_nowait()
+                future.cancel()
+
+    def _channel_key(self, channel: str) -> str:
+        return self._channel_ids.get(channel, channel)
+
+    def _learn_channel_id(self, channel: str, response):
+        channel_id = response.get("channel") if channel else None
+        if not isinstance(channel_id, str) or channel_id == channel:
+            return
+        if channel in self._channel_ids:
+            return
+        # From now on the name is queued and paced under its ID.
+        self._channel_ids[channel] = channel_id
+        self._next_post_at[channel_id] = max(
+            self._next_post_at.get(channel_id, 0.0),
+            self._next_post_at.pop(channel, 0.0),
+        )
+
+    async def _wait_for_slot(self, channel: str):
+        now = time.monotonic()
+        ready_at = self._next_post_at.get(channel, 0.0)
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+        self._next_post_at[channel] = (
+            max(ready_at, now) + settings.SLACK_MIN_POST_INTERVAL_SECONDS
+        )
 
-        button_payload = {
-            "prospect_email": prospect_email,
-            "draft_reply": draft_reply,
-            "reply_subject": reply_subject,
+    async def _call_with_retry(self, method: str, kwargs: dict):
+        client = get_slack_client()
+        channel = kwargs.get("channel", "")
+        max_retries = settings.SLACK_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            await self._wait_for_slot(self._channel_key(channel))
+            try:
+                response = await getattr(client, method)(**kwargs)
+                self._learn_channel_id(channel, response)
+                return response
+            except SlackApiError as e:
+                status = e.response.status_code
+                if attempt == max_retries or (status != 429 and status < 500):
+                    raise
+                if status == 429:
+                    retry_after = _retry_after_seconds(e.response)
+                    # Push the channel's next slot out so queued calls wait too.
+                    self._next_post_at[self._channel_key(channel)] = (
+                        time.monotonic() + retry_after
+                    )
+                    delay = random.uniform(0, settings.SLACK_RETRY_BASE_DELAY_SECONDS)
+                else:
+                    delay = _backoff_delay(attempt)
+                logger.warning(
+                    {
+                        "message": "Slack API call failed, retrying",
+                        "slack.method": method,
+                        "status_code": status,
+                        "attempt": attempt + 1,
+                    }
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == max_retries:
+                    raise
+                delay = _backoff_delay(attempt)
+                logger.warning(
+                    {
+                        "message": "Slack connection error, retrying",
+                        "slack.method": method,
+                        "error": str(e),
+                        "attempt": attempt + 1,
+                    }
+                )
+            await asyncio.sleep(delay)
+
+
+def _build_digest_blocks(entries: list[dict]) -> list[dict]:
+    # Slack caps a section's text at 3000 characters and a message at 50 blocks.
+    lines = [
+        f"• *{e['sender_name']}* (<mailto:{e['prospect_email']}|{e['prospect_email']}>)"
+        f" `{e['classification']}` — {e['summary']}"[:2900]
+        for e in entries
+    ]
+    sections, current = [], ""
+    for line in lines:
+        if current and len(current) + len(line) + 1 > 2900:
+            sections.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        sections.append(current)
+
+    blocks = [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f":inbox_tray: Reply Digest ({len(entries)})",
+            },
         }
+    ]
+    for text in sections[:45]:
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": text}})
+    if len(sections) > 45:
+        blocks.append(
+            {
+                "type": "context",
+                "elements": [
+                    {
+                        "type": "mrkdwn",
+                        "text": "Digest truncated; see logs for the rest.",
+                    }
+                ],
+            }
+        )
+    return blocks
+
+
+dispatcher = SlackDispatcher()
+atexit.register(dispatcher.shutdown)
+
+
+# --- Digest ---
+# Low-priority replies from every worker process are parked in one Redis
+# list, which the `post_slack_digest` beat task posts as a single message.
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+    return _redis_client
+
+
+def add_to_digest(entry: dict):
+    _get_redis().rpush(DIGEST_KEY, json.dumps(entry))
+
 
-        await client.chat_postMessage(
+def post_digest(timeout: float = 120.0) -> int:
+    """
+    Posts every parked digest entry as one message and returns how many were
+    posted. Entries are put back if the post fails, for the next run.
+    """
+    client = _get_redis()
+    pipe = client.pipeline()
+    pipe.lrange(DIGEST_KEY, 0, -1)
+    pipe.delete(DIGEST_KEY)
+    raw_entries, _ = pipe.execute()
+    if not raw_entries:
+        return 0
+    entries = [json.loads(raw) for raw in raw_entries]
+    try:
+        dispatcher.submit(
+            "chat_postMessage",
             channel=settings.SLACK_CHANNEL_ID,
-            text=f"New Email Reply from {sender_name}",
-            blocks=[
-                {
-                    "type": "header",
-                    "text": {"type": "plain_text", "text": ":email: New Email Reply"},
-                },
-                {
-                    "type": "section",
-                    "fields": [
-                        {"type": "mrkdwn", "text": f"*From:*\n{sender_name}"},
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Email:*\n<mailto:{prospect_email}|{prospect_email}>",
-                        },
-                    ],
-                },
+            text=f"{len(entries)} low-priority email replies",
+            blocks=_build_digest_blocks(entries),
+        ).result(timeout)
+    except Exception as e:
+        client.lpush(DIGEST_KEY, *reversed(raw_entries))
+        logger.error(
+            {
+                "message": "Error sending Slack digest",
+                "digest_size": len(entries),
+                "error": str(e),
+            }
+        )
+        return 0
+    logger.info(
+        {
+            "message": "Successfully sent Slack digest",
+            "channel_id": settings.SLACK_CHANNEL_ID,
+            "digest_size": len(entries),
+        }
+    )
+    return len(entries)
+
+
+def _parse_sender(original_sender: str) -> tuple[str, str, str]:
+    """Returns (cleaned_sender, sender_name, prospect_email)."""
+    cleaned_sender = html.unescape(original_sender)
+
+    # Parse name and email for better formatting
+    sender_name = cleaned_sender
+    prospect_email = ""
+
+    email_match = re.search(r"<(.+?)>", cleaned_sender)
+    if email_match:
+        prospect_email = email_match.group(1)
+        sender_name = cleaned_sender.split("<")[0].strip()
+    return cleaned_sender, sender_name, prospect_email
+
+
+def _build_notification_blocks(
+    analysis_json: dict,
+    sender_name: str,
+    prospect_email: str,
+    original_subject: str,
+    draft_id: str,
+    researching: bool = False,
+) -> list[dict]:
+    """
+    Builds the reply card. While `researching` is set, the standard draft is
+    shown without action buttons so a rep cannot approve a draft that is
+    about to be replaced by the personalized one.
+
+    The send buttons only carry `draft_id`; the draft itself is looked up in
+    the draft store when a button is clicked.
+    """
+    classification = analysis_json.get("classification", "N/A")
+    summary = analysis_json.get("summary", "No summary provided.")
+    draft_reply = analysis_json.get("draft_reply", "No draft reply provided.")
+
+    blocks = [
+        {
+            "type": "header",
+            "text": {"type": "plain_text", "text": ":email: New Email Reply"},
+        },
+        {
+            "type": "section",
+            "fields": [
+                {"type": "mrkdwn", "text": f"*From:*\n{sender_name}"},
                 {
-                    "type": "section",
-                    "fields": [
-                        {"type": "mrkdwn", "text": f"*Subject:*\n{original_subject}"}
-                    ],
+                    "type": "mrkdwn",
+                    "text": f"*Email:*\n<mailto:{prospect_email}|{prospect_email}>",
                 },
+            ],
+        },
+        {
+            "type": "section",
+            "fields": [{"type": "mrkdwn", "text": f"*Subject:*\n{original_subject}"}],
+        },
+        {
+            "type": "section",
+            "fields": [
                 {
-                    "type": "section",
-                    "fields": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"*Classification:*\n`{classification}`",
-                        },
-                        {"type": "mrkdwn", "text": f"*Summary:*\n{summary}"},
-                    ],
+                    "type": "mrkdwn",
+                    "text": f"*Classification:*\n`{classification}`",
                 },
-                {"type": "divider"},
+                {"type": "mrkdwn", "text": f"*Summary:*\n{summary}"},
+            ],
+        },
+        {"type": "divider"},
+    ]
+
+    if researching:
+        blocks.extend(
+            [
                 {
                     "type": "section",
                     "text": {
                         "type": "mrkdwn",
-                        "text": f"*Suggested Draft Reply:*\n```{draft_reply}```",
+                        "text": f"*Standard Draft Reply:*\n```{draft_reply}```",
                     },
                 },
-                {"type": "divider"},
                 {
-                    "type": "actions",
+                    "type": "context",
                     "elements": [
                         {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": "Approve & Send"},
-                            "style": "primary",
-                            "value": json.dumps(button_payload),
-                            "action_id": "approve_send",
-                        },
-                        {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": "Edit & Send"},
-                            "value": json.dumps(button_payload),
-                            "action_id": "edit_send",
-                        },
-                        {
-                            "type": "button",
-                            "text": {"type": "plain_text", "text": "Discard"},
-                            "style": "danger",
-                            "value": "discard",
-                            "action_id": "discard",
-                        },
+                            "type": "mrkdwn",
+                            "text": ":hourglass_flowing_sand: Researching… a personalized draft will replace this one shortly.",
+                        }
                     ],
                 },
-            ],
+            ]
+        )
+        return blocks
+
+    blocks.extend(
+        [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"*Suggested Draft Reply:*\n```{draft_reply}```",
+                },
+            },
+            {"type": "divider"},
+            {
+                "type": "actions",
+                "elements": [
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": "Approve & Send"},
+                        "style": "primary",
+                        "value": draft_id,
+                        "action_id": "approve_send",
+                    },
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": "Edit & Send"},
+                        "value": draft_id,
+                        "action_id": "edit_send",
+                    },
+                    {
+                        "type": "button",
+                        "text": {"type": "plain_text", "text": "Discard"},
+                        "style": "danger",
+                        "value": "discard",
+                        "action_id": "discard",
+                    },
+                ],
+            },
+        ]
+    )
+    return blocks
+
+
+def goes_to_digest(classification: str, researching: bool = False) -> bool:
+    """True if a reply is only listed in the digest, without a card or buttons."""
+    return (
+        not researching
+        and settings.SLACK_DIGEST_ENABLED
+        and classification in settings.SLACK_DIGEST_CLASSIFICATIONS
+    )
+
+
+async def send_slack_notification(
+    analysis_json: dict,
+    original_sender: str,
+    original_subject: str,
+    draft_id: str | None,
+    researching: bool = False,
+) -> dict | None:
+    """
+    Formats the agent's analysis and sends an interactive notification to a Slack channel.
+
+    Returns a message reference ({"channel": ..., "ts": ...}) that can be passed
+    to `update_slack_notification`, or None if nothing was posted.
+    """
+    try:
+        cleaned_sender, sender_name, prospect_email = _parse_sender(original_sender)
+        classification = analysis_json.get("classification", "N/A")
+
+        if goes_to_digest(classification, researching):
+            await asyncio.to_thread(
+                add_to_digest,
+                {
+                    "sender_name": sender_name,
+                    "prospect_email": prospect_email,
+                    "classification": classification,
+                    "summary": analysis_json.get("summary", "No summary provided."),
+                },
+            )
+            logger.info(
+                {
+                    "message": "Queued low-priority reply for Slack digest",
+                    "classification": classification,
+                    "sender": cleaned_sender,
+                }
+            )
+            return None
+
+        response = await dispatcher.call(
+            "chat_postMessage",
+            channel=settings.SLACK_CHANNEL_ID,
+            text=f"New Email Reply from {sender_name}",
+            blocks=_build_notification_blocks(
+                analysis_json,
+                sender_name,
+                prospect_email,
+                original_subject,
+                draft_id,
+                researching=researching,
+            ),
         )
         logger.info(
             {
                 "message": "Successfully sent interactive notification to Slack",
                 "channel_id": settings.SLACK_CHANNEL_ID,
                 "sender": cleaned_sender,
+                "researching": researching,
             }
         )
+        return {"channel": response["channel"], "ts": response["ts"]}
     except Exception as e:
         logger.error({"message": "Error sending Slack notification", "error": str(e)})
+        return None
+
+
+async def update_slack_notification(
+    message_ref: dict,
+    analysis_json: dict,
+    original_sender: str,
+    original_subject: str,
+    draft_id: str,
+):
+    """
+    Replaces a previously posted notification in place via `chat_update`,
+    turning it into the final, actionable card.
+    """
+    try:
+        cleaned_sender, sender_name, prospect_email = _parse_sender(original_sender)
+        await dispatcher.call(
+            "chat_update",
+            channel=message_ref["channel"],
+            ts=message_ref["ts"],
+            text=f"New Email Reply from {sender_name}",
+            blocks=_build_notification_blocks(
+                analysis_json, sender_name, prospect_email, original_subject, draft_id
+            ),
+        )
+        logger.info(
+            {
+                "message": "Successfully updated Slack notification",
+                "channel_id": message_ref["channel"],
+                "sender": cleaned_sender,
+            }
+        )
+    except Exception as e:
+        logger.error({"message": "Error updating Slack notification", "error": str(e)})
@@ -1,39 +1,88 @@
 import asyncio
+import itertools
 import re
-from celery import Celery
-from agents import Runner, trace
+import time
+from celery.signals import worker_process_init, worker_process_shutdown
+from agents import trace
 
 from .config import settings
+from .celery_app import celery_app
 from .logging_config import (
     logger,
     setup_logging,
+    shutdown_logging,
     get_correlation_id,
     set_correlation_id,
 )
 from .database import (
     add_message_to_conversation,
     get_conversation_history,
-    init_db,
     mark_research_performed,
+    create_draft,
+    add_draft_version,
+    purge_expired_drafts as delete_expired_drafts,
+    claim_campaign_sends,
+    mark_campaign_send,
+    record_messages,
+    resolve_thread,
+    schedule_follow_up,
+)
+from .utils import (
+    normalize_subject,
+    get_prospect_details_by_email,
+    make_message_id,
+    make_reply_subject,
+    reply_references,
+    thread_lookup_ids,
+)
+from .slack_notifier import (
+    goes_to_digest,
+    post_digest,
+    send_slack_notification,
+    update_slack_notification,
+    dispatcher,
 )
-from .utils import normalize_subject, get_prospect_details_by_email
-from .slack_notifier import send_slack_notification
 from .email_utils import send_single_email
+from .main import OutboundMessageIndex, SenderIdentity, send_campaign
+from .campaigns import (
+    campaign_progress,
+    finish_shard,
+    load_shard,
+    renew_shard_lease,
+    plan_campaign_shards,
+    record_shard_result,
+    schedule_campaigns as run_scheduler_tick,
+)
+from .follow_ups import process_due_follow_ups
+from .model_policy import FAST, choose_sdr_tier, escalation, observe_full_latency
 from .reply_agent import (
-    SDR_Agent,
-    Research_Agent,
-    Personalized_Writer_Agent,
+    get_sdr_agent,
+    get_research_agent,
+    get_personalized_writer_agent,
     SdrAnalysis,
     ResearchOutput,
     FinalReply,
 )
-from .celery_instrumentation import ContextTask
+from .agent_runner import run_agent
+from .conversation_context import build_conversation_context
+from .tracing import span
+from .metrics import CLASSIFICATIONS, start_metrics, shutdown_metrics
+from .usage import set_run_context
 
 setup_logging()
-init_db()
 
-celery_app = Celery("tasks", broker=settings.CELERY_BROKER_URL)
-celery_app.Task = ContextTask
+
+@worker_process_shutdown.connect
+def _flush_on_shutdown(**kwargs):
+    dispatcher.shutdown()
+    shutdown_metrics()
+    shutdown_logging()
+
+
+@worker_process_init.connect
+def _start_child_metrics(**kwargs):
+    # Runs in each prefork child, where the tasks and their DB pool live.
+    start_metrics()
 
 
 def _ensure_correlation(correlation_id):
@@ -45,7 +94,11 @@ def _ensure_correlation(correlation_id):
 
 @celery_app.task
 def add_approved_reply_to_history(
-    prospect_email: str, subject: str, body: str, correlation_id=None
+    prospect_email: str,
+    subject: str,
+    body: str,
+    correlation_id=None,
+    thread_subject: str | None = None,
 ):
     _ensure_correlation(correlation_id)
     try:
@@ -55,23 +108,154 @@ def add_approved_reply_to_history(
                 "prospect_email": prospect_email,
             }
         )
-        add_message_to_conversation(prospect_email, subject, "sales_rep", body)
+        add_message_to_conversation(
+            prospect_email,
+            thread_subject or normalize_subject(subject),
+            "sales_rep",
+            body,
+        )
     except Exception as e:
         logger.error({"message": "Error saving approved reply", "error": str(e)})
 
 
+def _write_personalized_draft(prospect_details: dict, conversation_history_str: str):
+    """Runs the Research and Personalized Writer agents for a qualified lead."""
+    research_input = (
+        f"FirstName: {prospect_details.get('FirstName', '')}, "
+        f"LastName: {prospect_details.get('LastName', '')}, "
+        f"Company: {prospect_details.get('Company', '')}"
+    )
+
+    logger.info(
+        {
+            "message": "Triggering research.",
+            "research_input": research_input,
+        }
+    )
+
+    with trace("Step2a_Lead_Research"):
+        research_output: ResearchOutput = asyncio.run(
+            # Research depends on what web search finds today, not only on
+            # its input, so it is never served from the agent cache.
+            run_agent(
+                get_research_agent(), research_input, stage="research", use_cache=False
+            )
+        )
+
+    logger.info(
+        {
+            "message": "Research complete",
+            "findings": research_output.research_summary,
+        }
+    )
+
+    writer_input = (
+        f"Conversation History: {conversation_history_str}\n"
+        f"Research Summary: {research_output.research_summary}"
+    )
+    with trace("Step2b_Personalized_Writing"):
+        final_reply_output: FinalReply = asyncio.run(
+            run_agent(get_personalized_writer_agent(), writer_input, stage="writer")
+        )
+
+    return final_reply_output.draft_reply
+
+
+def _run_sdr_analysis(prospect_email: str, conversation_history_str: str):
+    """
+    Runs the SDR analysis on the model tier chosen by `model_policy`; a
+    low-confidence fast-tier result is replaced by a full-tier rerun.
+    """
+    choice = choose_sdr_tier()
+    while True:
+        start = time.perf_counter()
+        with trace("Step1_Initial_SDR_Analysis"):
+            result: SdrAnalysis = asyncio.run(
+                run_agent(
+                    get_sdr_agent(choice.model),
+                    conversation_history_str,
+                    stage="sdr",
+                    tier=choice.tier,
+                )
+            )
+        if choice.tier != FAST:
+            observe_full_latency(time.perf_counter() - start)
+        rerun = escalation(choice, result.confidence)
+        if rerun is None:
+            return result
+        logger.info(
+            {
+                "message": "Low-confidence SDR analysis, escalating",
+                "prospect_email": prospect_email,
+                "model": choice.model,
+                "classification": result.classification,
+                "confidence": result.confidence,
+            }
+        )
+        choice = rerun
+
+
+def _resolve_thread_subject(
+    prospect_email: str,
+    subject: str,
+    in_reply_to: str | None,
+    references: list[str] | None,
+) -> str:
+    """
+    The conversation key of an inbound reply: the thread of the message it
+    answers (In-Reply-To/References), or its normalized subject when none of
+    those messages are known (e.g. mail clients that drop the headers).
+    """
+    with span("db.resolve_thread"):
+        thread = resolve_thread(thread_lookup_ids(in_reply_to, references))
+    if thread:
+        return thread[1]
+    logger.info(
+        {
+            "message": "Thread not found by headers, using subject",
+            "prospect_email": prospect_email,
+            "has_thread_headers": bool(in_reply_to or references),
+        }
+    )
+    return normalize_subject(subject)
+
+
 @celery_app.task
-def process_inbound_email(sender: str, subject: str, body: str, correlation_id=None):
+def process_inbound_email(
+    sender: str,
+    subject: str,
+    body: str,
+    correlation_id=None,
+    message_id: str | None = None,
+    in_reply_to: str | None = None,
+    references: list[str] | None = None,
+):
     _ensure_correlation(correlation_id)
     try:
         match = re.search(r"<(.+?)>", sender)
         prospect_email = match.group(1) if match else sender
-        normalized_subject = normalize_subject(subject)
-
-        add_message_to_conversation(
-            prospect_email, normalized_subject, "prospect", body
+        normalized_subject = _resolve_thread_subject(
+            prospect_email, subject, in_reply_to, references
         )
-        conversation = get_conversation_history(prospect_email, normalized_subject)
+        if message_id:
+            record_messages(
+                [
+                    {
+                        "message_id": message_id,
+                        "prospect_email": prospect_email,
+                        "subject": normalized_subject,
+                    }
+                ],
+                direction="inbound",
+            )
+        set_run_context(prospect_email=prospect_email)
+
+        with span("db.append_message"):
+            add_message_to_conversation(
+                prospect_email, normalized_subject, "prospect", body
+            )
+        with span("db.get_conversation"):
+            conversation = get_conversation_history(prospect_email, normalized_subject)
         if not conversation:
             logger.error(
                 {
@@ -81,23 +265,29 @@ def process_inbound_email(sender: str, subject: str, body: str, correlation_id=N
             )
             return
 
-        conversation_history_str = conversation.conversation_history
+        with span("conversation.context"):
+            conversation_history_str = build_conversation_context(conversation)
 
-        with trace("Step1_Initial_SDR_Analysis"):
-            run_result = asyncio.run(Runner.run(SDR_Agent, conversation_history_str))
-            initial_result: SdrAnalysis = run_result.final_output
+        initial_result = _run_sdr_analysis(prospect_email, conversation_history_str)
+        CLASSIFICATIONS.inc(classification=initial_result.classification)
 
         logger.info(
             {
                 "message": "Initial analysis complete",
                 "prospect_email": prospect_email,
                 "classification": initial_result.classification,
+                "confidence": initial_result.confidence,
                 "research_performed": conversation.research_performed,
             }
         )
 
-        final_draft_for_slack = initial_result.draft_reply
+        initial_analysis = {
+            "classification": initial_result.classification,
+            "summary": initial_result.summary,
+            "draft_reply": initial_result.draft_reply,
+        }
 
+        prospect_details = None
         if (
             initial_result.classification in ["POSITIVE_INTEREST", "QUESTION"]
             and not conversation.research_performed
@@ -108,54 +298,8 @@ def process_inbound_email(sender: str, subject: str, body: str, correlation_id=N
                     "prospect_email": prospect_email,
                 }
             )
-
             prospect_details = get_prospect_details_by_email(prospect_email)
-            if prospect_details:
-                research_input = (
-                    f"FirstName: {prospect_details.get('FirstName', '')}, "
-                    f"LastName: {prospect_details.get('LastName', '')}, "
-                    f"Company: {prospect_details.get('Company', '')}"
-                )
-
-                logger.info(
-                    {
-                        "message": "Triggering research.",
-                        "research_input": research_input,
-                    }
-                )
-
-                with trace("Step2a_Lead_Research"):
-                    research_run_result = asyncio.run(
-                        Runner.run(Research_Agent, research_input)
-                    )
-                    research_output: ResearchOutput = research_run_result.final_output
-
-                logger.info(
-                    {
-                        "message": "Research complete",
-                        "findings": research_output.research_summary,
-                    }
-                )
-
-                writer_input = (
-                    f"Conversation History: {conversation_history_str}\n"
-                    f"Research Summary: {research_output.research_summary}"
-                )
-                with trace("Step2b_Personalized_Writing"):
-                    writer_run_result = asyncio.run(
-                        Runner.run(Personalized_Writer_Agent, writer_input)
-                    )
-                    final_reply_output: FinalReply = writer_run_result.final_output
-
-                final_draft_for_slack = final_reply_output.draft_reply
-                mark_research_performed(prospect_email, normalized_subject)
-                logger.info(
-                    {
-                        "message": "Personalized draft created and research flag set",
-                        "prospect_email": prospect_email,
-                    }
-                )
-            else:
+            if not prospect_details:
                 logger.warning(
                     {
                         "message": "Prospect not found in CSV. Skipping research.",
@@ -170,12 +314,77 @@ def process_inbound_email(sender: str, subject: str, body: str, correlation_id=N
                 }
             )
 
-        final_analysis_for_slack = {
-            "classification": initial_result.classification,
-            "summary": initial_result.summary,
-            "draft_reply": final_draft_for_slack,
-        }
-        asyncio.run(send_slack_notification(final_analysis_for_slack, sender, subject))
+        # A reply that only goes to the digest gets no buttons, so no draft.
+        draft_id = None
+        if not goes_to_digest(
+            initial_result.classification, researching=bool(prospect_details)
+        ):
+            draft_id = create_draft(
+                prospect_email,
+                make_reply_subject(subject),
+                initial_result.draft_reply,
+                author="sdr_agent",
+                thread_subject=normalized_subject,
+                in_reply_to=message_id,
+                thread_references=(
+                    reply_references(references, message_id) if message_id else None
+                ),
+            )
+
+        # Phase 1: the card goes out as soon as the SDR analysis is available.
+        # For leads that are being researched it is posted in a "researching"
+        # state and updated in place once the personalized draft is ready.
+        slack_message = asyncio.run(
+            send_slack_notification(
+                initial_analysis,
+                sender,
+                subject,
+                draft_id,
+                researching=bool(prospect_details),
+            )
+        )
+        if not prospect_details:
+            return
+
+        # Phase 2: research and personalized writing.
+        final_analysis_for_slack = dict(initial_analysis)
+        try:
+            personalized_draft = _write_personalized_draft(
+                prospect_details, conversation_history_str
+            )
+            add_draft_version(
+                draft_id, personalized_draft, author="personalized_writer"
+            )
+            final_analysis_for_slack["draft_reply"] = personalized_draft
+            mark_research_performed(prospect_email, normalized_subject)
+            logger.info(
+                {
+                    "message": "Personalized draft created and research flag set",
+                    "prospect_email": prospect_email,
+                }
+            )
+        except Exception as e:
+            # Fall back to the standard draft so the card becomes actionable.
+            logger.error(
+                {
+                    "message": "Personalized drafting failed, keeping standard draft",
+                    "prospect_email": prospect_email,
+                    "error": str(e),
+                }
+            )
+
+        if slack_message:
+            asyncio.run(
+                update_slack_notification(
+                    slack_message, final_analysis_for_slack, sender, subject, draft_id
+                )
+            )
+        else:
+            asyncio.run(
+                send_slack_notification(
+                    final_analysis_for_slack, sender, subject, draft_id
+                )
+            )
 
     except Exception as e:
         logger.error(
@@ -188,7 +397,205 @@ def process_inbound_email(sender: str, subject: str, body: str, correlation_id=N
 
 
 @celery_app.task
-def send_approved_email(to_email: str, subject: str, body: str, correlation_id=None):
+def send_approved_email(
+    to_email: str,
+    subject: str,
+    body: str,
+    correlation_id=None,
+    thread_subject: str | None = None,
+    in_reply_to: str | None = None,
+    references: str | None = None,
+):
     _ensure_correlation(correlation_id)
     logger.info({"message": "Executing send_approved_email task", "to_email": to_email})
-    send_single_email(to_email, subject, body)
+    message_id = make_message_id()
+    thread_subject = thread_subject or normalize_subject(subject)
+    if send_single_email(to_email, subject, body, message_id, in_reply_to, references):
+        # The prospect's answer to this reply will reference message_id.
+        record_messages(
+            [
+                {
+                    "message_id": message_id,
+                    "prospect_email": to_email,
+                    "subject": thread_subject,
+                }
+            ],
+            direction="outbound",
+        )
+        if settings.FOLLOW_UP_ENABLED:
+            schedule_follow_up(to_email, thread_subject, message_id, 0)
+
+
+def _campaign_key(email: str) -> str:
+    return email.strip().lower()
+
+
+def _send_shard(
+    campaign_id: str,
+    subject: str,
+    body_template: str,
+    prospects: list[dict],
+    sender: SenderIdentity | None = None,
+    on_claim=None,
+) -> dict:
+    """
+    Sends one shard of a campaign and returns its sent/failed/skipped counts.
+    Prospects are claimed in `campaign_sends` in batches of
+    CAMPAIGN_CLAIM_BATCH_SIZE as the sender gets to them, so a claim is
+    never much older than its send and a redelivered or re-run shard skips
+    everyone who was already sent. `on_claim()` is called after each batch.
+    """
+    set_run_context(campaign_id=campaign_id)
+    by_email = {}
+    for prospect in prospects:
+        by_email.setdefault(_campaign_key(prospect["Email"]), prospect)
+    attempted = 0
+
+    def claimed_prospects():
+        nonlocal attempted
+        for batch in itertools.batched(
+            by_email.items(), settings.CAMPAIGN_CLAIM_BATCH_SIZE
+        ):
+            claimed = claim_campaign_sends(campaign_id, [email for email, _ in batch])
+            if on_claim:
+                on_claim()
+            for email, prospect in batch:
+                if email in claimed:
+                    attempted += 1
+                    yield prospect
+
+    index = OutboundMessageIndex(subject, body_template)
+
+    def record(prospect: dict, ok: bool, message_id: str):
+        mark_campaign_send(campaign_id, _campaign_key(prospect["Email"]), ok)
+        index.add(prospect, ok, message_id)
+
+    result = send_campaign(
+        subject, body_template, claimed_prospects(), on_result=record, sender=sender
+    )
+    index.flush()
+    sent = result.get("sent", 0)
+    counts = {
+        "sent": sent,
+        "failed": attempted - sent,
+        "skipped": len(prospects) - attempted,
+    }
+    logger.info(
+        {"message": "Campaign shard complete", "campaign_id": campaign_id, **counts}
+    )
+    return counts
+
+
+@celery_app.task
+def send_campaign_shard(
+    campaign_id: str,
+    shard_index: int,
+    subject: str,
+    body_template: str,
+    prospects: list[dict],
+    correlation_id=None,
+):
+    """Sends one shard of a campaign started by the Campaign_Sender_Agent."""
+    _ensure_correlation(correlation_id)
+    counts = _send_shard(campaign_id, subject, body_template, prospects)
+    record_shard_result(campaign_id, shard_index, len(prospects), counts)
+    return counts
+
+
+@celery_app.task
+def summarize_campaign(
+    campaign_id: str, shards: int, dispatched_at: float, correlation_id=None
+):
+    """
+    Logs the totals of a campaign the Campaign_Sender_Agent fanned out once
+    all of its shards are done. Until then it re-queues itself every
+    CAMPAIGN_SUMMARY_INTERVAL_SECONDS, giving up after
+    CAMPAIGN_RESULT_TIMEOUT_SECONDS.
+    """
+    _ensure_correlation(correlation_id)
+    progress = campaign_progress(campaign_id)
+    if progress["shards_done"] < shards:
+        if time.time() - dispatched_at < settings.CAMPAIGN_RESULT_TIMEOUT_SECONDS:
+            summarize_campaign.apply_async(
+                (campaign_id, shards, dispatched_at),
+                {"correlation_id": correlation_id},
+                countdown=settings.CAMPAIGN_SUMMARY_INTERVAL_SECONDS,
+            )
+            return
+        logger.warning({"message": "Campaign unfinished", "shards": shards, **progress})
+        return
+    logger.info({"message": "Campaign complete", "shards": shards, **progress})
+
+
+@celery_app.task
+def send_due_follow_ups(correlation_id=None):
+    """Beat task: sends the follow-ups that are due, one batch per run."""
+    _ensure_correlation(correlation_id)
+    if not settings.FOLLOW_UP_ENABLED:
+        return
+    counts = process_due_follow_ups()
+    logger.info({"message": "Follow-up tick complete", **counts})
+    if counts["more"]:
+        # Drain a backlog without waiting for the next tick.
+        send_due_follow_ups.delay()
+
+
+@celery_app.task
+def purge_expired_drafts(correlation_id=None):
+    """Beat task: deletes drafts older than DRAFT_TTL_HOURS."""
+    _ensure_correlation(correlation_id)
+    deleted = delete_expired_drafts()
+    logger.info({"message": "Expired drafts purged", "deleted": deleted})
+
+
+@celery_app.task
+def post_slack_digest(correlation_id=None):
+    """Beat task: posts the low-priority replies parked since the last run."""
+    _ensure_correlation(correlation_id)
+    if settings.SLACK_DIGEST_ENABLED:
+        post_digest()
+
+
+@celery_app.task
+def schedule_campaigns(correlation_id=None):
+    """Beat task: starts queued API campaigns and dispatches their shards."""
+    _ensure_correlation(correlation_id)
+    counts = run_scheduler_tick()
+    if any(counts.values()):
+        logger.info({"message": "Campaign scheduler tick", **counts})
+
+
+@celery_app.task
+def plan_campaign(campaign_id: str, correlation_id=None):
+    """Validates an API campaign's prospect list and splits it into shards."""
+    _ensure_correlation(correlation_id)
+    plan_campaign_shards(campaign_id)
+    schedule_campaigns.delay()
+
+
+@celery_app.task
+def run_campaign_shard(campaign_id: str, shard_index: int, correlation_id=None):
+    """Sends one shard of an API campaign from the campaign's own sender."""
+    _ensure_correlation(correlation_id)
+    loaded = load_shard(campaign_id, shard_index)
+    if loaded is None:
+        return
+    campaign, prospects = loaded
+    if campaign.status != "running":
+        # Cancelled since the shard was dispatched.
+        finish_shard(campaign_id, shard_index)
+        return
+    sender = SenderIdentity(
+        campaign.sender_email, campaign.sender_name, campaign.reply_to_email
+    )
+    counts = _send_shard(
+        campaign_id,
+        campaign.subject,
+        campaign.body_template,
+        prospects,
+        sender,
+        on_claim=lambda: renew_shard_lease(campaign_id, shard_index),
+    )
+    finish_shard(campaign_id, shard_index, counts)
+    # Hand the freed slot out now rather than at the next tick.
+    schedule_campaigns.delay()
@@ -1,10 +1,13 @@
 # app/tools.py
 
-from tavily import TavilyClient
 from agents import function_tool
 
+from .clients import get_tavily_client
 from .config import settings
 from .logging_config import logger
+from .metrics import track_stage
+from .tracing import span
+from .search_ranking import select_passages
 
 
 @function_tool
@@ -38,23 +41,42 @@ def web_search(first_name: str, last_name: str, company: str):
 
     all_results = []
     try:
-        tavily = TavilyClient(api_key=settings.TAVILY_API_KEY)
-        for query in queries:
-            response = tavily.search(
-                query=query, search_depth="basic", max_results=2, time_range="week"
-            )
-            if response.get("results"):
-                all_results.extend(response["results"])
+        tavily = get_tavily_client()
+        with track_stage("web_search"):
+            for query in queries:
+                with span("tavily.search", **{"tavily.query": query}):
+                    response = tavily.search(
+                        query=query,
+                        search_depth="basic",
+                        max_results=2,
+                        time_range="week",
+                    )
+                if response.get("results"):
+                    all_results.extend(response["results"])
 
         if not all_results:
             logger.warning({"message": "Comprehensive web search returned no results"})
             return "No relevant information found."
 
-        # Consolidate results into a single summary string
+        # Keep only the most relevant distinct passages within the token budget
+        passages, stats = select_passages(
+            all_results,
+            query=f"{first_name} {last_name} {company}",
+            token_budget=settings.WEB_SEARCH_TOKEN_BUDGET,
+            max_words=settings.WEB_SEARCH_PASSAGE_WORDS,
+            dedupe_threshold=settings.WEB_SEARCH_DEDUP_THRESHOLD,
+        )
+        if not passages:
+            # Every passage was larger than the whole budget.
+            logger.warning(
+                {"message": "No search passage fits the token budget", **stats}
+            )
+            return "No relevant information found."
+
         consolidated_summary = "\n\n---\n\n".join(
-            [f"URL: {res['url']}\nContent: {res['content']}" for res in all_results]
+            [f"URL: {p.url}\nContent: {p.text}" for p in passages]
         )
-        logger.info({"message": "Comprehensive web search successful"})
+        logger.info({"message": "Comprehensive web search successful", **stats})
         return consolidated_summary
 
     except Exception as e:
@@ -0,0 +1,216 @@
+# app/tracing.py
+
+"""
+Lightweight span recorder for the reply pipeline.
+
+Spans share the trace ID derived from the request's correlation ID, so every
+hop of one reply (webhook, queue wait, DB, agent runs, Tavily queries, Slack)
+lands in the same trace. Finished spans are exported either as OTLP/JSON lines
+to a file (readable by the OpenTelemetry Collector's `otlpjsonfile` receiver)
+or kept in memory for tests and benchmarks. Disabled unless TRACING_ENABLED.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import settings
+from .logging_config import get_correlation_id, SERVICE_NAME
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def trace_id_for(correlation_id: str | None) -> str:
+    """Maps a correlation ID to a 32-hex-digit trace ID (UUIDs map verbatim)."""
+    if not correlation_id:
+        return secrets.token_hex(16)
+    compact = correlation_id.replace("-", "").lower()
+    if len(compact) == 32 and all(c in "0123456789abcdef" for c in compact):
+        return compact
+    return hashlib.sha256(correlation_id.encode()).hexdigest()[:32]
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(self, name, trace_id, parent_span_id, start_ns, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.start_ns = start_ns
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class FileSpanExporter:
+    """Appends one OTLP/JSON `ExportTraceServiceRequest` per span to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    def export(self, span: Span):
+        line = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                _otlp_attribute("service.name", SERVICE_NAME)
+                            ]
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": "agentic_sales_copilot"},
+                                "spans": [span.to_otlp()],
+                            }
+                        ],
+                    }
+                ]
+            },
+            separators=(",", ":"),
+        )
+        with self._lock:
+            if self._pid != os.getpid():
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+                self._pid = os.getpid()
+            # One write per line keeps lines from concurrent processes intact.
+            self._file.write(line + "\n")
+
+
+class InMemorySpanExporter:
+    """Keeps finished spans in process (for tests and benchmarks)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans: list[Span] = []
+
+    def export(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def get_finished_spans(self, trace_id: str | None = None) -> list[Span]:
+        with self._lock:
+            return [s for s in self.spans if trace_id in (None, s.trace_id)]
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+
+def _build_exporter():
+    if settings.TRACING_EXPORTER == "memory":
+        return InMemorySpanExporter()
+    return FileSpanExporter(settings.TRACING_FILE_PATH)
+
+
+exporter = _build_exporter() if settings.TRACING_ENABLED else None
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def current_span_id() -> str | None:
+    span = _current_span.get()
+    return span.span_id if span else None
+
+
+def _start(name: str, parent_span_id: str | None, start_ns: int, attributes: dict):
+    parent = _current_span.get()
+    if parent is not None and parent_span_id is None:
+        return Span(name, parent.trace_id, parent.span_id, start_ns, attributes)
+    return Span(
+        name, trace_id_for(get_correlation_id()), parent_span_id, start_ns, attributes
+    )
+
+
+@contextmanager
+def span(name: str, parent_span_id: str | None = None, **attributes):
+    """
+    Records a timed span nested under the current one. `parent_span_id`
+    links to a span from another process (e.g. the web request that queued
+    a Celery task). Yields the Span, or None when tracing is disabled.
+    """
+    if exporter is None:
+        yield None
+        return
+    current = _start(name, parent_span_id, time.time_ns(), dict(attributes))
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        exporter.export(current)
+
+
+def record_span(
+    name: str,
+    start_ns: int,
+    end_ns: int,
+    parent_span_id: str | None = None,
+    **attributes,
+):
+    """Records a span after the fact, e.g. the time a task spent queued."""
+    if exporter is None:
+        return
+    finished = _start(name, parent_span_id, start_ns, dict(attributes))
+    finished.end_ns = end_ns
+    exporter.export(finished)
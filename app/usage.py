@@ -0,0 +1,74 @@
+# app/usage.py
+
+"""
+Per-run accounting of agent token usage, wall time and cache hits.
+
+`run_agent` calls `record_agent_run` for every execution; the prospect or
+campaign a run belongs to is taken from the run context set by the task or
+workflow that triggered it (`set_run_context`), alongside the correlation ID.
+"""
+
+import contextvars
+
+from .config import settings
+from .database import record_agent_run as insert_agent_run
+from .logging_config import get_correlation_id, logger
+
+prospect_email_var = contextvars.ContextVar("prospect_email", default=None)
+campaign_id_var = contextvars.ContextVar("campaign_id", default=None)
+
+
+def set_run_context(prospect_email: str | None = None, campaign_id: str | None = None):
+    """
+    Attributes subsequent agent runs in this context to a prospect and/or
+    campaign. Both are always set, so a worker thread never carries over the
+    previous task's values.
+    """
+    prospect_email_var.set(prospect_email)
+    campaign_id_var.set(campaign_id)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float | None:
+    """USD cost from MODEL_PRICING, or None for models without a price."""
+    pricing = settings.MODEL_PRICING.get(model)
+    if not pricing:
+        return None
+    input_price, output_price = pricing
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def record_agent_run(
+    *,
+    stage: str,
+    agent,
+    prompt_hash: str | None,
+    wall_ms: float,
+    usage=None,
+    cache_hit: bool = False,
+    error: str | None = None,
+    tier: str | None = None,
+):
+    """Stores one agent run; failures are logged and never raised."""
+    if not settings.USAGE_TRACKING_ENABLED:
+        return
+    try:
+        insert_agent_run(
+            correlation_id=get_correlation_id(),
+            stage=stage,
+            agent=agent.name,
+            model=str(agent.model),
+            prompt_hash=prompt_hash,
+            requests=usage.requests if usage else 0,
+            input_tokens=usage.input_tokens if usage else 0,
+            output_tokens=usage.output_tokens if usage else 0,
+            wall_ms=wall_ms,
+            cache_hit=cache_hit,
+            error=error,
+            tier=tier,
+            prospect_email=prospect_email_var.get(),
+            campaign_id=campaign_id_var.get(),
+        )
+    except Exception as e:
+        logger.warning(
+            {"message": "Error recording agent run", "stage": stage, "error": str(e)}
+        )
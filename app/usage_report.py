@@ -0,0 +1,110 @@
+# app/usage_report.py
+
+"""
+Token, cost and latency totals from the agent_runs table.
+
+    python -m app.usage_report                      # per stage, last 24 hours
+    python -m app.usage_report --by campaign --hours 168
+    python -m app.usage_report --by model --json
+    python -m app.usage_report --by tier            # model tiering decisions
+
+Latency percentiles only cover runs that called the model (cache hits are
+counted separately); costs use MODEL_PRICING from the settings.
+"""
+
+import argparse
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from .database import get_session
+from .usage import estimate_cost
+
+GROUP_COLUMNS = {
+    "stage": "stage",
+    "agent": "agent",
+    "model": "model",
+    "tier": "tier",
+    "campaign": "campaign_id",
+    "prospect": "prospect_email",
+}
+
+REPORT_QUERY = """
+SELECT
+    {column} AS key,
+    model,
+    count(*) AS runs,
+    count(*) FILTER (WHERE cache_hit) AS cache_hits,
+    count(*) FILTER (WHERE error IS NOT NULL) AS errors,
+    coalesce(sum(input_tokens), 0) AS input_tokens,
+    coalesce(sum(output_tokens), 0) AS output_tokens,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY wall_ms)
+        FILTER (WHERE NOT cache_hit) AS p50_ms,
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY wall_ms)
+        FILTER (WHERE NOT cache_hit) AS p95_ms,
+    percentile_cont(0.99) WITHIN GROUP (ORDER BY wall_ms)
+        FILTER (WHERE NOT cache_hit) AS p99_ms
+FROM agent_runs
+WHERE created_at >= :since
+GROUP BY {column}, model
+ORDER BY {column}, model
+"""
+
+
+def usage_report(by: str = "stage", hours: float = 24) -> list[dict]:
+    """Returns one row per (group, model) with token, cost and latency totals."""
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    query = text(REPORT_QUERY.format(column=GROUP_COLUMNS[by]))
+    with get_session() as db:
+        rows = [dict(row._mapping) for row in db.execute(query, {"since": since})]
+    for row in rows:
+        row["cost_usd"] = estimate_cost(
+            row["model"], row["input_tokens"], row["output_tokens"]
+        )
+    return rows
+
+
+def _format_ms(value) -> str:
+    return f"{value:,.0f}" if value is not None else "-"
+
+
+def print_report(rows: list[dict], by: str):
+    header = (
+        f"{by:<28} {'model':<14} {'runs':>6} {'hits':>5} {'errs':>5} "
+        f"{'in tok':>10} {'out tok':>9} {'cost $':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    total_cost = 0.0
+    for row in rows:
+        cost = row["cost_usd"]
+        total_cost += cost or 0.0
+        print(
+            f"{str(row['key'] or '-')[:28]:<28} {row['model'][:14]:<14} "
+            f"{row['runs']:>6} {row['cache_hits']:>5} {row['errors']:>5} "
+            f"{row['input_tokens']:>10,} {row['output_tokens']:>9,} "
+            f"{f'{cost:.4f}' if cost is not None else '-':>9} "
+            f"{_format_ms(row['p50_ms']):>8} {_format_ms(row['p95_ms']):>8} "
+            f"{_format_ms(row['p99_ms']):>8}"
+        )
+    print(f"\nEstimated total cost: ${total_cost:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--by", choices=sorted(GROUP_COLUMNS), default="stage")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON.")
+    args = parser.parse_args()
+
+    rows = usage_report(args.by, args.hours)
+    if args.json:
+        print(json.dumps(rows, indent=2, default=str))
+    else:
+        print_report(rows, args.by)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 # app/utils.py
 
 import re
-import csv
+import uuid
+from email.parser import HeaderParser
 from .config import settings
 from .logging_config import logger
+from .prospects import find_prospect
 from typing import Dict, Optional
 
 
@@ -22,9 +24,70 @@ def normalize_subject(subject: str) -> str:
     return normalized
 
 
+def make_reply_subject(subject: str) -> str:
+    """Prefixes a subject with "Re: " unless it already has it (case-insensitive)."""
+    if subject.lower().startswith("re: "):
+        return subject
+    return f"Re: {subject}"
+
+
+_MESSAGE_ID_RE = re.compile(r"<[^<>\s]+>")
+# Longer References chains keep their first (thread root) and latest IDs.
+MAX_REFERENCES = 20
+
+
+def make_message_id() -> str:
+    """A new RFC 5322 Message-ID in the sender's domain."""
+    domain = settings.SENDER_EMAIL.rpartition("@")[2] or "localhost"
+    return f"<{uuid.uuid4().hex}@{domain}>"
+
+
+def parse_message_ids(value: str | None) -> list[str]:
+    """Message-IDs in a header value such as In-Reply-To or References."""
+    return _MESSAGE_ID_RE.findall(value or "")
+
+
+def parse_thread_headers(raw_headers: str | None) -> dict:
+    """
+    Extracts Message-ID, In-Reply-To and References from the raw header
+    block SendGrid Inbound Parse posts in its `headers` field.
+    """
+    if not raw_headers:
+        return {"message_id": None, "in_reply_to": None, "references": []}
+    headers = HeaderParser().parsestr(raw_headers)
+    message_ids = parse_message_ids(headers.get("Message-ID"))
+    in_reply_to = parse_message_ids(headers.get("In-Reply-To"))
+    return {
+        "message_id": message_ids[0] if message_ids else None,
+        "in_reply_to": in_reply_to[0] if in_reply_to else None,
+        "references": parse_message_ids(headers.get("References")),
+    }
+
+
+def reply_references(references: list[str] | None, parent_id: str) -> str:
+    """
+    The References header of a reply to message `parent_id`: the parent's
+    References chain followed by its Message-ID (RFC 5322 3.6.4).
+    """
+    chain = [ref for ref in references or [] if ref != parent_id] + [parent_id]
+    if len(chain) > MAX_REFERENCES:
+        chain = chain[:1] + chain[-(MAX_REFERENCES - 1) :]
+    return " ".join(chain)
+
+
+def thread_lookup_ids(
+    in_reply_to: str | None, references: list[str] | None
+) -> list[str]:
+    """Message-IDs to resolve a reply's thread by, most specific first."""
+    ids = [in_reply_to] if in_reply_to else []
+    ids += [ref for ref in reversed(references or []) if ref != in_reply_to]
+    return ids
+
+
 def get_prospect_details_by_email(prospect_email: str) -> Optional[Dict[str, str]]:
     """
-    Finds a prospect in the CSV file by their email address.
+    Finds a prospect in the CSV file by their email address (case-insensitive),
+    using an index of the file that is rebuilt when the file changes.
 
     Args:
         prospect_email: The email address of the prospect to find.
@@ -33,17 +96,15 @@ def get_prospect_details_by_email(prospect_email: str) -> Optional[Dict[str, str
         A dictionary containing the prospect's details if found, otherwise None.
     """
     try:
-        with open(settings.PROSPECTS_CSV_PATH, mode="r", encoding="utf-8") as infile:
-            reader = csv.DictReader(infile)
-            for row in reader:
-                if row.get("Email") and row["Email"].lower() == prospect_email.lower():
-                    logger.info(
-                        {
-                            "message": "Found prospect details in CSV",
-                            "email": prospect_email,
-                        }
-                    )
-                    return row
+        row = find_prospect(prospect_email)
+        if row:
+            logger.info(
+                {
+                    "message": "Found prospect details in CSV",
+                    "email": prospect_email,
+                }
+            )
+            return row
     except FileNotFoundError:
         logger.error(
             {
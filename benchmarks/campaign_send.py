@@ -0,0 +1,188 @@
+# benchmarks/campaign_send.py
+
+"""
+Bulk campaign send benchmark.
+
+Runs the campaign sender (`app.main.send_campaign`: CSV streaming,
+personalization, markdown rendering and the SendGrid send loop) over
+generated prospect lists against the fake SendGrid endpoint. Each list size
+runs in a fresh process so its memory high-water mark is its own.
+
+Reported per size:
+  - rows per second
+  - CPU time split between templating (rendering, on the calling thread) and
+    sending (request serialization and HTTP, summed over the send pool),
+    plus send-thread time spent waiting on I/O
+  - peak RSS
+
+Sends go through the send controller (adaptive concurrency, per-domain
+pacing); `--concurrency` and `--domain-rate` set its limits.
+
+Usage:
+    python -m benchmarks.campaign_send --rows 1000 100000 1000000
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from .common import (
+    configure_offline_env,
+    peak_rss_mb,
+    start_fake_services,
+    write_results,
+)
+from .prospects import ensure_prospects_csv
+
+NAME = "campaign_send"
+
+SUBJECT = "{{FirstName}}, a quick idea for {{Company}}"
+BODY_TEMPLATE = """Hi {{FirstName}},
+
+I noticed **{{Company}}** is growing its {{Industry}} team in {{City}}. As
+{{Position}}, you are probably juggling:
+
+- manual prospect research
+- follow-ups that slip through the cracks
+- inconsistent messaging across reps
+
+SovereignAI's agents handle all three. Teams like yours typically save
+*10+ hours per rep per week*.
+
+Would a [15-minute call](https://example.com/book) next week make sense?
+
+Best,
+The SovereignAI Team
+"""
+
+
+class _TimedSender:
+    """Wraps the SendGrid client and accumulates time spent in `send`."""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def send(self, message):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            return self._client.send(message)
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            with self._lock:
+                self.wall_seconds += wall
+                self.cpu_seconds += cpu
+
+
+def _run_size(rows: int, csv_path: str, log_level: str) -> dict:
+    # Runs in a spawned child; settings come from the inherited environment.
+    from app.clients import get_sendgrid_client
+    from app.main import iter_prospects, send_campaign
+
+    logging.getLogger().setLevel(log_level)
+    sender = _TimedSender(get_sendgrid_client())
+
+    wall, cpu = time.perf_counter(), time.thread_time()
+    result = send_campaign(SUBJECT, BODY_TEMPLATE, iter_prospects(csv_path), sg=sender)
+    wall = time.perf_counter() - wall
+    cpu = time.thread_time() - cpu
+
+    return {
+        "rows": rows,
+        "status": result["status"],
+        "message": result["message"],
+        "wall_seconds": round(wall, 3),
+        "rows_per_second": round(rows / wall, 1) if wall else None,
+        "cpu_seconds": round(cpu + sender.cpu_seconds, 3),
+        # Sends run on the pool threads, so the calling thread only renders.
+        "templating_cpu_seconds": round(cpu, 3),
+        "send_cpu_seconds": round(sender.cpu_seconds, 3),
+        "io_wait_seconds": round(sender.wall_seconds - sender.cpu_seconds, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--sendgrid-latency-ms",
+        type=float,
+        default=0.0,
+        help="Median latency of the fake SendGrid endpoint.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=32,
+        help="Upper bound of the adaptive send concurrency (SEND_MAX_CONCURRENCY).",
+    )
+    parser.add_argument(
+        "--domain-rate",
+        type=float,
+        default=1000.0,
+        help="Sends per second per recipient domain (SEND_DOMAIN_RATE_PER_SECOND).",
+    )
+    parser.add_argument(
+        "--fakes-url",
+        help="Use already running fake services instead of starting them.",
+    )
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/).")
+    args = parser.parse_args()
+
+    os.environ.setdefault(
+        "FAKE_LATENCY_MEDIAN_MS", json.dumps({"sendgrid": args.sendgrid_latency_ms})
+    )
+    fakes = None
+    fakes_url = args.fakes_url
+    if not fakes_url:
+        fakes, fakes_url = start_fake_services()
+    configure_offline_env(
+        fakes_url,
+        SEND_MAX_CONCURRENCY=str(args.concurrency),
+        SEND_DOMAIN_RATE_PER_SECOND=str(args.domain_rate),
+        SEND_DOMAIN_BURST=str(max(int(args.domain_rate), 1)),
+    )
+
+    runs = []
+    context = multiprocessing.get_context("spawn")
+    try:
+        for rows in args.rows:
+            csv_path = ensure_prospects_csv(rows, args.seed)
+            with context.Pool(1) as pool:
+                run = pool.apply(_run_size, (rows, str(csv_path), args.log_level))
+            print(
+                f"{rows:>9,} rows: {run['rows_per_second']:,} rows/s, "
+                f"peak RSS {run['peak_rss_mb']} MB"
+            )
+            runs.append(run)
+    finally:
+        if fakes is not None:
+            fakes.terminate()
+            fakes.wait()
+
+    results = {
+        "config": {
+            "seed": args.seed,
+            "sendgrid_latency_ms": args.sendgrid_latency_ms,
+            "concurrency": args.concurrency,
+            "domain_rate": args.domain_rate,
+            "template_chars": len(BODY_TEMPLATE),
+        },
+        "runs": runs,
+    }
+    path = write_results(NAME, results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
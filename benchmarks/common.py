@@ -0,0 +1,133 @@
+# benchmarks/common.py
+
+"""
+Shared helpers for the benchmarks: offline environment setup, the fake
+services process, percentiles, peak RSS and result files.
+
+`configure_offline_env` must run before anything from `app` is imported,
+since settings are read at import time.
+"""
+
+import json
+import math
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def configure_offline_env(fakes_url: str, **overrides: str):
+    """Points the app at the fake services; explicit env vars still win."""
+    defaults = {
+        "OFFLINE_MODE": "true",
+        "FAKE_SERVICES_URL": fakes_url,
+        "METRICS_ENABLED": "false",
+        # Repeated runs would otherwise be served from the agent output cache.
+        "AGENT_CACHE_ENABLED": "false",
+        **overrides,
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_services(timeout: float = 15.0) -> tuple[subprocess.Popen, str]:
+    """
+    Starts `python -m app.fakes` in a subprocess (so it does not compete with
+    the measured process for the GIL) and waits until it accepts connections.
+    """
+    port = _free_port()
+    env = {**os.environ, "OFFLINE_MODE": "true", "FAKE_SERVICES_PORT": str(port)}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.fakes"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Fake services exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Fake services did not start in time")
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile (q in 0-100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: list[float], scale: float = 1.0) -> dict:
+    """p50/p90/p99/max/mean of `values` multiplied by `scale` (e.g. 1000 for ms)."""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50) * scale, 3),
+        "p90": round(percentile(values, 90) * scale, 3),
+        "p99": round(percentile(values, 99) * scale, 3),
+        "max": round(max(values) * scale, 3),
+        "mean": round(sum(values) / len(values) * scale, 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        maxrss /= 1024
+    return round(maxrss / 1024, 1)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name: str, results: dict, output: str | None = None) -> Path:
+    """
+    Writes results as JSON, by default to
+    benchmarks/results/<name>-<UTC timestamp>-<git rev>.json.
+    """
+    revision = git_revision()
+    payload = {
+        "benchmark": name,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        **results,
+    }
+    if output:
+        path = Path(output)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = RESULTS_DIR / f"{name}-{stamp}-{revision or 'unknown'}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    return path
@@ -0,0 +1,137 @@
+# benchmarks/import_time.py
+
+"""
+Import-time benchmark with a budget.
+
+Imports each entry point in a fresh interpreter (as a new web replica or
+worker process would), several times, and reports the median wall time plus
+the slowest modules from `python -X importtime`. It also checks that the web
+tier does not import the heavy worker-only libraries. Exits non-zero when a
+budget is exceeded, so it can gate CI.
+
+Usage:
+    python -m benchmarks.import_time --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from .common import write_results
+
+NAME = "import_time"
+
+# Median cold import budgets in milliseconds.
+BUDGETS_MS = {
+    "webhook_server": 1500.0,
+    "app.celery_app": 800.0,
+    "app.tasks": 4000.0,
+}
+
+# Libraries only the worker needs; the web tier must not import them.
+WORKER_ONLY_MODULES = {
+    "webhook_server": ["agents", "openai", "sendgrid", "tavily", "app.tasks"],
+    "app.celery_app": ["agents", "openai", "sendgrid", "tavily", "app.tasks"],
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {watch!r} if m in sys.modules]}}))
+"""
+
+
+def _env() -> dict:
+    # Settings validation must pass without real keys; nothing here calls out.
+    return {**os.environ, "OFFLINE_MODE": "true", "PYTHONDONTWRITEBYTECODE": "1"}
+
+
+def _probe(module: str) -> dict:
+    code = _PROBE.format(module=module, watch=WORKER_ONLY_MODULES.get(module, []))
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(),
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _slowest_imports(module: str, top: int) -> list[dict]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_env(),
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <module>"
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        rows.append(
+            {
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    return sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top]
+
+
+def run(modules: list[str], repeat: int, top: int) -> tuple[dict, list[str]]:
+    results, failures = {}, []
+    for module in modules:
+        probes = [_probe(module) for _ in range(repeat)]
+        median_ms = statistics.median(p["ms"] for p in probes)
+        budget_ms = BUDGETS_MS.get(module)
+        loaded = probes[0]["loaded"]
+        results[module] = {
+            "median_ms": round(median_ms, 1),
+            "min_ms": round(min(p["ms"] for p in probes), 1),
+            "max_ms": round(max(p["ms"] for p in probes), 1),
+            "budget_ms": budget_ms,
+            "worker_only_modules_loaded": loaded,
+            "slowest_imports": _slowest_imports(module, top),
+        }
+        status = "ok"
+        if budget_ms is not None and median_ms > budget_ms:
+            status = "OVER BUDGET"
+            failures.append(f"{module}: {median_ms:.0f} ms > {budget_ms:.0f} ms")
+        if loaded:
+            status = "IMPORTS WORKER-ONLY MODULES"
+            failures.append(f"{module} imports {', '.join(loaded)}")
+        print(f"{module:<20} {median_ms:8.1f} ms  (budget {budget_ms}) {status}")
+    return results, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modules", nargs="+", default=list(BUDGETS_MS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list.")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/).")
+    args = parser.parse_args()
+
+    results, failures = run(args.modules, args.repeat, args.top)
+    path = write_results(
+        NAME, {"config": {"repeat": args.repeat}, "modules": results}, args.output
+    )
+    print(f"Results written to {path}")
+    if failures:
+        print("Import-time budget failures:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/prospects.py
+
+"""
+Synthetic prospect lists for the benchmarks.
+
+Rows use the columns the campaign templates reference (FirstName, Company,
+Position, ...) plus the kind of extra columns real exports carry. Output is
+deterministic for a given seed, so runs on different commits see the same
+data.
+
+Usage:
+    python -m benchmarks.prospects --rows 100000 --output prospects-100k.csv
+"""
+
+import argparse
+import csv
+import random
+import unicodedata
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent / "data"
+
+COLUMNS = [
+    "FirstName",
+    "LastName",
+    "Email",
+    "Company",
+    "Position",
+    "Industry",
+    "City",
+    "Country",
+    "Website",
+    "LinkedIn",
+]
+
+FIRST_NAMES = [
+    "Olivia", "Liam", "Emma", "Noah", "Ava", "Mateo", "Sophia", "Arjun",
+    "Priya", "Lucas", "Mia", "Hiroshi", "Chloe", "Ethan", "Fatima", "Diego",
+    "Hannah", "Kwame", "Isabella", "Wei", "Zoe", "Omar", "Ananya", "Leon",
+]  # fmt: skip
+LAST_NAMES = [
+    "Smith", "Garcia", "Patel", "Kim", "Müller", "Nguyen", "Johnson", "Rossi",
+    "O'Brien", "Sato", "Silva", "Kowalski", "Brown", "Haddad", "Lopez",
+    "Andersson", "Chen", "Okafor", "Dubois", "Sharma", "Taylor", "Ivanova",
+]  # fmt: skip
+COMPANY_WORDS = [
+    "Quantum", "Nimbus", "Vertex", "Bright", "Atlas", "Nova", "Cobalt",
+    "Helix", "Summit", "Pioneer", "Lumen", "Harbor", "Orbit", "Crescent",
+]  # fmt: skip
+COMPANY_SUFFIXES = ["Labs", "Systems", "AI", "Analytics", "Cloud", "Works", "Group"]
+POSITIONS = [
+    "CTO", "VP of Engineering", "Head of Sales", "Head of AI Engineering",
+    "Director of Operations", "Chief Revenue Officer", "Engineering Manager",
+    "VP of Customer Success", "Founder & CEO",
+]  # fmt: skip
+INDUSTRIES = ["SaaS", "Fintech", "Healthcare IT", "E-commerce", "Logistics", "Edtech"]
+CITIES = [
+    ("San Francisco", "USA"), ("New York", "USA"), ("London", "UK"),
+    ("Berlin", "Germany"), ("Bengaluru", "India"), ("Toronto", "Canada"),
+    ("Singapore", "Singapore"), ("Sydney", "Australia"), ("Paris", "France"),
+]  # fmt: skip
+
+
+def _ascii_handle(name: str) -> str:
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return folded.lower().replace("'", "").replace(" ", "")
+
+
+def generate_prospects(path: Path, rows: int, seed: int = 42) -> Path:
+    """Writes `rows` synthetic prospects to `path`, streaming row by row."""
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+            domain = company.lower().replace(" ", "") + ".com"
+            handle = _ascii_handle(f"{first}.{last}")
+            city, country = rng.choice(CITIES)
+            writer.writerow(
+                [
+                    first,
+                    last,
+                    f"{handle}{i}@{domain}",
+                    company,
+                    rng.choice(POSITIONS),
+                    rng.choice(INDUSTRIES),
+                    city,
+                    country,
+                    f"https://www.{domain}",
+                    f"https://www.linkedin.com/in/{handle}-{i}",
+                ]
+            )
+    return path
+
+
+def ensure_prospects_csv(rows: int, seed: int = 42) -> Path:
+    """Returns a cached generated CSV of `rows` prospects, creating it if needed."""
+    path = DATA_DIR / f"prospects-{rows}-{seed}.csv"
+    if not path.exists():
+        tmp = path.with_suffix(".tmp")
+        generate_prospects(tmp, rows, seed)
+        tmp.replace(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic prospect CSV.")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    path = generate_prospects(Path(args.output), args.rows, args.seed)
+    print(f"Wrote {args.rows:,} prospects to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+# benchmarks/reply_pipeline.py
+
+"""
+End-to-end throughput benchmark for the reply pipeline.
+
+Replays N synthetic SendGrid Inbound Parse payloads into
+`/webhook/inbound-email` (in process, through the ASGI transport) while a
+worker thread drains the queued `process_inbound_email` tasks from an
+in-memory broker, with OpenAI, Tavily, SendGrid and Slack served by the fake
+services. Postgres is the one the app is configured for.
+
+Reported per run:
+  - webhook latency p50/p90/p99
+  - enqueue-to-first-Slack-card and enqueue-to-final-card latency
+  - replies per second per worker (one worker, measured over busy time)
+  - DB round-trips per reply (cursor executions attributed by correlation ID)
+  - peak RSS of the benchmark process
+
+Usage:
+    python -m benchmarks.reply_pipeline --replies 200 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from .common import (
+    configure_offline_env,
+    peak_rss_mb,
+    start_fake_services,
+    summarize,
+    write_results,
+)
+from .prospects import ensure_prospects_csv
+
+NAME = "reply_pipeline"
+
+REPLY_BODIES = [
+    "Thanks for reaching out. Could you share pricing for a team of 10?",
+    "Not a priority for us this quarter, please check back later.",
+    "Interesting. How does this integrate with our CRM?",
+    "Please remove me from your list.",
+    "Can we set up a call next Tuesday afternoon?",
+]
+
+
+def _load_prospects(path: Path, limit: int) -> list[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(itertools.islice(csv.DictReader(f), limit))
+
+
+def _payload(i: int, prospects: list[dict], run_id: str) -> dict:
+    prospect = prospects[i % len(prospects)]
+    return {
+        "from": f"{prospect['FirstName']} {prospect['LastName']} <{prospect['Email']}>",
+        "subject": f"Re: Automating outreach at {prospect['Company']} ({run_id}-{i})",
+        "text": REPLY_BODIES[i % len(REPLY_BODIES)],
+    }
+
+
+class _Worker(threading.Thread):
+    """Consumes queued tasks from the in-memory broker and runs them in order."""
+
+    def __init__(self, celery_app, task):
+        super().__init__(name="bench-worker", daemon=True)
+        self.celery_app = celery_app
+        self.task = task
+        self.producer_done = threading.Event()
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+
+    def run(self):
+        with self.celery_app.connection_for_read() as connection:
+            tasks = connection.SimpleQueue(self.celery_app.conf.task_default_queue)
+            try:
+                while True:
+                    try:
+                        message = tasks.get(block=True, timeout=0.2)
+                    except tasks.Empty:
+                        if self.producer_done.is_set():
+                            return
+                        continue
+                    args, kwargs, _embed = message.decode()
+                    start = time.perf_counter()
+                    self.first_start = self.first_start or start
+                    # `apply` runs the task through ContextTask.__call__ with
+                    # the published headers, like a worker would.
+                    self.task.apply(
+                        args=args,
+                        kwargs=kwargs,
+                        task_id=message.headers.get("id"),
+                        headers=message.headers,
+                    )
+                    self.last_end = time.perf_counter()
+                    self.busy_seconds += self.last_end - start
+                    self.processed += 1
+                    message.ack()
+            finally:
+                tasks.close()
+
+
+async def _replay(
+    app, replies: int, concurrency: int, prospects: list[dict], run_id: str
+):
+    import httpx
+
+    latencies: list[float] = []
+    correlation_ids: list[str] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def post(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/webhook/inbound-email", data=_payload(i, prospects, run_id)
+                )
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+                correlation_ids.append(response.headers["X-Correlation-ID"])
+
+        await asyncio.gather(*(post(i) for i in range(replies)))
+    return latencies, correlation_ids
+
+
+def _reply_timings(correlation_ids: list[str]) -> dict:
+    from app.tracing import exporter, trace_id_for
+
+    first_card, final_card, task_time, queue_wait = [], [], [], []
+    researched = failed = 0
+    for cid in correlation_ids:
+        spans = exporter.get_finished_spans(trace_id_for(cid))
+        enqueued = [s.start_ns for s in spans if s.name == "celery.queue_wait"]
+        slack = [s.end_ns for s in spans if s.name.startswith("slack.chat_")]
+        if not enqueued or not slack:
+            failed += 1
+            continue
+        first_card.append((min(slack) - enqueued[0]) / 1e9)
+        final_card.append((max(slack) - enqueued[0]) / 1e9)
+        for s in spans:
+            if s.name == "celery.queue_wait":
+                queue_wait.append(s.duration_ms / 1000)
+            elif s.name.startswith("celery.task"):
+                task_time.append(s.duration_ms / 1000)
+            elif s.name == "agent.research":
+                researched += 1
+    return {
+        "enqueue_to_first_slack_ms": summarize(first_card, 1000),
+        "enqueue_to_final_slack_ms": summarize(final_card, 1000),
+        "queue_wait_ms": summarize(queue_wait, 1000),
+        "task_duration_ms": summarize(task_time, 1000),
+        "researched_replies": researched,
+        "replies_without_slack_card": failed,
+    }
+
+
+def run(args, prospects: list[dict]) -> dict:
+    # Imported late: settings are read from the environment at import time.
+    from sqlalchemy import event
+
+    from app.config import settings
+    from app.database import engine
+    from app.logging_config import get_correlation_id
+    from app.slack_notifier import dispatcher
+    from app.tasks import celery_app, process_inbound_email
+    from webhook_server import app
+
+    logging.getLogger().setLevel(args.log_level)
+
+    round_trips: Counter[str] = Counter()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_round_trip(*_args):
+        round_trips[get_correlation_id()] += 1
+
+    worker = _Worker(celery_app, process_inbound_email)
+    worker.start()
+    run_id = uuid.uuid4().hex[:8]
+    latencies, correlation_ids = asyncio.run(
+        _replay(app, args.replies, args.concurrency, prospects, run_id)
+    )
+    worker.producer_done.set()
+    worker.join()
+    dispatcher.shutdown()
+
+    if not worker.processed:
+        # e.g. every enqueue failed: report that instead of empty timings.
+        print(
+            f"Warning: the worker processed none of the {args.replies} replies; "
+            "check the log for enqueue errors.",
+            file=sys.stderr,
+        )
+    per_reply_round_trips = [float(round_trips[cid]) for cid in correlation_ids]
+    return {
+        "config": {
+            "replies": args.replies,
+            "concurrency": args.concurrency,
+            "prospects": args.prospects,
+            "workers": 1,
+            "slack_min_post_interval_s": settings.SLACK_MIN_POST_INTERVAL_SECONDS,
+            "fake_latency_median_ms": settings.FAKE_LATENCY_MEDIAN_MS,
+            "fake_latency_sigma": settings.FAKE_LATENCY_SIGMA,
+            "fake_error_rate": settings.FAKE_ERROR_RATE,
+            "fake_rate_limit_rate": settings.FAKE_RATE_LIMIT_RATE,
+            "fake_seed": settings.FAKE_SEED,
+        },
+        "webhook_latency_ms": summarize(latencies, 1000),
+        **_reply_timings(correlation_ids),
+        "replies_processed": worker.processed,
+        "replies_per_second_per_worker": (
+            round(worker.processed / worker.busy_seconds, 3)
+            if worker.busy_seconds
+            else None
+        ),
+        "drain_wall_seconds": (
+            round(worker.last_end - worker.first_start, 3) if worker.processed else None
+        ),
+        "db_round_trips_per_reply": summarize(per_reply_round_trips),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--replies", type=int, default=100)
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="Concurrent webhook posts."
+    )
+    parser.add_argument(
+        "--prospects", type=int, default=50, help="Size of the synthetic CSV."
+    )
+    parser.add_argument(
+        "--fakes-url",
+        help="Use already running fake services instead of starting them.",
+    )
+    parser.add_argument(
+        "--slack-pacing",
+        action="store_true",
+        help="Keep the 1 post/s per channel Slack pacing (off by default, since "
+        "it would dominate the measurement).",
+    )
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/).")
+    args = parser.parse_args()
+
+    fakes = None
+    fakes_url = args.fakes_url
+    if not fakes_url:
+        fakes, fakes_url = start_fake_services()
+    try:
+        prospects_csv = ensure_prospects_csv(args.prospects)
+        overrides = {
+            "CELERY_BROKER_URL": "memory://",
+            # The result backend defaults to the broker URL, and "memory://"
+            # is not a backend; replies store no results anyway.
+            "CELERY_RESULT_BACKEND": "cache+memory://",
+            "TRACING_ENABLED": "true",
+            "TRACING_EXPORTER": "memory",
+            "SLACK_DIGEST_ENABLED": "false",
+            "PROSPECTS_CSV_PATH": str(prospects_csv),
+        }
+        if not args.slack_pacing:
+            overrides["SLACK_MIN_POST_INTERVAL_SECONDS"] = "0"
+        configure_offline_env(fakes_url, **overrides)
+        results = run(args, _load_prospects(prospects_csv, args.prospects))
+    finally:
+        if fakes is not None:
+            fakes.terminate()
+            fakes.wait()
+
+    path = write_results(NAME, results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
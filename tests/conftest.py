@@ -0,0 +1,5 @@
+import os
+
+# Settings are read at import time; run against the fake services so no API
+# keys are needed.
+os.environ.setdefault("OFFLINE_MODE", "true")
@@ -0,0 +1,117 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, update
+from sqlalchemy.exc import OperationalError
+
+from app.campaigns import campaign_progress, record_shard_result
+from app.config import settings
+from app.database import (
+    CampaignSend,
+    CampaignShard,
+    claim_campaign_sends,
+    ensure_schema,
+    get_session,
+    mark_campaign_send,
+)
+
+
+@pytest.fixture
+def campaign_id():
+    """A fresh campaign in the configured Postgres; skipped without one."""
+    try:
+        ensure_schema()
+    except OperationalError:
+        pytest.skip("Postgres is not reachable")
+    campaign_id = f"test-{uuid.uuid4().hex[:12]}"
+    yield campaign_id
+    with get_session() as db:
+        db.execute(delete(CampaignSend).where(CampaignSend.campaign_id == campaign_id))
+        db.execute(
+            delete(CampaignShard).where(CampaignShard.campaign_id == campaign_id)
+        )
+        db.commit()
+
+
+def _age_claim(campaign_id: str, email: str, seconds: float):
+    with get_session() as db:
+        db.execute(
+            update(CampaignSend)
+            .where(
+                CampaignSend.campaign_id == campaign_id,
+                CampaignSend.prospect_email == email,
+            )
+            .values(updated_at=datetime.now(timezone.utc) - timedelta(seconds=seconds))
+        )
+        db.commit()
+
+
+def test_new_prospects_are_claimed_once(campaign_id):
+    emails = ["a@example.com", "b@example.com"]
+    assert claim_campaign_sends(campaign_id, emails) == set(emails)
+    # A second shard (or a redelivery) gets nothing while the claims are fresh.
+    assert claim_campaign_sends(campaign_id, emails) == set()
+
+
+def test_sent_prospects_are_never_reclaimed(campaign_id):
+    claim_campaign_sends(campaign_id, ["a@example.com"])
+    mark_campaign_send(campaign_id, "a@example.com", sent=True)
+    _age_claim(
+        campaign_id, "a@example.com", settings.CAMPAIGN_CLAIM_TIMEOUT_SECONDS * 2
+    )
+    assert claim_campaign_sends(campaign_id, ["a@example.com"]) == set()
+
+
+def test_failed_sends_are_reclaimed(campaign_id):
+    claim_campaign_sends(campaign_id, ["a@example.com"])
+    mark_campaign_send(campaign_id, "a@example.com", sent=False)
+    assert claim_campaign_sends(campaign_id, ["a@example.com"]) == {"a@example.com"}
+
+
+def test_stale_claims_are_reclaimed(campaign_id):
+    claim_campaign_sends(campaign_id, ["a@example.com", "b@example.com"])
+    _age_claim(
+        campaign_id, "a@example.com", settings.CAMPAIGN_CLAIM_TIMEOUT_SECONDS + 5
+    )
+    # Older than a shard lease but inside the claim window: the shard may
+    # have been re-dispatched while its first worker is still sending.
+    _age_claim(campaign_id, "b@example.com", settings.CAMPAIGN_SHARD_LEASE_SECONDS)
+    assert claim_campaign_sends(campaign_id, ["a@example.com", "b@example.com"]) == {
+        "a@example.com"
+    }
+
+
+def test_claims_are_per_campaign(campaign_id):
+    other = f"{campaign_id}-other"
+    try:
+        assert claim_campaign_sends(campaign_id, ["a@example.com"])
+        assert claim_campaign_sends(other, ["a@example.com"]) == {"a@example.com"}
+    finally:
+        with get_session() as db:
+            db.execute(delete(CampaignSend).where(CampaignSend.campaign_id == other))
+            db.commit()
+
+
+def test_campaign_progress_adds_up_finished_shards(campaign_id):
+    claim_campaign_sends(
+        campaign_id, ["a@example.com", "b@example.com", "c@example.com"]
+    )
+    mark_campaign_send(campaign_id, "a@example.com", sent=True)
+    mark_campaign_send(campaign_id, "b@example.com", sent=False)
+    record_shard_result(campaign_id, 0, 3, {"sent": 1, "failed": 1, "skipped": 1})
+    record_shard_result(campaign_id, 1, 2, {"sent": 0, "failed": 0, "skipped": 2})
+    # A redelivered shard keeps the counts of its first run.
+    record_shard_result(campaign_id, 0, 3, {"sent": 0, "failed": 0, "skipped": 3})
+    assert campaign_progress(campaign_id) == {
+        "campaign_id": campaign_id,
+        "shards_done": 2,
+        "sent": 1,
+        "failed": 1,
+        "skipped": 3,
+        "sending": 1,
+    }
+
+
+def test_no_prospects():
+    assert claim_campaign_sends("unused", []) == set()
@@ -0,0 +1,27 @@
+from app.campaigns import fair_share
+
+
+def test_round_robin_one_slot_per_campaign_per_round():
+    grants = fair_share([("a", 5), ("b", 5), ("c", 5)], capacity=4)
+    # a, b, c in the first round; the fourth slot goes to the first again.
+    assert grants == {"a": 2, "b": 1, "c": 1}
+
+
+def test_small_campaign_is_not_starved_by_a_large_one():
+    grants = fair_share([("big", 100), ("small", 1)], capacity=3)
+    assert grants == {"big": 2, "small": 1}
+
+
+def test_unused_demand_is_passed_on():
+    grants = fair_share([("a", 1), ("b", 4)], capacity=4)
+    assert grants == {"a": 1, "b": 3}
+
+
+def test_capacity_left_over_when_demand_runs_out():
+    assert fair_share([("a", 2), ("b", 1)], capacity=10) == {"a": 2, "b": 1}
+
+
+def test_no_capacity_or_no_demand():
+    assert fair_share([("a", 3)], capacity=0) == {}
+    assert fair_share([("a", 0), ("b", -1)], capacity=5) == {}
+    assert fair_share([], capacity=5) == {}
@@ -0,0 +1,86 @@
+import uuid
+
+import pytest
+from sqlalchemy import delete, update
+from sqlalchemy.exc import OperationalError
+
+from app.database import (
+    Conversation,
+    add_message_to_conversation,
+    ensure_schema,
+    get_session,
+    start_follow_up_sequences,
+)
+
+SUBJECT = "Quick question"
+
+
+@pytest.fixture
+def prospect_email():
+    """A prospect with no conversations in the configured Postgres; skipped without one."""
+    try:
+        ensure_schema()
+    except OperationalError:
+        pytest.skip("Postgres is not reachable")
+    email = f"test-{uuid.uuid4().hex[:12]}@example.com"
+    yield email
+    with get_session() as db:
+        db.execute(delete(Conversation).where(Conversation.prospect_email == email))
+        db.commit()
+
+
+def _start(prospect_email: str, message_id: str):
+    start_follow_up_sequences(
+        [
+            {
+                "prospect_email": prospect_email,
+                "subject": SUBJECT,
+                "message": "Hi there",
+                "message_id": message_id,
+            }
+        ]
+    )
+
+
+def _conversation(prospect_email: str) -> Conversation:
+    with get_session() as db:
+        return db.get(Conversation, (prospect_email, SUBJECT))
+
+
+def _mark_followed_up(prospect_email: str):
+    with get_session() as db:
+        db.execute(
+            update(Conversation)
+            .where(Conversation.prospect_email == prospect_email)
+            .values(follow_up_count=2, next_action_at=None)
+        )
+        db.commit()
+
+
+def test_new_conversation_is_scheduled(prospect_email):
+    _start(prospect_email, "<first@example.com>")
+    conversation = _conversation(prospect_email)
+    assert conversation.next_action_at is not None
+    assert conversation.follow_up_count == 0
+    assert conversation.last_message_id == "<first@example.com>"
+
+
+def test_resend_restarts_a_thread_without_reply(prospect_email):
+    _start(prospect_email, "<first@example.com>")
+    _mark_followed_up(prospect_email)
+    _start(prospect_email, "<second@example.com>")
+    conversation = _conversation(prospect_email)
+    assert conversation.next_action_at is not None
+    assert conversation.follow_up_count == 0
+    assert conversation.last_message_id == "<second@example.com>"
+
+
+def test_resend_leaves_a_replied_thread_alone(prospect_email):
+    _start(prospect_email, "<first@example.com>")
+    _mark_followed_up(prospect_email)
+    add_message_to_conversation(prospect_email, SUBJECT, "prospect", "Not now")
+    _start(prospect_email, "<second@example.com>")
+    conversation = _conversation(prospect_email)
+    assert conversation.next_action_at is None
+    assert conversation.follow_up_count == 2
+    assert conversation.last_message_id == "<first@example.com>"
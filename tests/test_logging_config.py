@@ -0,0 +1,88 @@
+import logging
+
+import pytest
+
+from app.logging_config import SamplingFilter
+
+
+def _record(message: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(
+        "test", level, __file__, 1, {"message": message}, None, None
+    )
+
+
+@pytest.fixture
+def rollups():
+    """Records of the sampling rollup logger."""
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("agentic_sales_copilot.sampling")
+    logger.addHandler(handler)
+    level, logger.level = logger.level, logging.INFO
+    yield records
+    logger.removeHandler(handler)
+    logger.setLevel(level)
+
+
+def test_first_records_of_a_window_pass():
+    sampler = SamplingFilter({"chatty": 2}, window_seconds=60)
+    passed = [sampler.filter(_record("chatty")) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+
+
+@pytest.mark.parametrize("level", [logging.WARNING, logging.ERROR, logging.CRITICAL])
+def test_warning_and_above_always_pass(level):
+    sampler = SamplingFilter({"chatty": 1}, window_seconds=60)
+    assert sampler.filter(_record("chatty"))
+    assert all(sampler.filter(_record("chatty", level)) for _ in range(10))
+    # Nor do they use up the window's allowance.
+    assert not sampler.filter(_record("chatty"))
+
+
+def test_keys_without_a_rule_pass():
+    sampler = SamplingFilter({"chatty": 0}, window_seconds=60)
+    assert all(sampler.filter(_record("other")) for _ in range(10))
+    plain = logging.LogRecord("test", logging.INFO, __file__, 1, "plain", None, None)
+    assert sampler.filter(plain)
+
+
+def test_suppressed_records_are_rolled_up(rollups):
+    sampler = SamplingFilter({"chatty": 1}, window_seconds=60)
+    for _ in range(4):
+        sampler.filter(_record("chatty"))
+    sampler.flush()
+    assert len(rollups) == 1
+    rollup = rollups[0].msg
+    assert rollup["sampling.key"] == "chatty"
+    assert rollup["sampling.seen"] == 4
+    assert rollup["sampling.suppressed"] == 3
+
+
+def test_no_rollup_when_nothing_was_suppressed(rollups):
+    sampler = SamplingFilter({"chatty": 5}, window_seconds=60)
+    sampler.filter(_record("chatty"))
+    sampler.flush()
+    assert rollups == []
+
+
+def test_new_window_resets_the_allowance(rollups):
+    sampler = SamplingFilter({"chatty": 1}, window_seconds=0)
+    # Every record starts a new window, closing the previous one.
+    assert all(sampler.filter(_record("chatty")) for _ in range(3))
+    assert rollups == []
+
+
+def test_expired_windows_are_rolled_up_by_any_record(rollups, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.logging_config.time.monotonic", lambda: now[0])
+    sampler = SamplingFilter({"chatty": 1}, window_seconds=60)
+    for _ in range(3):
+        sampler.filter(_record("chatty"))
+    now[0] += 61
+    # "chatty" went quiet; an unrelated record closes its window.
+    assert sampler.filter(_record("other"))
+    assert [r.msg["sampling.key"] for r in rollups] == ["chatty"]
+    assert rollups[0].msg["sampling.suppressed"] == 2
+    sampler.flush()
+    assert len(rollups) == 1
@@ -0,0 +1,78 @@
+from app.prospects import ValidationReport, iter_valid_rows, template_fields
+
+
+def _scan(tmp_path, content: str, required=()):
+    path = tmp_path / "prospects.csv"
+    path.write_text(content, encoding="utf-8")
+    report = ValidationReport(str(path), list(required))
+    rows = [values for _, values in iter_valid_rows(str(path), report)]
+    return rows, report
+
+
+def test_emails_are_normalized(tmp_path):
+    rows, report = _scan(tmp_path, "FirstName,Email\nJane,  Jane.Doe@Example.COM \n")
+    assert rows == [["Jane", "jane.doe@example.com"]]
+    assert report.valid == 1 and report.rows == 1
+
+
+def test_first_valid_row_wins_over_duplicates(tmp_path):
+    rows, report = _scan(
+        tmp_path,
+        "FirstName,Email\nJane,jane@example.com\nJanet,JANE@example.com \n",
+    )
+    assert rows == [["Jane", "jane@example.com"]]
+    assert report.rejected == {"duplicate": 1}
+
+
+def test_missing_and_invalid_emails_are_rejected(tmp_path):
+    rows, report = _scan(
+        tmp_path,
+        "FirstName,Email\nA,\nB,not-an-email\nC,c@localhost\nD,d@example.org\n",
+    )
+    assert rows == [["D", "d@example.org"]]
+    assert report.rejected == {"missing_email": 1, "invalid_email": 2}
+
+
+def test_missing_template_field_is_rejected(tmp_path):
+    required = template_fields("Hi {{FirstName}}", "at {{Company}}")
+    rows, report = _scan(
+        tmp_path,
+        "FirstName,Company,Email\nJane,,jane@example.com\nJo,Acme,jo@example.com\n",
+        required,
+    )
+    assert rows == [["Jo", "Acme", "jo@example.com"]]
+    assert report.rejected == {"missing_field": 1}
+    assert report.samples["missing_field"][0]["detail"] == "Company"
+
+
+def test_rejected_row_does_not_claim_its_email(tmp_path):
+    # A row rejected for a missing field leaves the email free for a later row.
+    rows, _ = _scan(
+        tmp_path,
+        "FirstName,Email\n,jane@example.com\nJane,jane@example.com\n",
+        ["FirstName"],
+    )
+    assert rows == [["Jane", "jane@example.com"]]
+
+
+def test_malformed_rows(tmp_path):
+    rows, report = _scan(
+        tmp_path,
+        "FirstName,Email\n"
+        "Jane,jane@example.com,extra\n"  # too many cells
+        "Jo\n"  # too few
+        "Ann,ann@example.com,,\n"  # trailing empty cells are fine
+        "\n",  # blank lines are skipped, not counted
+    )
+    assert rows == [["Ann", "ann@example.com"]]
+    assert report.rejected == {"malformed_row": 2}
+    assert report.rows == 3
+
+
+def test_missing_columns_reject_every_row(tmp_path):
+    rows, report = _scan(
+        tmp_path, "FirstName,Mail\nJane,jane@example.com\nJo,jo@example.com\n"
+    )
+    assert rows == []
+    assert report.missing_columns == ["Email"]
+    assert report.rejected == {"missing_columns": 2}
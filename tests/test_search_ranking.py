@@ -0,0 +1,59 @@
+from app.search_ranking import estimate_tokens, select_passages
+
+
+def _select(results, query="Acme Robotics", token_budget=1000, max_words=60):
+    return select_passages(
+        results, query, token_budget, max_words, dedupe_threshold=0.8
+    )
+
+
+def test_relevant_passages_rank_first():
+    results = [
+        {"url": "https://a", "content": "The weather was mild all week."},
+        {"url": "https://b", "content": "Acme Robotics raised a Series B round."},
+    ]
+    selected, stats = _select(results)
+    assert [p.url for p in selected] == ["https://b"]
+    assert stats["passages"] == 2
+    assert stats["passages_selected"] == 1
+
+
+def test_irrelevant_passages_are_filler_only_when_nothing_matches():
+    results = [{"url": "https://a", "content": "The weather was mild all week."}]
+    selected, _ = _select(results)
+    assert [p.text for p in selected] == ["The weather was mild all week."]
+
+
+def test_near_duplicates_and_repeated_urls_are_dropped():
+    text = "Acme Robotics opened a new factory in Austin this spring."
+    results = [
+        {"url": "https://a", "content": text},
+        {"url": "https://b", "content": text},
+        {"url": "https://a", "content": "Acme Robotics hired a new CTO."},
+    ]
+    selected, stats = _select(results)
+    assert [p.url for p in selected] == ["https://a"]
+    assert stats["duplicates_dropped"] == 1
+
+
+def test_selection_fits_the_token_budget():
+    sentences = [f"Acme Robotics update number {i} was announced." for i in range(40)]
+    results = [{"url": "https://a", "content": " ".join(sentences)}]
+    selected, stats = _select(results, token_budget=50, max_words=12)
+    used = sum(estimate_tokens(p.text) for p in selected)
+    assert selected and used <= 50
+    assert stats["selected_tokens"] == used
+    assert stats["input_tokens"] > 50
+
+
+def test_passages_over_the_budget_are_skipped():
+    results = [{"url": "https://a", "content": "Acme Robotics " * 200}]
+    selected, stats = _select(results, token_budget=10, max_words=1000)
+    assert selected == []
+    assert stats["selected_tokens"] == 0
+
+
+def test_no_results():
+    selected, stats = _select([])
+    assert selected == []
+    assert stats["passages"] == 0
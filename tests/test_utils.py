@@ -0,0 +1,22 @@
+from app.utils import MAX_REFERENCES, reply_references
+
+
+def test_reply_references_appends_the_parent():
+    assert reply_references(["<a@x>", "<b@x>"], "<c@x>") == "<a@x> <b@x> <c@x>"
+
+
+def test_reply_references_without_a_chain():
+    assert reply_references(None, "<c@x>") == "<c@x>"
+    assert reply_references([], "<c@x>") == "<c@x>"
+
+
+def test_parent_is_not_repeated():
+    assert reply_references(["<a@x>", "<c@x>"], "<c@x>") == "<a@x> <c@x>"
+
+
+def test_long_chains_keep_the_root_and_latest_ids():
+    chain = [f"<{i}@x>" for i in range(50)]
+    ids = reply_references(chain, "<parent@x>").split()
+    assert len(ids) == MAX_REFERENCES
+    assert ids[0] == "<0@x>"
+    assert ids[-2:] == ["<49@x>", "<parent@x>"]
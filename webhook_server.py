@@ -1,30 +1,45 @@
+import hmac
 import json
 import aiohttp
-from fastapi import FastAPI, Request, Response, status
+from fastapi import Depends, FastAPI, HTTPException, Request, Response, status
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
-from slack_sdk.web.async_client import AsyncWebClient
 
-from app.config import settings
-from app.tasks import (
+from app.celery_app import (
     process_inbound_email,
     send_approved_email,
     add_approved_reply_to_history,
 )
-from app.database import init_db
+from app.campaigns import (
+    CampaignRequest,
+    cancel_campaign,
+    create_campaign,
+    get_campaign_status,
+    list_campaign_statuses,
+)
+from app.config import settings
+from app.database import get_latest_draft, add_draft_version
 from app.logging_config import (
     logger,
     setup_logging,
+    shutdown_logging,
     set_correlation_id,
     get_correlation_id,
 )
 from app.middleware import CorrelationIdMiddleware
+from app.metrics import CONTENT_TYPE, render_metrics, shutdown_metrics, start_metrics
+from app.slack_notifier import get_slack_client
+from app.utils import parse_thread_headers
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging()
-    init_db()
+    start_metrics()
     yield
+    shutdown_metrics()
+    shutdown_logging()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -36,6 +51,14 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    body = await run_in_threadpool(render_metrics)
+    return PlainTextResponse(body, media_type=CONTENT_TYPE)
+
+
 # Endpoint for generating test logs (remove in production)
 @app.get("/test/generate-log")
 async def generate_test_log(level: str = "info"):
@@ -78,7 +101,59 @@ async def generate_test_log(level: str = "info"):
         }
 
 
-slack_client = AsyncWebClient(token=settings.SLACK_BOT_TOKEN)
+def require_campaign_token(request: Request):
+    # Fails closed: the server is public (SendGrid and Slack call it), and a
+    # campaign sends mail from our account.
+    token = settings.CAMPAIGN_API_TOKEN
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Campaign API disabled: CAMPAIGN_API_TOKEN is not set",
+        )
+    if not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+
+@app.post(
+    "/campaigns",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(require_campaign_token)],
+)
+async def create_campaign_endpoint(campaign: CampaignRequest):
+    """Queues a campaign; the scheduler starts it within CAMPAIGN_TICK_SECONDS."""
+    try:
+        return await run_in_threadpool(create_campaign, campaign)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@app.get("/campaigns", dependencies=[Depends(require_campaign_token)])
+async def list_campaigns_endpoint(status: str | None = None, limit: int = 20):
+    return await run_in_threadpool(list_campaign_statuses, status, min(limit, 100))
+
+
+@app.get("/campaigns/{campaign_id}", dependencies=[Depends(require_campaign_token)])
+async def campaign_status_endpoint(campaign_id: str):
+    campaign = await run_in_threadpool(get_campaign_status, campaign_id)
+    if campaign is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Campaign not found"
+        )
+    return campaign
+
+
+@app.post(
+    "/campaigns/{campaign_id}/cancel", dependencies=[Depends(require_campaign_token)]
+)
+async def cancel_campaign_endpoint(campaign_id: str):
+    campaign = await run_in_threadpool(cancel_campaign, campaign_id)
+    if campaign is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Campaign not found"
+        )
+    return campaign
 
 
 async def update_slack_message(response_url: str, blocks: list):
@@ -99,17 +174,23 @@ async def receive_inbound_email(request: Request):
         sender = form_data.get("from")
         subject = form_data.get("subject")
         body = form_data.get("text")
+        # Inbound Parse posts the raw header block; its Message-ID,
+        # In-Reply-To and References identify the thread.
+        thread_headers = parse_thread_headers(form_data.get("headers"))
 
         logger.info(
             {
                 "message": "Inbound email webhook received, queueing for processing.",
                 "sender": sender,
                 "subject": subject,
+                "in_reply_to": thread_headers["in_reply_to"],
             }
         )
 
         if body:
-            process_inbound_email.delay(sender, subject, body, correlation_id=cid)
+            process_inbound_email.delay(
+                sender, subject, body, correlation_id=cid, **thread_headers
+            )
 
         return {"status": "success", "message": "Email reply successfully queued."}
     except Exception as e:
@@ -134,11 +215,33 @@ async def slack_action_handler(request: Request):
             log_context = {"action_id": action_id, "user_name": user_name}
 
             if action_id in ["approve_send", "edit_send"]:
-                action_value = json.loads(action["value"])
-                prospect_email = action_value["prospect_email"]
-                draft_reply = action_value["draft_reply"]
-                reply_subject = action_value["reply_subject"]
+                draft_id = action["value"]
+                log_context["draft_id"] = draft_id
+                draft = await run_in_threadpool(get_latest_draft, draft_id)
+                if not draft:
+                    logger.warning(
+                        {**log_context, "message": "Draft not found or expired"}
+                    )
+                    confirmation_blocks = payload["message"]["blocks"][:-1]
+                    confirmation_blocks.append(
+                        {
+                            "type": "context",
+                            "elements": [
+                                {
+                                    "type": "mrkdwn",
+                                    "text": ":warning: This draft has expired and can no longer be sent.",
+                                }
+                            ],
+                        }
+                    )
+                    await update_slack_message(response_url, confirmation_blocks)
+                    return Response(status_code=200)
+
+                prospect_email = draft.prospect_email
+                draft_reply = draft.body
+                reply_subject = draft.reply_subject
                 log_context["prospect_email"] = prospect_email
+                log_context["draft_version"] = draft.version
 
                 if action_id == "approve_send":
                     logger.info({**log_context, "message": "Approve & Send clicked"})
@@ -147,9 +250,16 @@ async def slack_action_handler(request: Request):
                         subject=reply_subject,
                         body=draft_reply,
                         correlation_id=cid,
+                        thread_subject=draft.thread_subject,
+                        in_reply_to=draft.in_reply_to,
+                        references=draft.thread_references,
                     )
                     add_approved_reply_to_history.delay(
-                        prospect_email, reply_subject, draft_reply, correlation_id=cid
+                        prospect_email,
+                        reply_subject,
+                        draft_reply,
+                        correlation_id=cid,
+                        thread_subject=draft.thread_subject,
                     )
                     confirmation_blocks = payload["message"]["blocks"][:-1]
                     confirmation_blocks.append(
@@ -169,12 +279,16 @@ async def slack_action_handler(request: Request):
                     logger.info({**log_context, "message": "Edit & Send clicked"})
                     trigger_id = payload.get("trigger_id")
                     private_metadata = {
+                        "draft_id": draft_id,
                         "prospect_email": prospect_email,
                         "reply_subject": reply_subject,
+                        "thread_subject": draft.thread_subject,
+                        "in_reply_to": draft.in_reply_to,
+                        "references": draft.thread_references,
                         "response_url": response_url,
                         "correlation_id": cid,
                     }
-                    await slack_client.views_open(
+                    await get_slack_client().views_open(
                         trigger_id=trigger_id,
                         view={
                             "type": "modal",
@@ -232,20 +346,34 @@ async def slack_action_handler(request: Request):
             edited_text = payload["view"]["state"]["values"]["edited_reply_block"][
                 "edited_reply_input"
             ]["value"]
+            draft_id = private_metadata.get("draft_id")
             logger.info(
-                {"message": "Edit modal submitted", "prospect_email": prospect_email}
+                {
+                    "message": "Edit modal submitted",
+                    "prospect_email": prospect_email,
+                    "draft_id": draft_id,
+                }
             )
+            if draft_id:
+                # Keep the rep's edit next to the generated versions.
+                await run_in_threadpool(
+                    add_draft_version, draft_id, edited_text, f"sales_rep:{user_name}"
+                )
             send_approved_email.delay(
                 to_email=prospect_email,
                 subject=reply_subject,
                 body=edited_text,
                 correlation_id=correlation_id or cid,
+                thread_subject=private_metadata.get("thread_subject"),
+                in_reply_to=private_metadata.get("in_reply_to"),
+                references=private_metadata.get("references"),
             )
             add_approved_reply_to_history.delay(
                 prospect_email,
                 reply_subject,
                 edited_text,
                 correlation_id=correlation_id or cid,
+                thread_subject=private_metadata.get("thread_subject"),
             )
             confirmation_blocks = [
                 {